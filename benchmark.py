@@ -0,0 +1,490 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import monitoring
+
+from config import settings
+from database import Database
+from progress import JobProgress
+from synthetic_data import add_arguments, dataset_config, generate_dataset, generate_ingest_batch, load_dataset
+
+# Benchmark reproducible de los métodos de servicio y endpoints sobre un dataset sintético.
+# Mide latencias (p50/p95/p99), throughput, RSS máximo y round-trips a MongoDB, y compara
+# contra un baseline guardado. Ejemplos:
+#   python benchmark.py                                  # stand-in en memoria (mongomock-motor)
+#   python benchmark.py --backend mongodb --uri mongodb://localhost:27017
+#   python benchmark.py --backend mongodb --save-baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+class CommandCounter(monitoring.CommandListener):
+    """Cuenta los comandos enviados al servidor (cada uno es un round-trip)"""
+
+    def __init__(self):
+        self.commands = 0
+
+    def started(self, event):
+        self.commands += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+class Scenario:
+    """Operación medida; 'reset' restaura el dataset (fuera de la medición) antes de cada iteración"""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable], reset: bool = False):
+        self.name = name
+        self.run = run
+        self.reset = reset
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre valores ya ordenados"""
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+def peak_rss_mb() -> float:
+    """Máximo RSS del proceso hasta el momento (ru_maxrss está en KB en Linux y en bytes en macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+def build_scenarios(http, symbols: List[str], ingest_batch_size: int) -> List[Scenario]:
+    from partitions import PartitionedRecompute, PartitionWorker
+    from services import SentimentService, SentimentTimeseriesService, TweetIngestionService
+
+    top, sample = symbols[0], ",".join(symbols[:20])
+    # El mismo lote en cada iteración: cada inserción recibe _id nuevos
+    ingest_batch = generate_ingest_batch(random.Random(0), symbols, ingest_batch_size)
+    # Sin workers externos: el coordinador procesa todas las particiones
+    partitioned = PartitionedRecompute(worker=PartitionWorker(poll_interval=0.05))
+    return [
+        # Recálculo de symbols_sentiment por modo (sin la reconstrucción de buckets, que se mide aparte)
+        Scenario("recompute.python", lambda: SentimentService._create_symbols_sentiment_python(JobProgress())),
+        Scenario("recompute.aggregation", lambda: SentimentService._create_symbols_sentiment_aggregation(JobProgress())),
+        Scenario("recompute.vectorized", lambda: SentimentService._create_symbols_sentiment_vectorized(JobProgress())),
+        Scenario("recompute.incremental", lambda: SentimentService._create_symbols_sentiment_incremental(JobProgress())),
+        Scenario("recompute.partitioned", lambda: partitioned.run(JobProgress())),
+        Scenario("buckets.rebuild", lambda: SentimentTimeseriesService.rebuild_buckets(symbols)),
+        # Los análisis modifican los tweets: se recarga el dataset antes de cada iteración
+        Scenario("analyze.python", lambda: SentimentService.analyze_and_update_sentiments("python"), reset=True),
+        Scenario("analyze.backfill", lambda: SentimentService.analyze_and_update_sentiments("backfill"), reset=True),
+        Scenario("analyze.classify", lambda: SentimentService.analyze_and_update_sentiments("classify"), reset=True),
+        # Lecturas de servicio
+        Scenario("service.get_symbols_sentiment", SentimentService.get_symbols_sentiment),
+        Scenario("service.query_symbols_sentiment", lambda: SentimentService.query_symbols_sentiment(limit=50)),
+        Scenario("service.get_symbols_sentiment_batch", lambda: SentimentService.get_symbols_sentiment_batch(symbols[:20])),
+        Scenario("service.get_symbols_summary", lambda: SentimentService.get_symbols_summary(limit=50)),
+        Scenario("service.get_timeseries", lambda: SentimentTimeseriesService.get_timeseries(top, window="7d", step="1h")),
+        # Endpoints (ASGI en proceso, sin red)
+        Scenario("GET /symbols-sentiment", lambda: http.get("/symbols-sentiment")),
+        Scenario("GET /symbols-sentiment?limit=50", lambda: http.get("/symbols-sentiment", params={"limit": 50})),
+        Scenario("GET /symbols-sentiment/batch", lambda: http.get("/symbols-sentiment/batch", params={"symbols": sample})),
+        Scenario("GET /symbols-sentiment/{symbol}", lambda: http.get(f"/symbols-sentiment/{top}")),
+        Scenario("GET /symbols-sentiment/{symbol}/timeseries",
+                 lambda: http.get(f"/symbols-sentiment/{top}/timeseries", params={"window": "7d", "step": "1h"})),
+        Scenario("GET /symbols-summary?limit=50", lambda: http.get("/symbols-summary", params={"limit": 50})),
+        Scenario("GET /debug/tweets-count", lambda: http.get("/debug/tweets-count")),
+        # Al final: la ingesta agrega tweets al dataset
+        Scenario(f"ingest.batch({ingest_batch_size})", lambda: TweetIngestionService.ingest_tweets(ingest_batch)),
+        Scenario(f"POST /tweets/batch({ingest_batch_size})", lambda: http.post(
+            "/tweets/batch", json={"tweets": ingest_batch}, headers={"Idempotency-Key": uuid.uuid4().hex}
+        )),
+    ]
+
+async def measure(scenario: Scenario, iterations: int, warmup: int, reset: Callable[[], Awaitable],
+                  counter: Optional[CommandCounter]) -> Dict:
+    durations = []
+    round_trips = []
+    for index in range(warmup + iterations):
+        if scenario.reset:
+            await reset()
+        commands = counter.commands if counter else 0
+        started = time.perf_counter()
+        result = await scenario.run()
+        elapsed = time.perf_counter() - started
+        if hasattr(result, "status_code"):
+            _check(result)
+        if index >= warmup:
+            durations.append(elapsed)
+            if counter:
+                round_trips.append(counter.commands - commands)
+
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+        "ops_per_second": round(len(durations) / sum(durations), 2) if sum(durations) else None,
+        "round_trips": round(sum(round_trips) / len(round_trips), 1) if round_trips else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+async def sustained_ingest(http, symbols: List[str], seconds: float, batch_size: int, concurrency: int) -> Dict:
+    """
+    Throughput sostenido de POST /tweets/batch: 'concurrency' clientes envían lotes
+    distintos sin pausa durante 'seconds'. Los 503 (backpressure) se cuentan aparte.
+    """
+    batches = [generate_ingest_batch(random.Random(seed), symbols, batch_size) for seed in range(concurrency * 4)]
+    latencies = []
+    statuses: Dict[int, int] = {}
+    deadline = time.perf_counter() + seconds
+
+    async def client(index: int):
+        sent = 0
+        while time.perf_counter() < deadline:
+            batch = batches[(index + sent * concurrency) % len(batches)]
+            sent += 1
+            started = time.perf_counter()
+            response = await http.post("/tweets/batch", json={"tweets": batch}, headers={"Idempotency-Key": uuid.uuid4().hex})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            elif response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    accepted = statuses.get(200, 0)
+    return {
+        "seconds": round(elapsed, 2),
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "batches_accepted": accepted,
+        "batches_overloaded": statuses.get(503, 0),
+        "batches_failed": sum(count for status, count in statuses.items() if status not in (200, 503)),
+        "tweets_per_second": round(accepted * batch_size / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+async def reads_during_recompute(http, symbols: List[str], mode: str, concurrency: int,
+                                 interval: float) -> Dict:
+    """
+    Latencia de lecturas (GET /symbols-sentiment/{symbol} y /live) mientras corre un
+    recálculo 'mode' en el mismo proceso, y luego sin carga durante el mismo tiempo.
+    Cada uno de los 'concurrency' clientes envía una solicitud cada 'interval' segundos.
+    Informa también el lag del event loop de cada fase.
+    """
+    from loop_lag import LoopLagMonitor
+    from services import SentimentService
+
+    paths = [f"/symbols-sentiment/{symbol}" for symbol in symbols[:20]] + ["/live"]
+    recompute = getattr(SentimentService, f"_create_symbols_sentiment_{mode}")
+
+    async def phase(load: Optional[Callable[[], Awaitable]], seconds: float) -> Dict:
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        latencies = []
+        started = time.perf_counter()
+        task = asyncio.create_task(load()) if load is not None else None
+
+        def running() -> bool:
+            return not task.done() if task is not None else time.perf_counter() - started < seconds
+
+        async def reader(offset: int):
+            # Una solicitud cada 'interval' segundos; la latencia se mide desde el momento
+            # programado, de modo que incluye la espera hasta que el loop la atiende
+            index = offset
+            scheduled = time.perf_counter()
+            while running():
+                _check(await http.get(paths[index % len(paths)]))
+                latencies.append(time.perf_counter() - scheduled)
+                index += 1
+                scheduled += interval
+                # Sleep también si está atrasado: con el stand-in las solicitudes no suspenden
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+
+        await asyncio.gather(*(reader(index) for index in range(concurrency)))
+        if task is not None:
+            await task
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        latencies.sort()
+        lag = monitor.stats()
+        return {
+            "seconds": round(elapsed, 3),
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+            "loop_lag_p99_ms": lag["window"]["p99_ms"],
+            "loop_lag_max_ms": lag["max_ms"]
+        }
+
+    loaded = await phase(lambda: recompute(JobProgress()), 0)
+    idle = await phase(None, loaded["seconds"])
+    return {"mode": mode, "concurrency": concurrency, "interval_ms": interval * 1000, "idle": idle, "recompute": loaded}
+
+# Campos de contenido de symbols_sentiment que deben coincidir entre modos de recálculo
+EQUIVALENCE_FIELDS = (
+    "sector", "overall_sentiment", "sentiment_counts", "sentiment_percentages", "total_tweets",
+    "tweets_without_sentiment", "confidence_score", "last_tweet_id"
+)
+
+async def check_equivalence(db, modes: List[str]) -> Dict[str, List[str]]:
+    """
+    Reconstruye symbols_sentiment desde cero con el modo 'python' (la referencia) y con
+    cada modo de 'modes', y devuelve por modo las diferencias encontradas (símbolo y campo).
+    """
+    from services import SentimentService
+
+    async def rebuild(mode: str) -> Dict[str, Dict]:
+        await db["symbols_sentiment"].delete_many({})
+        await getattr(SentimentService, f"_create_symbols_sentiment_{mode}")(JobProgress())
+        return {
+            doc["symbol"]: {field: doc.get(field) for field in EQUIVALENCE_FIELDS}
+            async for doc in db["symbols_sentiment"].find({})
+        }
+
+    expected = await rebuild("python")
+    differences = {}
+    for mode in modes:
+        try:
+            actual = await rebuild(mode)
+        except Exception as e:
+            differences[mode] = [f"ERROR {type(e).__name__}: {str(e)[:120]}"]
+            continue
+        mismatches = []
+        for symbol in sorted(set(expected) | set(actual)):
+            if symbol not in actual or symbol not in expected:
+                mismatches.append(f"{symbol}: {'falta en ' + mode if symbol not in actual else 'sobra en ' + mode}")
+                continue
+            for field in EQUIVALENCE_FIELDS:
+                if actual[symbol][field] != expected[symbol][field]:
+                    mismatches.append(f"{symbol}.{field}: python={expected[symbol][field]!r} {mode}={actual[symbol][field]!r}")
+        differences[mode] = mismatches
+    return differences
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    Regresiones respecto del baseline: p50 o p95 más de 'threshold' (fracción) más lentos
+    y al menos 'min_delta_ms' más lentos en valor absoluto, o más round-trips por operación.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None or "error" in current or "error" in previous:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            limit = previous[metric] * (1 + threshold)
+            if current[metric] > limit and current[metric] - previous[metric] >= min_delta_ms:
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]} (límite {limit:.3f})")
+        if previous.get("round_trips") is not None and current.get("round_trips") is not None \
+                and current["round_trips"] > previous["round_trips"]:
+            regressions.append(f"{name}: round_trips {previous['round_trips']} -> {current['round_trips']}")
+    return regressions
+
+def print_table(results: Dict[str, Dict], baseline: Optional[Dict]):
+    print(f"\n{'escenario':<46}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'rt':>7}{'rss MB':>9}{'vs p50':>9}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<46}  ERROR {result['error']}")
+            continue
+        previous = (baseline or {}).get("scenarios", {}).get(name, {})
+        delta = ""
+        if previous.get("p50_ms"):
+            delta = f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:+.0f}%"
+        round_trips = "-" if result["round_trips"] is None else result["round_trips"]
+        print(
+            f"{name:<46}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+            f"{result['ops_per_second'] or '-':>10}{round_trips:>7}{result['peak_rss_mb']:>9}{delta:>9}"
+        )
+
+async def run(args: argparse.Namespace) -> int:
+    import httpx
+    from main import app
+
+    counter = None
+    if args.backend == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            print("El backend 'mongomock' requiere: pip install mongomock-motor")
+            return 2
+        # El stand-in no implementa todos los operadores de agregación: esos escenarios quedan en ERROR
+        Database.client = AsyncMongoMockClient()
+    else:
+        counter = CommandCounter()
+        from motor.motor_asyncio import AsyncIOMotorClient
+        Database.client = AsyncIOMotorClient(args.uri, event_listeners=[counter])
+    settings.DATABASE_NAME = args.database
+    db = Database.get_db()
+
+    config = dict(dataset_config(args), backend=args.backend, iterations=args.iterations, warmup=args.warmup)
+    dataset = generate_dataset(**dataset_config(args))
+    symbols = [symbol["symbol"] for symbol in dataset["symbols"]]
+    print(f"Dataset: {len(symbols)} símbolos, {len(dataset['tweets'])} tweets en la colección "
+          f"y {sum(len(s['tweets']) for s in dataset['symbols'])} embebidos (seed={args.seed})")
+
+    from services import SentimentService, SentimentTimeseriesService, symbols_sentiment_snapshot
+
+    bucket_errors = set()
+
+    async def reset():
+        await load_dataset(db, dataset)
+        # Estado de lectura: symbols_sentiment y buckets calculados sobre el dataset recién cargado
+        await SentimentService._create_symbols_sentiment_python(JobProgress())
+        try:
+            await SentimentTimeseriesService.rebuild_buckets(symbols)
+        except Exception as e:
+            if type(e).__name__ not in bucket_errors:
+                bucket_errors.add(type(e).__name__)
+                print(f"Buckets no disponibles en este backend: {type(e).__name__}: {e}")
+        symbols_sentiment_snapshot.invalidate()
+
+    await Database.ensure_indexes()
+    if args.check_equivalence is not None:
+        await load_dataset(db, dataset)
+        differences = await check_equivalence(db, args.check_equivalence or ["aggregation"])
+        for mode, mismatches in differences.items():
+            print(f"{mode} vs python: {'equivalente' if not mismatches else f'{len(mismatches)} diferencias'}")
+            for mismatch in mismatches[:20]:
+                print(f"  {mismatch}")
+        return 1 if any(differences.values()) else 0
+    await reset()
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as http:
+        for scenario in build_scenarios(http, symbols, args.ingest_batch_size):
+            if args.only and not any(pattern in scenario.name for pattern in args.only):
+                continue
+            try:
+                results[scenario.name] = await measure(scenario, args.iterations, args.warmup, reset, counter)
+            except Exception as e:
+                results[scenario.name] = {"error": f"{type(e).__name__}: {str(e)[:120]}"}
+            if scenario.reset:
+                await reset()
+        recompute_load = None
+        if args.recompute_load:
+            await reset()
+            recompute_load = await reads_during_recompute(
+                http, symbols, args.recompute_load, args.recompute_load_concurrency,
+                args.recompute_load_interval_ms / 1000
+            )
+        ingest = None
+        if args.ingest_seconds > 0:
+            await reset()
+            ingest = await sustained_ingest(
+                http, symbols, args.ingest_seconds, args.ingest_batch_size, args.ingest_concurrency
+            )
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"ADVERTENCIA: el baseline se midió con otra configuración: {baseline.get('config')}")
+    print_table(results, baseline)
+    if ingest is not None:
+        print(
+            f"\nIngesta sostenida ({ingest['concurrency']} clientes, lotes de {ingest['batch_size']}): "
+            f"{ingest['tweets_per_second']} tweets/s, p50 {ingest['p50_ms']} ms, p95 {ingest['p95_ms']} ms, "
+            f"{ingest['batches_accepted']} lotes aceptados, {ingest['batches_overloaded']} con 503, "
+            f"{ingest['batches_failed']} con error"
+        )
+
+    if recompute_load is not None:
+        for phase in ("idle", "recompute"):
+            result = recompute_load[phase]
+            print(
+                f"\nLecturas {'durante el recálculo ' + recompute_load['mode'] if phase == 'recompute' else 'sin carga'} "
+                f"({recompute_load['concurrency']} clientes, {result['seconds']}s): {result['requests']} solicitudes, "
+                f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                f"máx {result['max_ms']} ms; lag del loop p99 {result['loop_lag_p99_ms']} ms, máx {result['loop_lag_max_ms']} ms"
+            )
+
+    report = {
+        "config": config,
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scenarios": results,
+        "ingest": ingest,
+        "recompute_load": recompute_load
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    # El límite de p99 de lecturas durante el recálculo no depende del baseline
+    read_limit_exceeded = recompute_load is not None and args.max_read_p99_ms is not None \
+        and (recompute_load["recompute"]["p99_ms"] or 0) > args.max_read_p99_ms
+    if read_limit_exceeded:
+        print(
+            f"REGRESIÓN lecturas durante el recálculo: p99 {recompute_load['recompute']['p99_ms']} ms "
+            f"(límite {args.max_read_p99_ms} ms)"
+        )
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline guardado en {args.baseline}")
+        return 1 if read_limit_exceeded else 0
+    if baseline is None:
+        print(f"\nSin baseline en {args.baseline} (usar --save-baseline)")
+        return 1 if read_limit_exceeded else 0
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESIÓN {regression}")
+    if not regressions:
+        print(f"\nSin regresiones respecto del baseline (umbral {args.threshold:.0%})")
+    return 1 if regressions or read_limit_exceeded else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de servicios y endpoints con datos sintéticos")
+    add_arguments(parser)
+    parser.add_argument("--backend", choices=["mongomock", "mongodb"], default="mongomock",
+                        help="'mongodb' usa un mongod real (--uri); 'mongomock' un stand-in en memoria")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="sentiment_benchmark", help="Base del benchmark (se vacía)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", nargs="+", help="Medir solo los escenarios que contienen alguno de estos textos")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como nuevo baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Tolerancia de p50/p95 (0.2 = 20%% más lento)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Diferencia absoluta mínima para marcar regresión")
+    parser.add_argument("--output", help="Archivo JSON con los resultados")
+    parser.add_argument("--ingest-batch-size", type=int, default=1000, help="Tweets por lote de los escenarios de ingesta")
+    parser.add_argument("--ingest-seconds", type=float, default=0,
+                        help="Duración de la prueba de ingesta sostenida (0 = no se ejecuta)")
+    parser.add_argument("--ingest-concurrency", type=int, default=8, help="Clientes simultáneos de la ingesta sostenida")
+    parser.add_argument("--check-equivalence", nargs="*", choices=["aggregation", "vectorized", "incremental"],
+                        help="En lugar de medir, comparar symbols_sentiment de estos modos (por defecto "
+                             "'aggregation') con el modo 'python' sobre el dataset y terminar con código 1 si difieren")
+    parser.add_argument("--recompute-load", choices=["python", "aggregation", "vectorized", "incremental"],
+                        help="Medir la latencia de lecturas mientras corre un recálculo de este modo")
+    parser.add_argument("--recompute-load-concurrency", type=int, default=4,
+                        help="Clientes simultáneos de lectura durante el recálculo")
+    parser.add_argument("--recompute-load-interval-ms", type=float, default=10,
+                        help="Intervalo entre solicitudes de cada cliente de lectura")
+    parser.add_argument("--max-read-p99-ms", type=float,
+                        help="p99 máximo de las lecturas durante el recálculo (si se supera, termina con código 1)")
+    args = parser.parse_args()
+
+    if args.backend == "mongodb" and args.database == os.getenv("DATABASE_NAME", settings.DATABASE_NAME):
+        parser.error("--database no puede ser la base de la API: el benchmark la vacía")
+    sys.exit(asyncio.run(run(args)))
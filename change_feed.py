@@ -0,0 +1,345 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from database import Database
+from services import SentimentService
+
+# Campos del tweet que afectan al sentimiento normalizado
+SENTIMENT_FIELDS = ("sentiment", "sentiment_prob")
+
+class MongoChangeSource:
+    """Fuente de eventos basada en un change stream de MongoDB sobre la colección tweets"""
+
+    def __init__(self, collection, max_await_time_ms: int = 1000):
+        self.collection = collection
+        self.max_await_time_ms = max_await_time_ms
+        self._stream = None
+
+    async def open(self, resume_token: Optional[Dict] = None):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        self._stream = self.collection.watch(
+            pipeline,
+            resume_after=resume_token,
+            full_document="updateLookup",
+            full_document_before_change="whenAvailable",
+            max_await_time_ms=self.max_await_time_ms
+        )
+
+    async def try_next(self) -> Optional[Dict]:
+        """Devuelve el próximo evento o None si no llegó ninguno dentro de max_await_time_ms"""
+        return await self._stream.try_next()
+
+    async def close(self):
+        if self._stream is not None:
+            await self._stream.close()
+            self._stream = None
+
+class InMemoryChangeSource:
+    """
+    Fuente de eventos en memoria con la misma interfaz que MongoChangeSource.
+    Pensada para pruebas y desarrollo sin replica set: los eventos se publican con push()
+    y el token de reanudación es la posición del evento en el historial.
+    """
+
+    def __init__(self, max_await_time_ms: int = 1000):
+        self.max_await_time_ms = max_await_time_ms
+        self._events: List[Dict] = []
+        self._position = 0
+        self._new_event = asyncio.Event()
+
+    def push(self, event: Dict):
+        event = dict(event)
+        event["_id"] = {"_data": len(self._events) + 1}
+        event.setdefault("wallTime", datetime.utcnow())
+        self._events.append(event)
+        self._new_event.set()
+
+    async def open(self, resume_token: Optional[Dict] = None):
+        self._position = resume_token["_data"] if resume_token else 0
+
+    async def try_next(self) -> Optional[Dict]:
+        if self._position >= len(self._events):
+            self._new_event.clear()
+            try:
+                await asyncio.wait_for(self._new_event.wait(), timeout=self.max_await_time_ms / 1000)
+            except asyncio.TimeoutError:
+                return None
+            if self._position >= len(self._events):
+                return None
+        event = self._events[self._position]
+        self._position += 1
+        return event
+
+    async def close(self):
+        pass
+
+class SentimentChangeFeed:
+    """
+    Consumidor en segundo plano que mantiene symbols_sentiment casi en tiempo real.
+
+    Lee los cambios de la colección tweets, los agrupa en micro-lotes por 'company'
+    (hasta 'batch_size' eventos o 'flush_interval' segundos) y aplica los deltas con
+    SentimentService.apply_sentiment_changes. El token de reanudación del último evento
+    aplicado se guarda en la colección 'change_feed_state'; con transacciones se guarda
+    en la misma transacción que los deltas, de modo que un reinicio no pierde ni
+    duplica eventos.
+    
+    Sin transacciones, los eventos ya aplicados que se releen tras un reinicio se
+    descartan por la posición guardada en cada documento de symbols_sentiment
+    ('feed_position', escrita junto con sus conteos); los buckets y los agregados por
+    sector pueden perder ese último micro-lote hasta la próxima reconstrucción.
+    La posición es el '_data' del token: en MongoDB un string hexadecimal que ordena
+    como los eventos del stream.
+    """
+
+    STATE_COLLECTION = "change_feed_state"
+    MAX_CONFLICT_RETRIES = 5
+
+    def __init__(self, source=None, flush_interval: float = None, batch_size: int = None,
+                 use_transactions: bool = None, name: str = "tweets"):
+        self.source = source
+        self.flush_interval = flush_interval if flush_interval is not None else settings.FEED_FLUSH_INTERVAL_SECONDS
+        self.batch_size = batch_size if batch_size is not None else settings.FEED_BATCH_SIZE
+        self.use_transactions = (
+            use_transactions if use_transactions is not None else settings.FEED_USE_TRANSACTIONS
+        )
+        self.name = name
+
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._buffer: List[Dict] = []
+        self._oldest_pending: Optional[float] = None
+
+        # Estadísticas expuestas por status()
+        self.events_received = 0
+        self.events_applied = 0
+        self.events_skipped = 0
+        self.events_unresolved = 0
+        self.batches_flushed = 0
+        self.last_flush_at: Optional[datetime] = None
+        self.last_event_time: Optional[datetime] = None
+        self.last_batch_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """Inicia el consumidor en una tarea de asyncio"""
+        if self.source is None:
+            db = Database.get_db()
+            self.source = MongoChangeSource(db["tweets"], max_await_time_ms=int(self.flush_interval * 1000))
+        self._task = asyncio.create_task(self._run())
+        print(f"Change feed de sentimientos iniciado (lote={self.batch_size}, intervalo={self.flush_interval}s)")
+
+    async def stop(self):
+        """Detiene el consumidor aplicando antes los eventos pendientes"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            # La cancelación no interrumpe un micro-lote a medias: se espera a que termine
+            # y solo se aplica lo que haya quedado sin aplicar
+            try:
+                await self._flushing
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            self._flushing = None
+        if self._buffer:
+            await self.flush()
+        await self.source.close()
+        print("Change feed de sentimientos detenido")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def lag_seconds(self) -> float:
+        """Antigüedad del evento pendiente más viejo (0 si no hay eventos sin aplicar)"""
+        if self._oldest_pending is None:
+            return 0.0
+        return round(time.monotonic() - self._oldest_pending, 3)
+
+    def status(self) -> Dict:
+        return {
+            "running": self.running,
+            "lag_seconds": self.lag_seconds(),
+            "pending_events": len(self._buffer),
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "events_received": self.events_received,
+            "events_applied": self.events_applied,
+            "events_skipped": self.events_skipped,
+            "events_unresolved": self.events_unresolved,
+            "batches_flushed": self.batches_flushed,
+            "last_flush_at": self.last_flush_at,
+            "last_event_time": self.last_event_time,
+            "last_batch_latency_seconds": self.last_batch_latency,
+            "last_error": self.last_error
+        }
+
+    async def _load_resume_token(self) -> Optional[Dict]:
+        db = Database.get_db()
+        state = await db[self.STATE_COLLECTION].find_one({"_id": self.name})
+        return state.get("resume_token") if state else None
+
+    async def _save_resume_token(self, resume_token: Dict, session=None):
+        db = Database.get_db()
+        await db[self.STATE_COLLECTION].update_one(
+            {"_id": self.name},
+            {"$set": {"resume_token": resume_token, "updated_at": datetime.utcnow()}},
+            upsert=True,
+            session=session
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.source.open(await self._load_resume_token())
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    event = await self.source.try_next()
+                    if event is not None:
+                        self.events_received += 1
+                        if self._oldest_pending is None:
+                            self._oldest_pending = time.monotonic()
+                        self._buffer.append(event)
+
+                    if self._buffer and (len(self._buffer) >= self.batch_size or time.monotonic() >= deadline):
+                        self._flushing = asyncio.ensure_future(self.flush())
+                        await asyncio.shield(self._flushing)
+                        self._flushing = None
+                    if time.monotonic() >= deadline:
+                        deadline = time.monotonic() + self.flush_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Reabrir desde el último token guardado; los eventos no aplicados se releen
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Error en el change feed de sentimientos: {self.last_error}")
+                self._buffer = []
+                self._flushing = None
+                self._oldest_pending = None
+                await self.source.close()
+                await asyncio.sleep(self.flush_interval)
+
+    @staticmethod
+    def _event_changes(event: Dict) -> Tuple[List[Tuple[str, Tuple]], bool]:
+        """
+        Traduce un evento a cambios (company, (tweet_id, anterior, nuevo, created_at,
+        delta_sin_sentimiento, posición, momento)); ver apply_sentiment_changes.
+        El segundo valor indica si el evento no pudo resolverse (falta la imagen previa).
+        """
+        operation = event.get("operationType")
+        document_key = event.get("documentKey", {})
+        tweet_id = document_key.get("_id")
+        after = event.get("fullDocument")
+        before = event.get("fullDocumentBeforeChange")
+        position = event["_id"]["_data"]
+        changed_at = event.get("wallTime")
+        if changed_at is None and event.get("clusterTime") is not None:
+            changed_at = event["clusterTime"].as_datetime().replace(tzinfo=None)
+
+        def normalized(doc: Dict) -> str:
+            return SentimentService._normalize_sentiment(doc.get("sentiment", ""), doc.get("sentiment_prob", None))
+
+        def unlabeled(doc: Dict) -> int:
+            return 0 if SentimentService._has_sentiment(doc.get("sentiment", ""), doc.get("sentiment_prob", None)) else 1
+
+        if operation == "insert":
+            # Los tweets de POST /tweets/batch los cuenta su lote
+            if not after or not after.get("company") or after.get("ingest_batch"):
+                return [], False
+            return [(after["company"], (
+                tweet_id, None, normalized(after), after.get("created_at"), unlabeled(after), position, changed_at
+            ))], False
+
+        if operation in ("update", "replace"):
+            if operation == "update":
+                description = event.get("updateDescription", {})
+                touched = list(description.get("updatedFields", {})) + list(description.get("removedFields", []))
+                if not any(field.split(".")[0] in SENTIMENT_FIELDS + ("company",) for field in touched):
+                    return [], False
+            if not before or not after:
+                return [], True
+            if before.get("company") != after.get("company"):
+                # Los cambios de company requieren una reconstrucción completa
+                return [], True
+            old_sentiment, new_sentiment = normalized(before), normalized(after)
+            unlabeled_step = unlabeled(after) - unlabeled(before)
+            if (old_sentiment == new_sentiment and unlabeled_step == 0) or not after.get("company"):
+                return [], False
+            created_at = after.get("created_at") or before.get("created_at")
+            return [(after["company"], (
+                tweet_id, old_sentiment, new_sentiment, created_at, unlabeled_step, position, changed_at
+            ))], False
+
+        if operation == "delete":
+            if not before:
+                return [], True
+            if not before.get("company"):
+                return [], False
+            return [(before["company"], (
+                tweet_id, normalized(before), None, before.get("created_at"), -unlabeled(before), position, changed_at
+            ))], False
+
+        return [], False
+
+    def _group_changes(self, events: List[Dict]) -> Dict[str, List[Tuple]]:
+        changes: Dict[str, List[Tuple]] = {}
+        for event in events:
+            event_changes, unresolved = self._event_changes(event)
+            if unresolved:
+                self.events_unresolved += 1
+            for company, change in event_changes:
+                changes.setdefault(company, []).append(change)
+        return changes
+
+    async def _apply(self, changes: Dict[str, List[Tuple]], resume_token: Any, session=None) -> Dict:
+        """Aplica los cambios reintentando los símbolos en conflicto y guarda el token"""
+        totals = {"applied": 0, "skipped": 0}
+        pending = changes
+        for _ in range(self.MAX_CONFLICT_RETRIES):
+            result = await SentimentService.apply_sentiment_changes(pending, session=session)
+            totals["applied"] += result["applied"]
+            totals["skipped"] += result["skipped"]
+            if not result["conflicts"]:
+                break
+            pending = {symbol: changes[symbol] for symbol in result["conflicts"]}
+        else:
+            raise RuntimeError(f"Conflictos persistentes al aplicar cambios: {sorted(pending)}")
+        await self._save_resume_token(resume_token, session=session)
+        return totals
+
+    async def flush(self):
+        """Aplica el micro-lote pendiente y avanza el token de reanudación"""
+        if not self._buffer:
+            return
+        events = self._buffer
+        changes = self._group_changes(events)
+        resume_token = events[-1]["_id"]
+
+        if self.use_transactions:
+            async with await Database.client.start_session() as session:
+                totals = {}
+
+                async def apply_in_transaction(session):
+                    totals.update(await self._apply(changes, resume_token, session=session))
+
+                await session.with_transaction(apply_in_transaction)
+        else:
+            totals = await self._apply(changes, resume_token)
+
+        self.events_applied += totals["applied"]
+        self.events_skipped += totals["skipped"]
+        self.batches_flushed += 1
+        self.last_flush_at = datetime.utcnow()
+        self.last_event_time = events[-1].get("wallTime")
+        self.last_batch_latency = round(time.monotonic() - self._oldest_pending, 3) if self._oldest_pending else None
+        self._buffer = []
+        self._oldest_pending = None
+        self.last_error = None
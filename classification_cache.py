@@ -0,0 +1,148 @@
+import hashlib
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from classifier import SOURCE, TweetClassifier
+from config import settings
+from database import Database
+
+Label = Tuple[str, Dict[str, float]]
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_MENTION_RE = re.compile(r"@\w+")
+_RETWEET_RE = re.compile(r"^(rt\s+)+")
+_SPACES_RE = re.compile(r"\s+")
+_ACCENTS = str.maketrans("áéíóúüàèìòùâêîôû", "aeiouuaeiouaeiou")
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Forma canónica de un tweet para detectar copias: minúsculas, sin tildes, sin URLs,
+    menciones ni prefijo 'RT', con los espacios colapsados.
+    """
+    text = (text or "").lower().translate(_ACCENTS)
+    text = _URL_RE.sub(" ", text)
+    text = _MENTION_RE.sub(" ", text)
+    text = _SPACES_RE.sub(" ", text).strip()
+    return _RETWEET_RE.sub("", text).strip(": ")
+
+def text_hash(text: Optional[str]) -> str:
+    """Clave del texto normalizado; incluye la versión del clasificador"""
+    return hashlib.sha1(f"{SOURCE}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """Caché LRU acotada con contadores de aciertos, fallos y desalojos"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Label]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Label]:
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Label):
+        if self.max_size <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+class ClassificationCache:
+    """
+    Resultados de clasificación direccionados por contenido.
+
+    Cada texto se resuelve, en orden, por: copias dentro del mismo lote, la LRU en
+    memoria del proceso y la colección 'classification_cache' (hash -> sentiment,
+    sentiment_prob) compartida entre workers. Solo los textos nunca vistos llegan al
+    clasificador, y su resultado se guarda en ambos niveles.
+    """
+
+    COLLECTION = "classification_cache"
+
+    def __init__(self, max_size: int = None):
+        self.memory = LRUCache(max_size if max_size is not None else settings.CLASSIFICATION_CACHE_SIZE)
+        self.batch_duplicates = 0
+        self.store_hits = 0
+        self.store_misses = 0
+
+    async def resolve(self, texts: List[Optional[str]], classifier: TweetClassifier) -> List[Label]:
+        """(sentiment, sentiment_prob) de cada texto, en el mismo orden"""
+        keys = [text_hash(text) for text in texts]
+        resolved: Dict[str, Label] = {}
+        pending: Dict[str, Optional[str]] = {}
+        for key, text in zip(keys, texts):
+            if key in resolved or key in pending:
+                self.batch_duplicates += 1
+                continue
+            label = self.memory.get(key)
+            if label is not None:
+                resolved[key] = label
+            else:
+                pending[key] = text
+
+        if pending:
+            collection = Database.get_db()[self.COLLECTION]
+            async for entry in collection.find({"_id": {"$in": list(pending)}}):
+                label = (entry["sentiment"], entry["sentiment_prob"])
+                resolved[entry["_id"]] = label
+                self.memory.put(entry["_id"], label)
+                del pending[entry["_id"]]
+                self.store_hits += 1
+
+        if pending:
+            self.store_misses += len(pending)
+            labels = await classifier.classify(list(pending.values()))
+            now = datetime.utcnow()
+            operations = []
+            for key, (sentiment, probabilities) in zip(pending, labels):
+                resolved[key] = (sentiment, probabilities)
+                self.memory.put(key, (sentiment, probabilities))
+                operations.append(UpdateOne(
+                    {"_id": key},
+                    {"$setOnInsert": {
+                        "sentiment": sentiment, "sentiment_prob": probabilities, "source": SOURCE, "created_at": now
+                    }},
+                    upsert=True
+                ))
+            await Database.get_db()[self.COLLECTION].bulk_write(operations, ordered=False)
+
+        return [resolved[key] for key in keys]
+
+    def stats(self) -> Dict:
+        """Contadores de este proceso desde el arranque"""
+        lookups = self.memory.hits + self.memory.misses + self.batch_duplicates
+        reused = self.memory.hits + self.batch_duplicates + self.store_hits
+        return {
+            "lookups": lookups,
+            "batch_duplicates": self.batch_duplicates,
+            "memory_hits": self.memory.hits,
+            "memory_misses": self.memory.misses,
+            "store_hits": self.store_hits,
+            "store_misses": self.store_misses,
+            "hit_ratio": round(reused / lookups, 4) if lookups else None,
+            "memory_hit_ratio": round(self.memory.hits / (self.memory.hits + self.memory.misses), 4)
+            if self.memory.hits + self.memory.misses else None,
+            "evictions": self.memory.evictions,
+            "memory_size": len(self.memory),
+            "memory_max_size": self.memory.max_size
+        }
+
+# Caché de clasificaciones del proceso
+classification_cache = ClassificationCache()
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+# Clasificador léxico de sentimiento para tweets financieros en español (CPU, sin conexión).
+# Este módulo no importa la base ni los servicios: los procesos del pool solo cargan esto
+# y la configuración.
+
+# Etiqueta que se escribe en 'sentiment_source' de los tweets clasificados aquí
+SOURCE = "lexicon-v1"
+
+POSITIVE_TERMS = {
+    "sube": 1.0, "suben": 1.0, "subio": 1.0, "subiendo": 1.0, "suba": 1.0, "alza": 1.0, "alcista": 1.5,
+    "gana": 1.0, "ganan": 1.0, "ganancia": 1.0, "ganancias": 1.0, "rebote": 1.0, "rebota": 1.0,
+    "recupera": 1.0, "recuperacion": 1.0, "crece": 1.0, "crecimiento": 1.0, "record": 1.0,
+    "maximo": 0.8, "maximos": 0.8, "compra": 0.8, "comprar": 0.8, "comprado": 0.5, "dividendo": 0.8,
+    "dividendos": 0.8, "supera": 0.8, "superavit": 1.0, "optimismo": 1.2, "optimista": 1.2,
+    "bueno": 0.8, "buena": 0.8, "buenos": 0.8, "buenas": 0.8, "excelente": 1.5, "positivo": 1.0,
+    "positiva": 1.0, "fuerte": 0.5, "solido": 0.8, "solidos": 0.8, "mejora": 1.0, "mejoras": 1.0,
+    "verde": 0.5, "vuela": 1.5, "dispara": 1.2, "disparo": 1.2, "bullish": 1.5, "long": 0.5,
+    "oportunidad": 0.8, "rally": 1.2, "upgrade": 1.2, "acuerdo": 0.5, "beneficio": 0.8,
+    "beneficios": 0.8, "rentable": 1.0, "rentabilidad": 0.8, "🚀": 1.5, "📈": 1.2, "💰": 0.8, "🔥": 0.5,
+}
+
+NEGATIVE_TERMS = {
+    "cae": 1.0, "caen": 1.0, "cayo": 1.0, "cayendo": 1.0, "caida": 1.0, "baja": 0.8, "bajan": 0.8,
+    "bajista": 1.5, "pierde": 1.0, "pierden": 1.0, "perdida": 1.0, "perdidas": 1.0, "derrumbe": 1.5,
+    "desplome": 1.5, "desploma": 1.5, "hunde": 1.2, "crisis": 1.2, "riesgo": 0.6,
+    "default": 1.5, "quiebra": 1.5, "deficit": 1.0, "devaluacion": 1.2, "inflacion": 0.6,
+    "minimo": 0.8, "minimos": 0.8, "vende": 0.8, "vender": 0.8, "venta": 0.5, "ventas": 0.3,
+    "malo": 0.8, "mala": 0.8, "malos": 0.8, "malas": 0.8, "pesimo": 1.5, "negativo": 1.0,
+    "negativa": 1.0, "debil": 0.8, "rojo": 0.5, "panico": 1.5, "miedo": 1.0, "bearish": 1.5,
+    "short": 0.5, "downgrade": 1.2, "deuda": 0.5, "recesion": 1.2, "incertidumbre": 0.8,
+    "preocupa": 1.0, "preocupacion": 1.0, "fraude": 1.5, "multa": 1.0, "📉": 1.2, "💩": 1.0,
+}
+
+NEGATORS = {"no", "nunca", "sin", "ni", "tampoco", "jamas"}
+INTENSIFIERS = {"muy": 1.5, "mucho": 1.3, "mucha": 1.3, "gran": 1.3, "enorme": 1.5, "super": 1.5, "fuertemente": 1.5}
+
+# Cantidad de tokens afectados por un negador
+NEGATION_SCOPE = 3
+
+# Peso fijo del sentimiento neutral: un tweet sin términos del léxico queda neutral
+NEUTRAL_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"[a-zñ]+|[\U0001F300-\U0001FAFF]")
+
+# Tildes y diéresis a su vocal base (la ñ se conserva)
+_ACCENTS = str.maketrans("áéíóúüàèìòùâêîôû", "aeiouuaeiouaeiou")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower().translate(_ACCENTS))
+
+def score_text(text: Optional[str]) -> Tuple[str, Dict[str, float]]:
+    """
+    Clasifica un texto y devuelve (sentiment, sentiment_prob) con sentiment_prob en la
+    forma que entiende SentimentService._normalize_sentiment: {"pos", "neg", "neu"}.
+    """
+    positive = 0.0
+    negative = 0.0
+    negated = 0
+    boost = 1.0
+    for token in tokenize(text or ""):
+        if token in NEGATORS:
+            negated = NEGATION_SCOPE
+            continue
+        if token in INTENSIFIERS:
+            boost = INTENSIFIERS[token]
+            continue
+        weight_pos = POSITIVE_TERMS.get(token, 0.0) * boost
+        weight_neg = NEGATIVE_TERMS.get(token, 0.0) * boost
+        if negated:
+            weight_pos, weight_neg = weight_neg, weight_pos
+            negated -= 1
+        positive += weight_pos
+        negative += weight_neg
+        boost = 1.0
+
+    total = positive + negative + NEUTRAL_WEIGHT
+    probabilities = {
+        "pos": round(positive / total, 4),
+        "neg": round(negative / total, 4),
+        "neu": round(NEUTRAL_WEIGHT / total, 4)
+    }
+    best = max(probabilities, key=probabilities.get)
+    sentiment = {"pos": "positivo", "neg": "negativo", "neu": "neutral"}[best]
+    return sentiment, probabilities
+
+def classify_texts(texts: List[Optional[str]]) -> List[Tuple[str, Dict[str, float]]]:
+    """Clasifica un lote de textos (se ejecuta dentro de los procesos del pool)"""
+    return [score_text(text) for text in texts]
+
+class TweetClassifier:
+    """
+    Clasifica lotes de textos repartiéndolos entre 'workers' procesos.
+    Con workers=0 clasifica en el proceso actual (útil en desarrollo y pruebas).
+    """
+
+    def __init__(self, workers: int = None, batch_size: int = None):
+        self.workers = workers if workers is not None else settings.CLASSIFIER_WORKERS
+        self.batch_size = batch_size or settings.CLASSIFIER_BATCH_SIZE
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # 'spawn': no se hereda el estado del event loop ni el cliente de MongoDB
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def classify(self, texts: List[Optional[str]]) -> List[Tuple[str, Dict[str, float]]]:
+        """Clasifica los textos en paralelo, un trozo por proceso, preservando el orden"""
+        if not texts:
+            return []
+        if self.workers <= 0:
+            return classify_texts(texts)
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        chunk_size = max(1, -(-len(texts) // self.workers))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        results = await asyncio.gather(*(loop.run_in_executor(pool, classify_texts, chunk) for chunk in chunks))
+        return [item for chunk in results for item in chunk]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+def _synthetic_tweets(count: int, seed: int = 7) -> List[str]:
+    """Tweets de ejemplo con términos del léxico, negaciones y ruido"""
+    rng = random.Random(seed)
+    vocabulary = list(POSITIVE_TERMS) + list(NEGATIVE_TERMS) + [
+        "hoy", "el", "merval", "la", "accion", "de", "ggal", "ypf", "pampa", "dolar", "mercado",
+        "bonos", "riesgo pais", "cierre", "apertura", "semana", "balance", "trimestre", "$", "%"
+    ] * 3 + list(NEGATORS) + list(INTENSIFIERS)
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 30))) for _ in range(count)]
+
+def benchmark(tweets: int, workers_list: List[int], batch_size: int) -> List[Dict]:
+    """Mide tweets/s totales y por núcleo para cada cantidad de procesos"""
+    texts = _synthetic_tweets(tweets)
+    results = []
+    for workers in workers_list:
+        classifier = TweetClassifier(workers=workers, batch_size=batch_size)
+
+        async def run():
+            # Arranque del pool fuera de la medición
+            await classifier.classify(texts[:workers or 1])
+            started = time.perf_counter()
+            for offset in range(0, len(texts), batch_size):
+                await classifier.classify(texts[offset:offset + batch_size])
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(run())
+        classifier.close()
+        rate = tweets / elapsed
+        results.append({
+            "workers": workers,
+            "tweets": tweets,
+            "seconds": round(elapsed, 3),
+            "tweets_per_second": round(rate),
+            "tweets_per_second_per_core": round(rate / max(workers, 1))
+        })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clasificador léxico de tweets")
+    parser.add_argument("--benchmark", action="store_true", help="Medir el rendimiento en tweets/s")
+    parser.add_argument("--tweets", type=int, default=200000, help="Tweets sintéticos del benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, os.cpu_count() or 1],
+                        help="Cantidades de procesos a medir (0 = en el proceso actual)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Tweets por lote")
+    parser.add_argument("text", nargs="*", help="Textos a clasificar")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for row in benchmark(args.tweets, sorted(set(args.workers)), args.batch_size):
+            print(
+                f"workers={row['workers']:>2}  {row['tweets_per_second']:>9} tweets/s  "
+                f"{row['tweets_per_second_per_core']:>9} tweets/s por núcleo  ({row['seconds']}s)"
+            )
+    for text in args.text:
+        sentiment, probabilities = score_text(text)
+        print(f"{sentiment:<9} {probabilities}  {text}")
@@ -0,0 +1,300 @@
+"""
+Copia columnar de la colección tweets para backtests y simulaciones sin consultar MongoDB.
+
+Cada exportación agrega segmentos (solo se agregan, nunca se reescriben) con los tweets
+cuyo _id supera el último exportado. Un segmento es un directorio con arreglos .npy:
+- company.npy: código int32 del símbolo (índice en 'companies' del manifiesto; -1 sin company)
+- sentiment.npy: código int8 del sentimiento normalizado (scoring.SENTIMENTS; -1 sin etiqueta)
+- sentiment_prob.npy: matriz float64 (tweets x claves 'prob_keys' del segmento)
+- sentiment_prob_order.npy: matriz int16 con la posición de cada clave en el tweet, para
+  resolver los empates como el recorrido escalar (los segmentos anteriores a este archivo
+  los resuelven por el orden de 'prob_keys' hasta reexportar con --full)
+- created_at.npy: milisegundos UTC en int64 (MISSING_CREATED_AT si no es una fecha)
+- id.npy: los 12 bytes del ObjectId de cada tweet (uint8), ordenados de forma creciente
+
+El motor de recálculo abre los segmentos con memory-map y produce los mismos documentos
+de symbols_sentiment que la reconstrucción completa, usando el motor vectorizado de scoring.
+
+Los cambios de sentimiento de tweets ya exportados no se reflejan: para eso se reexporta
+con --full.
+
+    python columnar.py export [--full]
+    python columnar.py recompute [--dominant 0.65 --mixed 0.35] [--until 2025-01-01] [--output docs.ndjson]
+    python columnar.py recompute --compare
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+
+from config import settings
+from database import Database
+from scoring import SENTIMENTS, SentimentEncoder, build_symbol_docs, count_by_symbol, normalize_codes
+
+MANIFEST = "manifest.json"
+MISSING_CREATED_AT = np.iinfo(np.int64).min
+_EPOCH = datetime(1970, 1, 1)
+
+def _millis(value) -> int:
+    if not isinstance(value, datetime):
+        return MISSING_CREATED_AT
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+def _parse_date(value: str) -> int:
+    return _millis(datetime.fromisoformat(value))
+
+class ColumnarStore:
+    """Directorio con el manifiesto y los segmentos de una exportación"""
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.COLUMNAR_DIR
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"companies": [], "symbols": [], "segments": [], "last_id": None, "exported_at": None}
+
+    def _write_manifest(self):
+        # Reemplazo atómico: un lector nunca ve un manifiesto a medio escribir
+        temporary = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(temporary, os.path.join(self.path, MANIFEST))
+
+    def reset(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.manifest = self._read_manifest()
+
+    def _write_segment(self, tweets: List[Dict], company_codes: Dict[str, int]):
+        encoder = SentimentEncoder()
+        label_codes, probs, order = encoder.encode(tweets)
+        companies = np.empty(len(tweets), dtype=np.int32)
+        for row, tweet in enumerate(tweets):
+            company = tweet.get("company")
+            if isinstance(company, str):
+                code = company_codes.get(company)
+                if code is None:
+                    code = company_codes[company] = len(self.manifest["companies"])
+                    self.manifest["companies"].append(company)
+                companies[row] = code
+            else:
+                companies[row] = -1
+
+        name = f"segment-{len(self.manifest['segments']):05d}"
+        temporary = os.path.join(self.path, name + ".tmp")
+        os.makedirs(temporary, exist_ok=True)
+        np.save(os.path.join(temporary, "company.npy"), companies)
+        np.save(os.path.join(temporary, "sentiment.npy"), label_codes)
+        np.save(os.path.join(temporary, "sentiment_prob.npy"), probs)
+        np.save(os.path.join(temporary, "sentiment_prob_order.npy"), order)
+        np.save(os.path.join(temporary, "created_at.npy"),
+                np.fromiter((_millis(tweet.get("created_at")) for tweet in tweets), dtype=np.int64, count=len(tweets)))
+        np.save(os.path.join(temporary, "id.npy"),
+                np.frombuffer(b"".join(tweet["_id"].binary for tweet in tweets), dtype=np.uint8).reshape(-1, 12))
+        os.replace(temporary, os.path.join(self.path, name))
+
+        self.manifest["segments"].append({"name": name, "rows": len(tweets), "prob_keys": encoder.prob_keys})
+        self.manifest["last_id"] = str(tweets[-1]["_id"])
+        self._write_manifest()
+
+    async def export(self, full: bool = False, segment_size: int = None) -> Dict:
+        """Agrega a la copia los tweets nuevos (o todos con full=True) en segmentos de segment_size"""
+        segment_size = segment_size or settings.COLUMNAR_SEGMENT_SIZE
+        if full:
+            self.reset()
+        os.makedirs(self.path, exist_ok=True)
+        db = Database.get_db()
+
+        query = {"_id": {"$type": "objectId"}}
+        if self.manifest["last_id"]:
+            query["_id"]["$gt"] = ObjectId(self.manifest["last_id"])
+        company_codes = {company: code for code, company in enumerate(self.manifest["companies"])}
+
+        exported = 0
+        segments = 0
+        tweets = []
+        cursor = db["tweets"].find(
+            query, {"company": 1, "sentiment": 1, "sentiment_prob": 1, "created_at": 1}
+        ).sort("_id", 1).batch_size(max(settings.CURSOR_BATCH_SIZE, 1000))
+        async for tweet in cursor:
+            tweets.append(tweet)
+            if len(tweets) >= segment_size:
+                self._write_segment(tweets, company_codes)
+                exported += len(tweets)
+                segments += 1
+                tweets = []
+        if tweets:
+            self._write_segment(tweets, company_codes)
+            exported += len(tweets)
+            segments += 1
+
+        # Símbolos y sectores vigentes (un único sector por símbolo: el último gana)
+        sectors = {}
+        async for symbol in db["symbols"].find({}, {"symbol": 1, "sector": 1}):
+            sectors[symbol.get("symbol", "Unknown")] = symbol.get("sector", None)
+        self.manifest["symbols"] = [{"symbol": name, "sector": sector} for name, sector in sectors.items()]
+        self.manifest["exported_at"] = datetime.utcnow().isoformat()
+        self._write_manifest()
+        return {
+            "tweets_exported": exported,
+            "segments_written": segments,
+            "total_segments": len(self.manifest["segments"]),
+            "total_tweets": sum(segment["rows"] for segment in self.manifest["segments"])
+        }
+
+    def _open(self, segment: Dict, column: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, segment["name"], f"{column}.npy"), mmap_mode="r")
+
+    def recompute(self, dominant_threshold: float = 0.6, mixed_threshold: float = 0.4,
+                  since: Optional[int] = None, until: Optional[int] = None) -> Dict:
+        """
+        Documentos de symbols_sentiment calculados desde los segmentos, sin base de datos.
+        'since'/'until' (milisegundos UTC) limitan los tweets por created_at; con un
+        límite, los tweets sin fecha quedan afuera.
+        """
+        symbols = self.manifest["symbols"]
+        symbol_names = [symbol["symbol"] for symbol in symbols]
+        symbol_index = {name: index for index, name in enumerate(symbol_names)}
+        # Código de company -> índice de símbolo (-1: company sin símbolo)
+        company_to_symbol = np.array(
+            [symbol_index.get(company, -1) for company in self.manifest["companies"]] + [-1], dtype=np.int64
+        )
+
+        counts = np.zeros((len(symbol_names), len(SENTIMENTS)), dtype=np.int64)
+        last_rows = []
+        tweets_processed = 0
+        for segment in self.manifest["segments"]:
+            companies = self._open(segment, "company")
+            # El código -1 indexa el centinela final de company_to_symbol
+            symbol_codes = company_to_symbol[companies]
+            keep = symbol_codes >= 0
+            if since is not None or until is not None:
+                created_at = self._open(segment, "created_at")
+                keep &= created_at != MISSING_CREATED_AT
+                if since is not None:
+                    keep &= created_at >= since
+                if until is not None:
+                    keep &= created_at < until
+            rows = np.flatnonzero(keep)
+            if len(rows) == 0:
+                continue
+
+            encoder = SentimentEncoder()
+            for key in segment["prob_keys"]:
+                encoder.prob_column(key)
+            label_codes = np.asarray(self._open(segment, "sentiment")[rows])
+            probs = np.asarray(self._open(segment, "sentiment_prob")[rows]) if segment["prob_keys"] \
+                else np.zeros((len(rows), 0))
+            order = None
+            if segment["prob_keys"] and os.path.exists(os.path.join(self.path, segment["name"], "sentiment_prob_order.npy")):
+                order = np.asarray(self._open(segment, "sentiment_prob_order")[rows])
+            codes = normalize_codes(label_codes, probs, encoder.prob_key_codes(), order)
+            counts += count_by_symbol(symbol_codes[rows], codes, len(symbol_names))
+            tweets_processed += len(rows)
+
+            # Los _id crecen dentro y entre segmentos: la última fila de cada símbolo es su marca de agua
+            last = np.full(len(symbol_names), -1, dtype=np.int64)
+            np.maximum.at(last, symbol_codes[rows], rows)
+            last_rows.append((segment, last))
+
+        last_tweet_ids = [None] * len(symbol_names)
+        for segment, last in last_rows:
+            present = np.flatnonzero(last >= 0)
+            if len(present):
+                ids = self._open(segment, "id")
+                for index in present:
+                    last_tweet_ids[index] = ObjectId(bytes(ids[last[index]]))
+
+        docs = build_symbol_docs(
+            symbol_names, [symbol["sector"] for symbol in symbols], counts, last_tweet_ids,
+            dominant_threshold, mixed_threshold
+        )
+        return {"docs": docs, "tweets_processed": tweets_processed}
+
+async def compare_with_database(docs: List[Dict]) -> Dict:
+    """Diferencias con la colección symbols_sentiment vigente"""
+    fields = ("overall_sentiment", "sentiment_counts", "total_tweets", "confidence_score")
+    current = {}
+    async for doc in Database.get_db()["symbols_sentiment"].find({}, {field: 1 for field in ("symbol",) + fields}):
+        current[doc["symbol"]] = doc
+    differences = []
+    for doc in docs:
+        stored = current.get(doc["symbol"])
+        changed = [field for field in fields if stored is None or stored.get(field) != doc[field]]
+        if changed:
+            differences.append({"symbol": doc["symbol"], "fields": changed})
+    return {"symbols": len(docs), "different": len(differences), "differences": differences[:20]}
+
+async def _export(args: argparse.Namespace):
+    await Database.connect_db()
+    try:
+        result = await ColumnarStore(args.dir).export(full=args.full, segment_size=args.segment_size)
+    finally:
+        await Database.close_db()
+    print(result)
+
+def _recompute(args: argparse.Namespace):
+    store = ColumnarStore(args.dir)
+    started = time.perf_counter()
+    result = store.recompute(
+        args.dominant, args.mixed,
+        since=_parse_date(args.since) if args.since else None,
+        until=_parse_date(args.until) if args.until else None
+    )
+    elapsed = time.perf_counter() - started
+    docs = result["docs"]
+
+    distribution: Dict[str, int] = {}
+    for doc in docs:
+        distribution[doc["overall_sentiment"]] = distribution.get(doc["overall_sentiment"], 0) + 1
+    print(
+        f"{len(docs)} símbolos, {result['tweets_processed']} tweets en {elapsed:.2f}s "
+        f"({result['tweets_processed'] / elapsed if elapsed else 0:,.0f} tweets/s): {distribution}"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            for doc in docs:
+                f.write(json.dumps(doc, default=str, ensure_ascii=False) + "\n")
+    if args.compare:
+        async def compare():
+            await Database.connect_db()
+            try:
+                return await compare_with_database(docs)
+            finally:
+                await Database.close_db()
+        print(asyncio.run(compare()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copia columnar de tweets y recálculo sin base de datos")
+    parser.add_argument("--dir", default=settings.COLUMNAR_DIR, help="Directorio de la copia")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Agregar los tweets nuevos como segmentos")
+    export_parser.add_argument("--full", action="store_true", help="Descartar la copia y exportar todo")
+    export_parser.add_argument("--segment-size", type=int, default=None, help="Tweets por segmento")
+
+    recompute_parser = commands.add_parser("recompute", help="Calcular symbols_sentiment desde la copia")
+    recompute_parser.add_argument("--dominant", type=float, default=0.6, help="Umbral de sentimiento dominante")
+    recompute_parser.add_argument("--mixed", type=float, default=0.4, help="Umbral de sentimiento mixto")
+    recompute_parser.add_argument("--since", help="Solo tweets con created_at >= fecha ISO (UTC)")
+    recompute_parser.add_argument("--until", help="Solo tweets con created_at < fecha ISO (UTC)")
+    recompute_parser.add_argument("--output", help="Escribir los documentos en NDJSON")
+    recompute_parser.add_argument("--compare", action="store_true", help="Comparar con symbols_sentiment en MongoDB")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        asyncio.run(_export(args))
+    else:
+        _recompute(args)
@@ -8,5 +8,84 @@ class Settings:
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017/MervalDB")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "MervalDB")
     DB_PORT: int = int(os.getenv("DB_PORT", "27017"))
+    # Pool de conexiones y timeouts del cliente de MongoDB
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+    # Conexiones del pool que se abren al iniciar, antes de reportar 'ready'
+    MONGO_WARMUP_CONNECTIONS: int = int(os.getenv("MONGO_WARMUP_CONNECTIONS", "4"))
+    # Verificación periódica de la base para /ready (el probe no consulta la base)
+    READINESS_CHECK_INTERVAL_SECONDS: float = float(os.getenv("READINESS_CHECK_INTERVAL_SECONDS", "5"))
+    READINESS_PING_TIMEOUT_SECONDS: float = float(os.getenv("READINESS_PING_TIMEOUT_SECONDS", "2"))
+    # Cantidad de documentos por lote al recorrer cursores grandes
+    CURSOR_BATCH_SIZE: int = int(os.getenv("CURSOR_BATCH_SIZE", "100"))
+    # Tweets por lote del motor vectorizado (modo 'vectorized')
+    SCORING_BATCH_SIZE: int = int(os.getenv("SCORING_BATCH_SIZE", "10000"))
+    # Change feed de tweets para mantener symbols_sentiment en tiempo real
+    FEED_ENABLED: bool = os.getenv("FEED_ENABLED", "false").lower() == "true"
+    FEED_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("FEED_FLUSH_INTERVAL_SECONDS", "1.0"))
+    FEED_BATCH_SIZE: int = int(os.getenv("FEED_BATCH_SIZE", "500"))
+    FEED_USE_TRANSACTIONS: bool = os.getenv("FEED_USE_TRANSACTIONS", "true").lower() == "true"
+    # Ingesta de tweets por lotes (POST /tweets/batch): tamaño máximo, lotes simultáneos,
+    # espera máxima por un lugar antes de responder 503 y vigencia de las claves de idempotencia
+    INGEST_MAX_BATCH_SIZE: int = int(os.getenv("INGEST_MAX_BATCH_SIZE", "10000"))
+    INGEST_MAX_CONCURRENT_BATCHES: int = int(os.getenv("INGEST_MAX_CONCURRENT_BATCHES", "4"))
+    INGEST_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("INGEST_QUEUE_TIMEOUT_SECONDS", "2.0"))
+    INGEST_LEASE_SECONDS: float = float(os.getenv("INGEST_LEASE_SECONDS", "60"))
+    INGEST_IDEMPOTENCY_TTL_HOURS: int = int(os.getenv("INGEST_IDEMPOTENCY_TTL_HOURS", "24"))
+    # Antigüedad máxima de la instantánea de GET /symbols-sentiment (cota entre workers)
+    SNAPSHOT_MAX_AGE_SECONDS: float = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "5.0"))
+    # Serie temporal: días con buckets horarios antes de consolidarlos en diarios
+    BUCKETS_HOURLY_RETENTION_DAYS: int = int(os.getenv("BUCKETS_HOURLY_RETENTION_DAYS", "30"))
+    # Intervalo de la consolidación periódica de buckets (0 la desactiva)
+    BUCKETS_ROLLUP_INTERVAL_SECONDS: float = float(os.getenv("BUCKETS_ROLLUP_INTERVAL_SECONDS", "3600"))
+    # Jobs de recálculo en segundo plano: intervalo de heartbeat y antigüedad para reanudarlos
+    JOBS_HEARTBEAT_SECONDS: float = float(os.getenv("JOBS_HEARTBEAT_SECONDS", "2.0"))
+    JOBS_STALE_AFTER_SECONDS: float = float(os.getenv("JOBS_STALE_AFTER_SECONDS", "30"))
+    # Recálculo particionado: símbolos por partición, duración del lease, sondeo (mínimo y
+    # máximo sin particiones libres) y reintentos
+    RECOMPUTE_PARTITION_SIZE: int = int(os.getenv("RECOMPUTE_PARTITION_SIZE", "25"))
+    RECOMPUTE_LEASE_SECONDS: float = float(os.getenv("RECOMPUTE_LEASE_SECONDS", "30"))
+    RECOMPUTE_POLL_SECONDS: float = float(os.getenv("RECOMPUTE_POLL_SECONDS", "1.0"))
+    RECOMPUTE_IDLE_POLL_SECONDS: float = float(os.getenv("RECOMPUTE_IDLE_POLL_SECONDS", "30"))
+    RECOMPUTE_MAX_ATTEMPTS: int = int(os.getenv("RECOMPUTE_MAX_ATTEMPTS", "3"))
+    # Cada proceso de la API toma particiones de los recálculos en curso
+    RECOMPUTE_WORKER_ENABLED: bool = os.getenv("RECOMPUTE_WORKER_ENABLED", "true").lower() == "true"
+    # Trabajo de CPU de los servicios fuera del event loop (cpu_executor.py): 'thread',
+    # 'process' o 'inline', hilos/procesos del pool, elementos por trozo y mínimo para usar el pool
+    CPU_EXECUTOR: str = os.getenv("CPU_EXECUTOR", "thread")
+    CPU_EXECUTOR_WORKERS: int = int(os.getenv("CPU_EXECUTOR_WORKERS", "1"))
+    CPU_CHUNK_SIZE: int = int(os.getenv("CPU_CHUNK_SIZE", "5000"))
+    CPU_OFFLOAD_MIN_ITEMS: int = int(os.getenv("CPU_OFFLOAD_MIN_ITEMS", "1000"))
+    # Monitor de lag del event loop: intervalo de medición, muestras para los percentiles
+    # y retraso a partir del cual se cuenta un bloqueo
+    LOOP_LAG_ENABLED: bool = os.getenv("LOOP_LAG_ENABLED", "true").lower() == "true"
+    LOOP_LAG_INTERVAL_MS: float = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+    LOOP_LAG_WINDOW: int = int(os.getenv("LOOP_LAG_WINDOW", "1200"))
+    LOOP_LAG_STALL_MS: float = float(os.getenv("LOOP_LAG_STALL_MS", "100"))
+    # Clasificador léxico (modo 'classify'): procesos del pool y tweets por lote
+    CLASSIFIER_WORKERS: int = int(os.getenv("CLASSIFIER_WORKERS", str(os.cpu_count() or 1)))
+    CLASSIFIER_BATCH_SIZE: int = int(os.getenv("CLASSIFIER_BATCH_SIZE", "5000"))
+    # Entradas de la caché LRU en memoria de clasificaciones por texto normalizado
+    CLASSIFICATION_CACHE_SIZE: int = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "100000"))
+    # Exportación columnar de tweets para recálculos sin base de datos (columnar.py)
+    COLUMNAR_DIR: str = os.getenv("COLUMNAR_DIR", "columnar")
+    COLUMNAR_SEGMENT_SIZE: int = int(os.getenv("COLUMNAR_SEGMENT_SIZE", "1000000"))
+    # Métricas en /metrics (latencia por ruta, comandos de MongoDB y duración de jobs)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Profiling bajo demanda: header X-Profile-Token con PROFILING_TOKEN o una fracción
+    # muestreada de las rutas listadas; intervalo de muestreo de pilas y perfiles guardados
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_SAMPLED_ROUTES: str = os.getenv("PROFILING_SAMPLED_ROUTES", "/create-sentiment-collection,/symbols-summary")
+    PROFILING_STACK_INTERVAL_MS: float = float(os.getenv("PROFILING_STACK_INTERVAL_MS", "5"))
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+    # Directorio donde se escribe cada perfil (.json y pilas .folded); vacío = solo en memoria
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "")
+    # Verificar al iniciar que las consultas frecuentes no caigan en COLLSCAN
+    CHECK_QUERY_PLANS: bool = os.getenv("CHECK_QUERY_PLANS", "false").lower() == "true"
 
 settings = Settings()
@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from config import settings
+
+# Ejecutor del trabajo de CPU de los servicios (normalización y conteo de tweets, resúmenes)
+# para que el event loop siga atendiendo solicitudes durante un recálculo.
+#
+# - 'thread' (por defecto): un pool de hilos. El GIL se cede cada sys.getswitchinterval()
+#   (5 ms), de modo que el loop no queda bloqueado mucho más que eso aunque el trabajo sea
+#   Python puro. Con más de un hilo el trabajo no corre más rápido y los hilos compiten
+#   con el loop por el GIL: conviene CPU_EXECUTOR_WORKERS=1.
+# - 'process': un pool de procesos ('spawn'); el trabajo corre en paralelo de verdad a
+#   cambio de serializar cada trozo, lo que solo compensa con lotes costosos de procesar.
+#   Las funciones deben ser importables (nivel de módulo o métodos estáticos).
+# - 'inline': en el loop, trozo por trozo, cediendo el control entre trozos.
+#
+# En todos los casos el trabajo se reparte en trozos de CPU_CHUNK_SIZE elementos, y las
+# listas de menos de CPU_OFFLOAD_MIN_ITEMS elementos se procesan en el loop: cuestan menos
+# que el salto al pool.
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+def _noop():
+    return None
+
+class CpuExecutor:
+    def __init__(self, kind: str = None, workers: int = None, chunk_size: int = None, min_items: int = None):
+        self.kind = kind or settings.CPU_EXECUTOR
+        if self.kind not in EXECUTOR_KINDS:
+            raise ValueError(f"CPU_EXECUTOR inválido: {self.kind} (opciones: {', '.join(EXECUTOR_KINDS)})")
+        self.workers = max(1, workers or settings.CPU_EXECUTOR_WORKERS)
+        self.chunk_size = max(1, chunk_size or settings.CPU_CHUNK_SIZE)
+        self.min_items = settings.CPU_OFFLOAD_MIN_ITEMS if min_items is None else min_items
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # 'spawn': no se hereda el estado del event loop ni el cliente de MongoDB
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu")
+        return self._pool
+
+    async def start(self):
+        """
+        Crea el pool antes de la primera solicitud: iniciar los procesos bloquea al que
+        los pide (cientos de milisegundos con 'spawn').
+        """
+        if self.kind == "inline":
+            return
+        await asyncio.gather(*(self.run(_noop) for _ in range(self.workers)))
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Ejecuta fn(*args) fuera del loop (en el loop si el ejecutor es 'inline')"""
+        if self.kind == "inline":
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+
+    async def map_chunks(self, fn: Callable, items: Sequence, *args) -> List:
+        """
+        Aplica fn(trozo, *args) a trozos de 'items' de a lo sumo chunk_size elementos y
+        devuelve los resultados en el orden de los trozos. Con un pool, los trozos se
+        procesan en paralelo (hasta 'workers' a la vez).
+        """
+        if not items:
+            return []
+        if len(items) < self.min_items:
+            return [fn(items, *args)]
+        chunks = [items[start:start + self.chunk_size] for start in range(0, len(items), self.chunk_size)]
+        if self.kind == "inline":
+            results = []
+            for chunk in chunks:
+                results.append(fn(chunk, *args))
+                # Un trozo es la espera máxima que agrega este trabajo a las demás solicitudes
+                await asyncio.sleep(0)
+            return results
+        return list(await asyncio.gather(*(self.run(fn, chunk, *args) for chunk in chunks)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+# Ejecutor compartido por los servicios del proceso
+cpu_executor = CpuExecutor()
@@ -1,14 +1,115 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
 from config import settings
+from metrics import MongoCommandMetrics
+from profiling import ProfileCommandListener
 
 class Database:
     client: AsyncIOMotorClient = None
     
+    # Índices requeridos por las consultas de la API, por colección
+    INDEXES = {
+        # Los compuestos con prefijo 'company' también sirven a find/count_documents/distinct por company
+        "tweets": [
+            IndexModel([("company", ASCENDING), ("created_at", ASCENDING)], name="company_created_at"),
+            IndexModel([("company", ASCENDING), ("_id", ASCENDING)], name="company_id"),
+        ],
+        "symbols": [
+            IndexModel([("symbol", ASCENDING)], name="symbol"),
+            IndexModel([("sector", ASCENDING), ("symbol", ASCENDING)], name="sector_symbol"),
+        ],
+        "symbols_sentiment": [
+            IndexModel([("symbol", ASCENDING)], name="symbol_unique", unique=True),
+            IndexModel([("sector", ASCENDING), ("symbol", ASCENDING)], name="sector_symbol"),
+            IndexModel([("overall_sentiment", ASCENDING), ("symbol", ASCENDING)], name="overall_sentiment_symbol"),
+            IndexModel([("confidence_score", ASCENDING), ("symbol", ASCENDING)], name="confidence_score_symbol"),
+            IndexModel([("total_tweets", ASCENDING), ("symbol", ASCENDING)], name="total_tweets_symbol"),
+        ],
+        # La clave única es también la clave 'on' del $merge de la reconstrucción de buckets
+        "symbols_sentiment_buckets": [
+            IndexModel(
+                [("symbol", ASCENDING), ("granularity", ASCENDING), ("bucket_start", ASCENDING)],
+                name="symbol_granularity_bucket_start_unique",
+                unique=True
+            ),
+            IndexModel([("symbol", ASCENDING), ("bucket_start", ASCENDING)], name="symbol_bucket_start"),
+            IndexModel([("granularity", ASCENDING), ("bucket_start", ASCENDING)], name="granularity_bucket_start"),
+        ],
+        # Single-flight de los jobs: a lo sumo un job activo por tipo
+        "jobs": [
+            IndexModel(
+                [("type", ASCENDING)],
+                name="type_active_unique",
+                unique=True,
+                partialFilterExpression={"active": True}
+            ),
+            IndexModel([("created_at", DESCENDING)], name="created_at"),
+        ],
+        # Un agregado por sector y uno de mercado
+        "sentiment_rollups": [
+            IndexModel([("scope", ASCENDING), ("sector", ASCENDING)], name="scope_sector_unique", unique=True),
+        ],
+        # Claves de idempotencia de la ingesta de tweets, vigentes INGEST_IDEMPOTENCY_TTL_HOURS
+        "ingest_batches": [
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="created_at_ttl",
+                expireAfterSeconds=settings.INGEST_IDEMPOTENCY_TTL_HOURS * 3600
+            ),
+        ],
+        # Leases del recálculo particionado; los runs abandonados se borran a los 7 días
+        "recompute_partitions": [
+            IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease_expires_at"),
+            IndexModel([("run_id", ASCENDING), ("index", ASCENDING)], name="run_id_index"),
+            IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+        ],
+    }
+    
     @classmethod
     async def connect_db(cls):
         """Conectar a MongoDB"""
-        cls.client = AsyncIOMotorClient(settings.MONGODB_URI)
+        # El listener de comandos alimenta las métricas de MongoDB de /metrics
+        event_listeners = [MongoCommandMetrics()] if settings.METRICS_ENABLED else []
+        # Tiempo en MongoDB de las solicitudes perfiladas
+        if settings.PROFILING_ENABLED:
+            event_listeners.append(ProfileCommandListener())
+        options = {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        }
+        if settings.MONGO_MAX_IDLE_TIME_MS > 0:
+            options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+        cls.client = AsyncIOMotorClient(settings.MONGODB_URI, event_listeners=event_listeners, **options)
+        await cls.warm_up()
         print(f"Conectado a MongoDB: {settings.DATABASE_NAME}")
+        await cls.ensure_indexes()
+    
+    @classmethod
+    async def warm_up(cls, connections: int = None) -> int:
+        """
+        Abre conexiones del pool con pings concurrentes (cada uno toma una conexión
+        distinta), de modo que las primeras solicitudes no paguen TCP, TLS y autenticación.
+        """
+        connections = connections if connections is not None else settings.MONGO_WARMUP_CONNECTIONS
+        connections = min(connections, settings.MONGO_MAX_POOL_SIZE)
+        if connections > 0:
+            await asyncio.gather(*(cls.client.admin.command("ping") for _ in range(connections)))
+        return max(connections, 0)
+    
+    @classmethod
+    async def ensure_indexes(cls):
+        """Crear los índices declarados en INDEXES (create_indexes no hace nada si ya existen)"""
+        db = cls.get_db()
+        for collection_name, indexes in cls.INDEXES.items():
+            try:
+                await db[collection_name].create_indexes(indexes)
+            except PyMongoError as e:
+                # Un índice que no se puede crear no debe impedir el arranque de la API
+                print(f"No se pudieron crear los índices de {collection_name}: {e}")
     
     @classmethod
     async def close_db(cls):
@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+from database import Database
+
+def _hot_queries(sample_symbol: str) -> List[Dict]:
+    """
+    Formas de las consultas frecuentes de la API como comandos 'explain'.
+    Los valores son de ejemplo: lo que importa es la forma, que determina el plan.
+    """
+    company = {"company": sample_symbol}
+    return [
+        {"name": "tweets.find por company", "collection": "tweets",
+         "command": {"find": "tweets", "filter": company}},
+        {"name": "tweets.count_documents por company", "collection": "tweets",
+         "command": {"count": "tweets", "query": company}},
+        {"name": "tweets.distinct company", "collection": "tweets",
+         "command": {"distinct": "tweets", "key": "company"}},
+        {"name": "tweets por company posteriores a la marca de agua", "collection": "tweets",
+         "command": {"find": "tweets", "filter": {"company": sample_symbol, "_id": {"$gt": ObjectId("0" * 24)}}}},
+        {"name": "tweets.aggregate conteo por company", "collection": "tweets",
+         "command": {"aggregate": "tweets", "pipeline": [
+             {"$match": {"company": {"$in": [sample_symbol]}}},
+             {"$group": {"_id": "$company", "count": {"$sum": 1}}}
+         ], "cursor": {}}},
+        {"name": "symbols_sentiment.update_one upsert por symbol", "collection": "symbols_sentiment",
+         "command": {"update": "symbols_sentiment", "updates": [
+             {"q": {"symbol": sample_symbol}, "u": {"$set": {"symbol": sample_symbol}}, "upsert": True}
+         ]}},
+        {"name": "symbols_sentiment por sector ordenado por symbol", "collection": "symbols_sentiment",
+         "command": {"find": "symbols_sentiment", "filter": {"sector": "Energía"}, "sort": {"symbol": 1}, "limit": 51}},
+        {"name": "symbols_sentiment por overall_sentiment", "collection": "symbols_sentiment",
+         "command": {"find": "symbols_sentiment", "filter": {"overall_sentiment": "positivo"}, "sort": {"symbol": 1}, "limit": 51}},
+        {"name": "symbols_sentiment ordenado por confidence_score", "collection": "symbols_sentiment",
+         "command": {"find": "symbols_sentiment", "filter": {"confidence_score": {"$gte": 0.5}},
+                     "sort": {"confidence_score": -1, "symbol": -1}, "limit": 51}},
+        {"name": "symbols_sentiment ordenado por total_tweets", "collection": "symbols_sentiment",
+         "command": {"find": "symbols_sentiment", "filter": {"total_tweets": {"$gte": 10}},
+                     "sort": {"total_tweets": -1, "symbol": -1}, "limit": 51}},
+        {"name": "symbols ordenado por symbol (resumen paginado)", "collection": "symbols",
+         "command": {"find": "symbols", "filter": {}, "sort": {"symbol": 1}, "limit": 51}},
+        {"name": "symbols_sentiment_buckets por symbol en una ventana", "collection": "symbols_sentiment_buckets",
+         "command": {"find": "symbols_sentiment_buckets", "filter": {
+             "symbol": sample_symbol, "bucket_start": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 1, 2)}
+         }}},
+        {"name": "symbols_sentiment_buckets horarios a consolidar", "collection": "symbols_sentiment_buckets",
+         "command": {"find": "symbols_sentiment_buckets", "filter": {
+             "granularity": "1h", "bucket_start": {"$lt": datetime(2024, 1, 1)}
+         }, "limit": 1}},
+    ]
+
+def _collect_stages(node: Any, stages: List[str], indexes: List[str]):
+    """Recorre un plan de ejecución acumulando las etapas y los índices usados"""
+    if isinstance(node, dict):
+        stage = node.get("stage")
+        if isinstance(stage, str):
+            stages.append(stage)
+            if node.get("indexName"):
+                indexes.append(node["indexName"])
+        for value in node.values():
+            _collect_stages(value, stages, indexes)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_stages(item, stages, indexes)
+
+def _winning_plans(node: Any) -> List[Any]:
+    """Busca los 'winningPlan' en la salida de explain (find, count, update o aggregate)"""
+    plans = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                plans.append(value)
+            else:
+                plans.extend(_winning_plans(value))
+    elif isinstance(node, list):
+        for item in node:
+            plans.extend(_winning_plans(item))
+    return plans
+
+async def explain_hot_queries() -> Dict:
+    """
+    Ejecuta 'explain' (queryPlanner, sin ejecutar escrituras) sobre cada consulta frecuente
+    y marca las que caen en un COLLSCAN.
+    """
+    db = Database.get_db()
+    sample = await db["symbols_sentiment"].find_one({}, {"symbol": 1})
+    sample_symbol = sample["symbol"] if sample else "GGAL"
+
+    results = []
+    for query in _hot_queries(sample_symbol):
+        entry = {"name": query["name"], "collection": query["collection"]}
+        try:
+            explain = await db.command({"explain": query["command"], "verbosity": "queryPlanner"})
+            stages: List[str] = []
+            indexes: List[str] = []
+            for plan in _winning_plans(explain):
+                _collect_stages(plan, stages, indexes)
+            entry.update({
+                "stages": stages,
+                "indexes": sorted(set(indexes)),
+                "collscan": "COLLSCAN" in stages
+            })
+        except Exception as e:
+            entry.update({"error": str(e), "collscan": None})
+        results.append(entry)
+
+    collscans = [entry["name"] for entry in results if entry["collscan"]]
+    return {
+        "ok": not collscans,
+        "collscan_queries": collscans,
+        "queries": results
+    }
@@ -0,0 +1,284 @@
+import asyncio
+import contextvars
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from database import Database
+from metrics import JOB_DURATION
+from profiling import current_profile, finish_job_profile, start_job_profile
+from progress import JobProgress
+from services import SentimentService
+
+# Tipos de job y la función de servicio que ejecuta cada uno (recibe params y 'progress')
+JOB_TYPES: Dict[str, Callable[..., Awaitable[Dict]]] = {
+    "create-sentiment-collection": SentimentService.create_symbols_sentiment_collection,
+    "analyze-sentiments": SentimentService.analyze_and_update_sentiments,
+}
+
+# Identificador de este proceso como dueño de jobs y leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Heartbeat de los jobs interrumpidos por un apagado ordenado: se reanudan sin esperar
+INTERRUPTED_HEARTBEAT = datetime(1970, 1, 1)
+
+class JobConflictError(Exception):
+    """Hay un job activo del mismo tipo con otros parámetros"""
+
+    def __init__(self, job: Dict):
+        super().__init__(
+            f"Ya hay un job {job['type']} en curso con otros parámetros: {job['_id']} ({job['params']})"
+        )
+        self.job_id = job["_id"]
+
+class JobManager:
+    """
+    Ejecuta los recálculos largos como jobs en segundo plano con estado en la colección 'jobs'.
+
+    - Single-flight: un índice único parcial sobre 'type' para los jobs con active=true
+      garantiza, entre todos los workers, a lo sumo un job activo por tipo. Un pedido
+      con los mismos parámetros que el activo se une a él en lugar de lanzar otro
+      recorrido completo; con otros parámetros (otro modo) se rechaza con
+      JobConflictError, ya que ambos escribirían las mismas colecciones.
+    - El worker dueño persiste el avance cada JOBS_HEARTBEAT_SECONDS y en el mismo
+      paso lee 'cancel_requested', de modo que la cancelación funciona desde cualquier worker.
+    - Un job activo sin heartbeat durante JOBS_STALE_AFTER_SECONDS (el worker murió) lo
+      reanuda otro worker: los recálculos son idempotentes y se vuelven a ejecutar
+      desde el principio ('incremental' continúa desde las marcas de agua).
+    """
+
+    COLLECTION = "jobs"
+
+    def __init__(self, heartbeat_interval: float = None, stale_after: float = None):
+        self.worker_id = WORKER_ID
+        self.heartbeat_interval = (
+            heartbeat_interval if heartbeat_interval is not None else settings.JOBS_HEARTBEAT_SECONDS
+        )
+        self.stale_after = stale_after if stale_after is not None else settings.JOBS_STALE_AFTER_SECONDS
+        # Tareas supervisoras y de trabajo de los jobs que corren en este worker
+        self._runners: Dict[str, asyncio.Task] = {}
+        self._work: Dict[str, asyncio.Task] = {}
+
+    def _collection(self):
+        return Database.get_db()[self.COLLECTION]
+
+    @staticmethod
+    def _public(job: Dict) -> Dict:
+        """Documento del job tal como lo devuelve la API"""
+        job = dict(job)
+        job["id"] = job.pop("_id")
+        job.pop("active", None)
+        return job
+
+    async def start(self, job_type: str, params: Dict) -> Tuple[Dict, bool]:
+        """
+        Inicia un job de 'job_type' o se une al que ya está activo con los mismos params.
+        Devuelve (job, created): created es False si se devolvió un job existente.
+        Lanza JobConflictError si el job activo tiene otros params.
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Tipo de job inválido: {job_type}")
+        collection = self._collection()
+
+        # Reintentos por si el job activo termina entre el insert y la lectura
+        for _ in range(3):
+            now = datetime.utcnow()
+            job = {
+                "_id": uuid.uuid4().hex,
+                "type": job_type,
+                "params": params,
+                "status": "running",
+                "active": True,
+                "owner": self.worker_id,
+                "attempts": 1,
+                "cancel_requested": False,
+                "created_at": now,
+                "started_at": now,
+                "heartbeat_at": now,
+                "finished_at": None,
+                "progress": JobProgress().snapshot(),
+                "result": None,
+                "error": None
+            }
+            try:
+                await collection.insert_one(job)
+            except DuplicateKeyError:
+                existing = await collection.find_one({"type": job_type, "active": True})
+                if existing is None:
+                    continue
+                claimed = await self._claim_if_stale(existing)
+                if existing["params"] != params:
+                    raise JobConflictError(existing)
+                return self._public(claimed or existing), False
+            self._launch(job)
+            return self._public(job), True
+        raise RuntimeError(f"No se pudo iniciar el job {job_type}")
+
+    async def _claim_if_stale(self, job: Dict) -> Optional[Dict]:
+        """Toma un job activo cuyo worker dejó de enviar heartbeats y lo reanuda aquí"""
+        if job["heartbeat_at"] > datetime.utcnow() - timedelta(seconds=self.stale_after):
+            return None
+        now = datetime.utcnow()
+        claimed = await self._collection().find_one_and_update(
+            # El heartbeat leído actúa de versión: solo un worker gana la reanudación
+            {"_id": job["_id"], "active": True, "heartbeat_at": job["heartbeat_at"]},
+            {"$set": {"owner": self.worker_id, "status": "running", "started_at": now, "heartbeat_at": now},
+             "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if claimed is None:
+            return None
+        if claimed.get("cancel_requested"):
+            await self._finish(claimed["_id"], "cancelled", JobProgress())
+            return await self._collection().find_one({"_id": claimed["_id"]})
+        self._launch(claimed)
+        return claimed
+
+    async def resume_stale_jobs(self) -> List[str]:
+        """Reanuda los jobs activos abandonados (se llama al iniciar la API)"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        resumed = []
+        async for job in self._collection().find({"active": True, "heartbeat_at": {"$lt": cutoff}}):
+            claimed = await self._claim_if_stale(job)
+            if claimed is not None and claimed.get("active"):
+                resumed.append(claimed["_id"])
+        return resumed
+
+    def _launch(self, job: Dict):
+        job_id = job["_id"]
+        # El job corre en un contexto vacío: no hereda el de la solicitud que lo lanzó
+        # (perfil, fase en curso), que termina mucho antes que él. Si la solicitud se
+        # estaba perfilando, el job tiene su propio perfil.
+        parent = current_profile()
+        if parent is not None:
+            parent.job_profiles.append(f"job-{job_id}")
+        runner = contextvars.Context().run(
+            asyncio.create_task, self._run(job, JobProgress(), profiled=parent is not None)
+        )
+        self._runners[job_id] = runner
+        runner.add_done_callback(lambda _: self._runners.pop(job_id, None))
+
+    async def _run(self, job: Dict, progress: JobProgress, profiled: bool = False):
+        """Ejecuta el job supervisando heartbeat, avance y cancelación"""
+        job_id = job["_id"]
+        started = time.monotonic()
+        profile = start_job_profile(job_id, job["type"]) if profiled else None
+        status = "interrupted"
+        try:
+            status = await self._supervise(job, progress, started)
+        finally:
+            if profile is not None:
+                finish_job_profile(profile, status)
+
+    async def _supervise(self, job: Dict, progress: JobProgress, started: float) -> str:
+        """Cuerpo de _run; devuelve el estado final del job en este worker"""
+        job_id = job["_id"]
+        work = asyncio.create_task(JOB_TYPES[job["type"]](**job["params"], progress=progress))
+        self._work[job_id] = work
+        try:
+            while not work.done():
+                await asyncio.wait({work}, timeout=self.heartbeat_interval)
+                if work.done():
+                    break
+                current = await self._collection().find_one_and_update(
+                    {"_id": job_id, "owner": self.worker_id},
+                    {"$set": {"heartbeat_at": datetime.utcnow(), "progress": progress.snapshot()}},
+                    projection={"cancel_requested": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                if current is None:
+                    # Otro worker reanudó el job: este deja de ejecutarlo
+                    work.cancel()
+                    return "reassigned"
+                if current.get("cancel_requested"):
+                    work.cancel()
+        except asyncio.CancelledError:
+            # Apagado del worker: el job queda 'interrupted' para reanudarse al volver
+            work.cancel()
+            JOB_DURATION.observe(time.monotonic() - started, job["type"], "interrupted")
+            await self._finish(job_id, "interrupted", progress)
+            raise
+        finally:
+            self._work.pop(job_id, None)
+
+        if work.cancelled():
+            status, result, error = "cancelled", None, None
+        elif work.exception() is not None:
+            status, result, error = "failed", None, f"{type(work.exception()).__name__}: {work.exception()}"
+        else:
+            status, result, error = "completed", work.result(), None
+        JOB_DURATION.observe(time.monotonic() - started, job["type"], status)
+        await self._finish(job_id, status, progress, result=result, error=error)
+        return status
+
+    async def _finish(self, job_id: str, status: str, progress: JobProgress,
+                      result: Optional[Dict] = None, error: Optional[str] = None):
+        fields = {"status": status, "progress": progress.snapshot(), "result": result, "error": error}
+        if status == "interrupted":
+            update = {"$set": dict(fields, heartbeat_at=INTERRUPTED_HEARTBEAT)}
+        else:
+            update = {"$set": dict(fields, finished_at=datetime.utcnow()), "$unset": {"active": ""}}
+        await self._collection().update_one({"_id": job_id, "owner": self.worker_id}, update)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        job = await self._collection().find_one({"_id": job_id})
+        return self._public(job) if job else None
+
+    async def list(self, job_type: Optional[str] = None, status: Optional[str] = None,
+                   limit: int = 20) -> List[Dict]:
+        """Jobs más recientes primero"""
+        query = {}
+        if job_type is not None:
+            query["type"] = job_type
+        if status is not None:
+            query["status"] = status
+        cursor = self._collection().find(query).sort("created_at", DESCENDING).limit(limit)
+        return [self._public(job) async for job in cursor]
+
+    async def cancel(self, job_id: str) -> Optional[Dict]:
+        """Pide la cancelación de un job activo; devuelve su estado actual"""
+        collection = self._collection()
+        job = await collection.find_one_and_update(
+            {"_id": job_id, "active": True},
+            {"$set": {"cancel_requested": True}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            if job_id in self._work:
+                self._work[job_id].cancel()
+            elif job["status"] == "interrupted":
+                # Nadie lo está ejecutando: se cierra directamente
+                await collection.update_one(
+                    {"_id": job_id, "status": "interrupted"},
+                    {"$set": {"status": "cancelled", "finished_at": datetime.utcnow()}, "$unset": {"active": ""}}
+                )
+        return await self.get(job_id)
+
+    async def wait(self, job_id: str, poll_interval: float = 0.5) -> Optional[Dict]:
+        """Espera a que el job termine y devuelve su estado final"""
+        runner = self._runners.get(job_id)
+        if runner is not None:
+            # shield: si el cliente se desconecta, el job sigue corriendo
+            await asyncio.shield(runner)
+        while True:
+            job = await self._collection().find_one({"_id": job_id})
+            if job is None or not job.get("active"):
+                return self._public(job) if job else None
+            await asyncio.sleep(poll_interval)
+
+    async def shutdown(self):
+        """Interrumpe los jobs de este worker dejándolos listos para reanudarse"""
+        runners = list(self._runners.values())
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+
+# Gestor de jobs del proceso
+job_manager = JobManager()
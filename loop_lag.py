@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import settings
+from metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+def _percentile(values, pct: float) -> float:
+    """Percentil por rango más cercano sobre valores ya ordenados"""
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+class LoopLagMonitor:
+    """
+    Mide cuánto tarda el event loop en atender una tarea que despierta cada 'interval'
+    segundos: el retraso respecto del momento esperado es el tiempo que el loop estuvo
+    ocupado con otra cosa (trabajo de CPU, serialización, código bloqueante).
+
+    Las últimas 'window' muestras dan los percentiles; el máximo y los bloqueos de más
+    de LOOP_LAG_STALL_MS se acumulan desde el inicio (o el último reset).
+    """
+
+    def __init__(self, interval: float = None, window: int = None, stall_threshold: float = None):
+        self.interval = interval if interval is not None else settings.LOOP_LAG_INTERVAL_MS / 1000
+        self.stall_threshold = (
+            stall_threshold if stall_threshold is not None else settings.LOOP_LAG_STALL_MS / 1000
+        )
+        self._samples = deque(maxlen=window or settings.LOOP_LAG_WINDOW)
+        self.max_lag = 0.0
+        self.max_lag_at: Optional[datetime] = None
+        self.stalls = 0
+        self.measured = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, lag: float):
+        self._samples.append(lag)
+        self.measured += 1
+        EVENT_LOOP_LAG.observe(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+            self.max_lag_at = datetime.utcnow()
+        if lag >= self.stall_threshold:
+            self.stalls += 1
+            EVENT_LOOP_STALLS.inc()
+
+    async def _measure(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - expected))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._measure())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        self._samples.clear()
+        self.max_lag = 0.0
+        self.max_lag_at = None
+        self.stalls = 0
+        self.measured = 0
+
+    def stats(self) -> Dict:
+        samples = sorted(self._samples)
+        window = {
+            "samples": len(samples),
+            "p50_ms": None,
+            "p95_ms": None,
+            "p99_ms": None,
+            "max_ms": None
+        }
+        if samples:
+            window.update(
+                p50_ms=round(_percentile(samples, 50) * 1000, 3),
+                p95_ms=round(_percentile(samples, 95) * 1000, 3),
+                p99_ms=round(_percentile(samples, 99) * 1000, 3),
+                max_ms=round(samples[-1] * 1000, 3)
+            )
+        return {
+            "running": self._task is not None,
+            "interval_ms": round(self.interval * 1000, 3),
+            "window": window,
+            "measured": self.measured,
+            "max_ms": round(self.max_lag * 1000, 3),
+            "max_at": self.max_lag_at,
+            "stall_threshold_ms": round(self.stall_threshold * 1000, 3),
+            "stalls": self.stalls
+        }
+
+# Monitor del loop del proceso
+loop_lag = LoopLagMonitor()
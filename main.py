@@ -1,17 +1,102 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+import asyncio
+import json
+import time
+from typing import List, Literal, Optional, Union
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from config import settings
 from database import Database
-from services import SentimentService
-from models import SentimentResponse, CreateSentimentCollectionResponse
+from services import (
+    IngestionInProgressError, IngestionOverloadedError, SectorRollupService, SentimentService,
+    SentimentTimeseriesService, TweetIngestionService, symbols_sentiment_snapshot
+)
+from snapshot import snapshot_response
+from streaming import ndjson_response, wants_ndjson
+from change_feed import SentimentChangeFeed
+from diagnostics import explain_hot_queries
+from jobs import JobConflictError, job_manager
+from classification_cache import classification_cache
+from partitions import PartitionWorker
+from metrics import MetricsMiddleware, render_metrics
+from profiling import ProfilingMiddleware, profile_store, token_valid
+from readiness import readiness
+from loop_lag import loop_lag
+from cpu_executor import cpu_executor
+from models import SentimentResponse, CreateSentimentCollectionResponse, JobResponse
+
+async def rollup_buckets_periodically(interval: float):
+    """Consolida periódicamente los buckets horarios vencidos de la serie temporal"""
+    while True:
+        try:
+            result = await SentimentTimeseriesService.rollup_buckets()
+            if result["hourly_buckets_rolled_up"]:
+                print(f"Buckets horarios consolidados: {result['hourly_buckets_rolled_up']}")
+        except Exception as e:
+            print(f"Error al consolidar buckets de sentimiento: {e}")
+        await asyncio.sleep(interval)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Conectar a la base de datos
+    # Startup: Conectar a la base de datos (precalienta el pool y crea los índices declarados)
+    started = time.monotonic()
     await Database.connect_db()
+    readiness.record_phase("database", started)
+    # Reanudar los jobs de recálculo que quedaron sin worker
+    started = time.monotonic()
+    for job_id in await job_manager.resume_stale_jobs():
+        print(f"Job reanudado: {job_id}")
+    readiness.record_phase("resume_jobs", started)
+    if settings.CHECK_QUERY_PLANS:
+        started = time.monotonic()
+        plans = await explain_hot_queries()
+        for name in plans["collscan_queries"]:
+            print(f"ADVERTENCIA: la consulta '{name}' usa COLLSCAN")
+        readiness.record_phase("query_plans", started)
+    # Pool del trabajo de CPU de los recálculos (procesos iniciados antes de reportar 'ready')
+    started = time.monotonic()
+    await cpu_executor.start()
+    readiness.record_phase("cpu_executor", started)
+    # Lag del event loop (GET /debug/event-loop y /metrics)
+    if settings.LOOP_LAG_ENABLED:
+        loop_lag.start()
+    # Worker que toma particiones de los recálculos 'partitioned' de cualquier instancia
+    partition_worker = None
+    if settings.RECOMPUTE_WORKER_ENABLED:
+        partition_worker = PartitionWorker()
+        await partition_worker.start()
+    # Iniciar el change feed de tweets si está habilitado
+    app.state.sentiment_feed = None
+    if settings.FEED_ENABLED:
+        app.state.sentiment_feed = SentimentChangeFeed()
+        await app.state.sentiment_feed.start()
+    # Consolidación periódica de buckets de la serie temporal
+    rollup_task = None
+    if settings.BUCKETS_ROLLUP_INTERVAL_SECONDS > 0:
+        rollup_task = asyncio.create_task(rollup_buckets_periodically(settings.BUCKETS_ROLLUP_INTERVAL_SECONDS))
+    # Precargar la instantánea de /symbols-sentiment antes de reportar 'ready'
+    started = time.monotonic()
+    try:
+        await symbols_sentiment_snapshot.get()
+    except Exception as e:
+        print(f"No se pudo precargar la instantánea de symbols_sentiment: {e}")
+    readiness.record_phase("preload", started)
+    await readiness.start()
+    print(f"API lista en {readiness.ready_after_seconds}s")
     yield
-    # Shutdown: Cerrar conexión a la base de datos
+    # Shutdown: Detener las tareas de fondo y cerrar conexión a la base de datos
+    await readiness.stop()
+    if rollup_task is not None:
+        rollup_task.cancel()
+    await job_manager.shutdown()
+    if partition_worker is not None:
+        await partition_worker.stop()
+    if app.state.sentiment_feed is not None:
+        await app.state.sentiment_feed.stop()
+    await loop_lag.stop()
+    cpu_executor.close()
     await Database.close_db()
 
 # Crear la aplicación FastAPI
@@ -31,6 +116,14 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos los headers
 )
 
+# Latencia por ruta y solicitudes en curso para /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Profiling bajo demanda de solicitudes (header X-Profile-Token o muestreo)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 @app.get("/")
 async def root():
     """Endpoint raíz"""
@@ -38,17 +131,42 @@ async def root():
         "message": "Sentiment Market API",
         "version": "1.0.0",
         "endpoints": {
-            "/analyze-sentiments": "POST - Analiza y actualiza sentimientos de tweets",
-            "/create-sentiment-collection": "POST - Crea/actualiza la colección symbols_sentiment",
-            "/symbols-sentiment": "GET - Obtiene los sentimientos agregados de todos los símbolos",
+            "/analyze-sentiments": "POST - Inicia (o se une a) el job que analiza y actualiza sentimientos de tweets",
+            "/create-sentiment-collection": "POST - Inicia (o se une a) el job que crea/actualiza la colección symbols_sentiment",
+            "/tweets/batch": "POST - Inserta un lote de tweets y actualiza los sentimientos agregados en la misma solicitud",
+            "/jobs": "GET - Lista los jobs de recálculo recientes",
+            "/jobs/{job_id}": "GET - Estado y avance de un job (símbolos, tweets, ritmo, ETA)",
+            "/jobs/{job_id}/cancel": "POST - Cancela un job activo",
+            "/symbols-sentiment": "GET - Obtiene los sentimientos agregados de todos los símbolos (con filtros y paginación opcionales)",
+            "/symbols-sentiment/batch": "GET - Obtiene los sentimientos de una lista de símbolos",
+            "/symbols-sentiment/{symbol}": "GET - Obtiene el sentimiento de un símbolo",
+            "/symbols-sentiment/{symbol}/timeseries": "GET - Serie temporal de sentimientos de un símbolo por ventana y paso",
             "/symbols-summary": "GET - Obtiene un resumen de símbolos y sentimientos",
-            "/health": "GET - Verifica el estado de la API"
+            "/sectors-sentiment": "GET - Sentimiento agregado de cada sector",
+            "/market-sentiment": "GET - Sentimiento agregado de todo el mercado",
+            "/sentiment-feed/status": "GET - Estado y lag del change feed de tweets",
+            "/classification-cache/stats": "GET - Aciertos, fallos y desalojos de la caché de clasificaciones",
+            "/metrics": "GET - Métricas en formato de texto de Prometheus",
+            "/debug/query-plans": "GET - Planes de ejecución de las consultas frecuentes (detecta COLLSCAN)",
+            "/debug/event-loop": "GET - Lag del event loop (máximo y percentiles) y configuración del ejecutor de CPU",
+            "/debug/profiles": "GET - Perfiles de solicitudes recientes (requiere PROFILING_ENABLED y X-Profile-Token)",
+            "/debug/profiles/{profile_id}": "GET - Fases, tiempo en MongoDB y pilas más frecuentes de un perfil",
+            "/debug/profiles/{profile_id}/stacks": "GET - Pilas muestreadas de un perfil en formato collapsed (flamegraph)",
+            "/health": "GET - Verifica el estado de la API",
+            "/live": "GET - Probe de liveness (no consulta la base)",
+            "/ready": "GET - Probe de readiness con el estado de la base verificado en segundo plano"
         }
     }
 
 @app.get("/debug/tweets-count")
-async def debug_tweets_count():
+async def debug_tweets_count(
+    request: Request,
+    stream: bool = Query(False, description="Devolver NDJSON en streaming ({company, count} por línea)"),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000, description="Documentos por lote del cursor en streaming")
+):
     """Endpoint de debug para ver cuántos tweets hay por símbolo"""
+    if wants_ndjson(request, stream):
+        return ndjson_response(SentimentService.iter_tweets_per_company(batch_size))
     try:
         db = Database.get_db()
         tweets_collection = db["tweets"]
@@ -77,6 +195,80 @@ async def debug_tweets_count():
             detail=f"Error: {str(e)}"
         )
 
+@app.get("/debug/query-plans")
+async def debug_query_plans():
+    """
+    Ejecuta 'explain' sobre cada forma de consulta frecuente de la API e indica las que
+    caen en un COLLSCAN (ok=false si hay alguna).
+    """
+    try:
+        return await explain_hot_queries()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error: {str(e)}"
+        )
+
+@app.get("/debug/event-loop")
+async def debug_event_loop():
+    """
+    Retraso del event loop: percentiles de las últimas mediciones, máximo y cantidad de
+    bloqueos desde el inicio, y el ejecutor que corre el trabajo de CPU de los recálculos.
+    """
+    return {
+        "lag": loop_lag.stats(),
+        "cpu_executor": {
+            "kind": cpu_executor.kind,
+            "workers": cpu_executor.workers,
+            "chunk_size": cpu_executor.chunk_size,
+            "min_items": cpu_executor.min_items
+        }
+    }
+
+def _check_profiling_access(token: Optional[str]):
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling deshabilitado (PROFILING_ENABLED)")
+    if not token_valid(token):
+        raise HTTPException(status_code=403, detail="X-Profile-Token inválido")
+
+def _get_profile(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Perfil no encontrado: {profile_id}")
+    return profile
+
+@app.get("/debug/profiles")
+async def debug_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Perfiles de solicitudes guardados en memoria, más nuevos primero"""
+    _check_profiling_access(x_profile_token)
+    profiles = profile_store.list()
+    return {"count": len(profiles), "profiles": profiles}
+
+@app.get("/debug/profiles/{profile_id}")
+async def debug_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """
+    Perfil de una solicitud: tiempo total y de CPU, fases de servicio (tiempo total,
+    CPU y MongoDB de cada una), comandos de MongoDB, serialización y envío de la
+    respuesta, y las pilas muestreadas más frecuentes.
+    """
+    _check_profiling_access(x_profile_token)
+    return _get_profile(profile_id).to_dict()
+
+@app.get("/debug/profiles/{profile_id}/stacks")
+async def debug_profile_stacks(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """Pilas muestreadas en formato collapsed (flamegraph.pl, speedscope)"""
+    _check_profiling_access(x_profile_token)
+    return PlainTextResponse(_get_profile(profile_id).folded_stacks())
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Métricas del proceso en formato de texto de Prometheus: latencia por ruta y estado,
+    solicitudes en curso, duración y documentos devueltos por comando de MongoDB, y
+    duración de los jobs de recálculo.
+    """
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
     """Verificar el estado de la API y la conexión a la base de datos"""
@@ -95,24 +287,90 @@ async def health_check():
             detail=f"Error de conexión a la base de datos: {str(e)}"
         )
 
-@app.post("/analyze-sentiments", response_model=SentimentResponse)
-async def analyze_sentiments():
+@app.get("/live")
+async def live():
+    """Probe de liveness: el proceso atiende solicitudes (no consulta la base)"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def ready():
     """
-    Analiza la colección de symbols y asigna sentimientos a los tweets.
-    - Si el tweet ya tiene sentimiento, lo mantiene.
-    - Si no tiene sentimiento, le asigna 'desconocido'.
+    Probe de readiness: 200 cuando terminó el arranque (pool precalentado y datos
+    precargados) y la última verificación periódica de la base fue exitosa; si no, 503.
+    Responde desde memoria: no genera carga en la base por más seguido que se consulte.
+    Incluye la duración de cada fase del arranque y el tiempo hasta quedar listo.
+    """
+    is_ready, status = readiness.status()
+    return JSONResponse(status_code=200 if is_ready else 503, content=jsonable_encoder(status))
+
+async def _run_job(response: Response, job_type: str, params: dict, wait: bool, error_message: str):
+    """
+    Inicia el job (o se une al activo del mismo tipo y parámetros). Sin 'wait' responde 202
+    con el job; con 'wait' espera a que termine y devuelve su resultado. Si el job activo
+    tiene otros parámetros responde 409.
     """
     try:
-        result = await SentimentService.analyze_and_update_sentiments()
-        return result
+        job, created = await job_manager.start(job_type, params)
+        if not wait:
+            response.status_code = 202
+            response.headers["Location"] = f"/jobs/{job['id']}"
+            return {**job, "created": created}
+        job = await job_manager.wait(job["id"])
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error al analizar sentimientos: {str(e)}"
+            detail=f"{error_message}: {str(e)}"
         )
+    if job is None or job["status"] != "completed":
+        detail = (job or {}).get("error") or f"job {(job or {}).get('status', 'desconocido')}"
+        raise HTTPException(
+            status_code=500,
+            detail=f"{error_message}: {detail}"
+        )
+    return job["result"]
 
-@app.post("/create-sentiment-collection", response_model=CreateSentimentCollectionResponse)
-async def create_sentiment_collection():
+@app.post("/analyze-sentiments", response_model=Union[SentimentResponse, JobResponse])
+async def analyze_sentiments(
+    response: Response,
+    mode: Literal["python", "backfill", "classify"] = Query(
+        "python",
+        description=(
+            "'python' recorre los símbolos en la API; 'backfill' actualiza solo los tweets sin sentimiento en MongoDB; "
+            "'classify' clasifica el texto de los tweets sin sentimiento con el clasificador léxico"
+        )
+    ),
+    wait: bool = Query(False, description="Esperar a que el job termine y devolver su resultado")
+):
+    """
+    Analiza la colección de symbols y asigna sentimientos a los tweets.
+    - Si el tweet ya tiene sentimiento, lo mantiene.
+    - Si no tiene sentimiento, le asigna 'desconocido' (o, con mode=classify, lo
+      clasifica a partir del texto con el clasificador léxico).
+    
+    Se ejecuta como job en segundo plano: responde 202 con el job (consultar
+    GET /jobs/{id}). Si ya hay un análisis en curso con el mismo modo, devuelve ese job
+    ('created': false); si es de otro modo, responde 409.
+    """
+    return await _run_job(
+        response, "analyze-sentiments", {"mode": mode}, wait, "Error al analizar sentimientos"
+    )
+
+@app.post("/create-sentiment-collection", response_model=Union[CreateSentimentCollectionResponse, JobResponse])
+async def create_sentiment_collection(
+    response: Response,
+    mode: Literal["python", "aggregation", "incremental", "vectorized", "partitioned"] = Query(
+        "python",
+        description=(
+            "'python' recorre los tweets en la API; 'aggregation' calcula los conteos en MongoDB; "
+            "'incremental' solo suma los tweets nuevos desde la última ejecución; "
+            "'vectorized' normaliza y agrega por lotes con NumPy; "
+            "'partitioned' reparte los símbolos entre todos los workers con leases en MongoDB"
+        )
+    ),
+    wait: bool = Query(False, description="Esperar a que el job termine y devolver su resultado")
+):
     """
     Crea o actualiza la colección 'symbols_sentiment' con el sentimiento agregado de cada símbolo.
     
@@ -128,18 +386,125 @@ async def create_sentiment_collection():
     - total_tweets: Total de tweets analizados
     - confidence_score: Score de confianza (0-1) basado en cantidad y distribución
     - last_updated: Fecha de última actualización
+    
+    Se ejecuta como job en segundo plano: responde 202 con el job (consultar
+    GET /jobs/{id}). Si ya hay un recálculo en curso con el mismo modo, devuelve ese job
+    ('created': false); si es de otro modo, responde 409.
     """
+    return await _run_job(
+        response, "create-sentiment-collection", {"mode": mode}, wait, "Error al crear colección de sentimientos"
+    )
+
+@app.post("/tweets/batch")
+async def ingest_tweets_batch(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, description="Clave del lote: un reintento con la misma clave no se cuenta dos veces")
+):
+    """
+    Inserta un lote de tweets ({"tweets": [...]}, cada uno con 'company' y opcionalmente
+    'text', 'sentiment', 'sentiment_prob' y 'created_at') y suma sus conteos a
+    symbols_sentiment en la misma solicitud.
+    
+    El cuerpo se valida tweet por tweet sin modelos Pydantic: los inválidos se informan
+    en 'errors' y no impiden insertar el resto. Responde 503 con 'Retry-After' si el
+    worker ya tiene INGEST_MAX_CONCURRENT_BATCHES lotes en proceso, y 409 si otro
+    proceso está procesando el lote con la misma 'Idempotency-Key'.
+    """
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="El cuerpo debe ser JSON")
+    tweets = body.get("tweets") if isinstance(body, dict) else None
+    if not isinstance(tweets, list):
+        raise HTTPException(status_code=400, detail="El cuerpo debe tener la forma {\"tweets\": [...]}")
+    try:
+        return await TweetIngestionService.ingest_tweets(tweets, idempotency_key=idempotency_key)
+    except IngestionOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    except IngestionInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al ingerir tweets: {str(e)}"
+        )
+
+@app.get("/jobs")
+async def list_jobs(
+    job_type: Optional[Literal["create-sentiment-collection", "analyze-sentiments"]] = Query(
+        None, alias="type", description="Filtrar por tipo"
+    ),
+    status: Optional[Literal["running", "interrupted", "completed", "failed", "cancelled"]] = Query(
+        None, description="Filtrar por estado"
+    ),
+    limit: int = Query(20, ge=1, le=200, description="Cantidad máxima de jobs")
+):
+    """Lista los jobs de recálculo, más recientes primero"""
     try:
-        result = await SentimentService.create_symbols_sentiment_collection()
-        return result
+        return {"jobs": await job_manager.list(job_type=job_type, status=status, limit=limit)}
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error al crear colección de sentimientos: {str(e)}"
+            detail=f"Error al listar jobs: {str(e)}"
         )
 
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Estado de un job: status, avance (símbolos procesados, tweets leídos, ritmo y ETA),
+    resultado o error.
+    """
+    try:
+        job = await job_manager.get(job_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener el job: {str(e)}"
+        )
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+    return job
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Pide la cancelación de un job activo (el worker que lo ejecuta lo detiene en su próximo heartbeat)"""
+    try:
+        job = await job_manager.cancel(job_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al cancelar el job: {str(e)}"
+        )
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+    return job
+
+def _split_list(value: Optional[str]) -> Optional[List[str]]:
+    """Convierte un parámetro separado por comas en lista"""
+    if value is None:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    return items or None
+
 @app.get("/symbols-sentiment")
-async def get_symbols_sentiment():
+async def get_symbols_sentiment(
+    request: Request,
+    sector: Optional[str] = Query(None, description="Filtrar por sector"),
+    overall_sentiment: Optional[Literal["positivo", "negativo", "neutral", "mixto"]] = Query(
+        None, description="Filtrar por sentimiento general"
+    ),
+    min_confidence: Optional[float] = Query(None, ge=0, le=1, description="Confidence score mínimo"),
+    min_total_tweets: Optional[int] = Query(None, ge=0, description="Cantidad mínima de tweets"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas"),
+    sort: Optional[Literal["symbol", "confidence_score", "total_tweets"]] = Query(None, description="Campo de orden"),
+    order: Literal["asc", "desc"] = Query("asc", description="Dirección del orden"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="Cursor 'next_cursor' de la página anterior"),
+    stream: bool = Query(False, description="Devolver NDJSON en streaming (un símbolo por línea)"),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000, description="Documentos por lote del cursor en streaming")
+):
     """
     Obtiene todos los sentimientos agregados de símbolos desde la colección 'symbols_sentiment'.
     
@@ -150,30 +515,217 @@ async def get_symbols_sentiment():
     - total_tweets: Cantidad de tweets analizados
     - confidence_score: Score de confianza del análisis
     - last_updated: Fecha de última actualización
+    
+    Sin parámetros se sirve desde una instantánea ya serializada (y comprimida con gzip)
+    que se publica en cada recálculo. Devuelve 'ETag' y responde 304 ante un
+    'If-None-Match' vigente.
+    
+    Con filtros, 'fields', 'sort', 'limit' o 'cursor' devuelve una página
+    ({count, symbols, next_cursor}) paginada por clave sobre índices.
+    
+    Con 'Accept: application/x-ndjson' o '?stream=true' devuelve un símbolo por línea,
+    leído del cursor por lotes (admite los filtros y 'fields').
     """
+    if wants_ndjson(request, stream):
+        try:
+            records = SentimentService.iter_symbols_sentiment(
+                sector=sector,
+                overall_sentiment=overall_sentiment,
+                min_confidence=min_confidence,
+                min_total_tweets=min_total_tweets,
+                fields=_split_list(fields),
+                batch_size=batch_size
+            )
+            # Validar los campos antes de empezar a enviar la respuesta
+            SentimentService._projection(_split_list(fields))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ndjson_response(records)
+    
+    paginated = any(value is not None for value in (
+        sector, overall_sentiment, min_confidence, min_total_tweets, fields, sort, limit, cursor
+    ))
     try:
-        result = await SentimentService.get_symbols_sentiment()
-        return result
+        if not paginated:
+            snapshot = await symbols_sentiment_snapshot.get()
+            return snapshot_response(request, snapshot)
+        
+        return await SentimentService.query_symbols_sentiment(
+            sector=sector,
+            overall_sentiment=overall_sentiment,
+            min_confidence=min_confidence,
+            min_total_tweets=min_total_tweets,
+            fields=_split_list(fields),
+            sort=sort or "symbol",
+            order=order,
+            limit=limit or 50,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al obtener sentimientos de símbolos: {str(e)}"
         )
 
+@app.get("/symbols-sentiment/batch")
+async def get_symbols_sentiment_batch(
+    symbols: str = Query(..., description="Símbolos separados por comas"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas")
+):
+    """Obtiene el sentimiento agregado de varios símbolos en una sola consulta"""
+    symbol_list = _split_list(symbols)
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="Debe indicar al menos un símbolo")
+    if len(symbol_list) > 500:
+        raise HTTPException(status_code=400, detail="Se admiten como máximo 500 símbolos por consulta")
+    try:
+        return await SentimentService.get_symbols_sentiment_batch(symbol_list, fields=_split_list(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener sentimientos de símbolos: {str(e)}"
+        )
+
+@app.get("/symbols-sentiment/{symbol}")
+async def get_symbol_sentiment(
+    symbol: str,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas")
+):
+    """Obtiene el sentimiento agregado de un símbolo"""
+    try:
+        result = await SentimentService.get_symbol_sentiment(symbol, fields=_split_list(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener sentimiento del símbolo: {str(e)}"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Símbolo no encontrado: {symbol}")
+    return result
+
+@app.get("/symbols-sentiment/{symbol}/timeseries")
+async def get_symbol_sentiment_timeseries(
+    symbol: str,
+    window: str = Query("24h", description="Ventana hacia atrás desde la hora actual, por ejemplo '24h' o '7d'"),
+    step: str = Query("1h", description="Tamaño de cada punto de la serie, por ejemplo '1h' o '1d'")
+):
+    """
+    Serie temporal del sentimiento de un símbolo calculada solo con buckets precalculados.
+    
+    Devuelve el resumen de la ventana ('summary') y un punto por paso ('points'), cada
+    uno con sentiment_counts, sentiment_percentages, total_tweets, overall_sentiment y
+    confidence_score. Los tweets anteriores a BUCKETS_HOURLY_RETENTION_DAYS están
+    consolidados por día.
+    """
+    try:
+        result = await SentimentTimeseriesService.get_timeseries(symbol, window=window, step=step)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener la serie temporal del símbolo: {str(e)}"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Símbolo no encontrado: {symbol}")
+    return result
+
 @app.get("/symbols-summary")
-async def get_symbols_summary():
+async def get_symbols_summary(
+    request: Request,
+    sector: Optional[str] = Query(None, description="Filtrar por sector"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="Cursor 'next_cursor' de la página anterior"),
+    stream: bool = Query(False, description="Devolver NDJSON en streaming (un símbolo por línea)"),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000, description="Documentos por lote del cursor en streaming")
+):
     """
-    Obtiene un resumen de todos los símbolos con información sobre sus tweets y sentimientos
+    Obtiene un resumen de todos los símbolos con información sobre sus tweets y sentimientos.
+    Se arma con los conteos de symbols_sentiment, sin recorrer la colección tweets;
+    'last_computed_at' indica el último recálculo y 'last_updated' de cada símbolo el
+    último cambio de sus conteos.
+    Con 'limit' devuelve una página ordenada por símbolo y el cursor de la siguiente.
+    Con 'Accept: application/x-ndjson' o '?stream=true' devuelve un símbolo por línea.
     """
+    if wants_ndjson(request, stream):
+        return ndjson_response(SentimentService.iter_symbols_summary(sector=sector, batch_size=batch_size))
     try:
-        summary = await SentimentService.get_symbols_summary()
+        summary = await SentimentService.get_symbols_summary(sector=sector, limit=limit, cursor=cursor)
         return summary
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al obtener resumen: {str(e)}"
         )
 
+@app.get("/sectors-sentiment")
+async def get_sectors_sentiment():
+    """
+    Sentimiento agregado de cada sector: conteos sumados de sus símbolos, porcentajes,
+    sentimiento general y confianza ponderados por cantidad de tweets, y cantidad de símbolos.
+    Se lee de agregados mantenidos (un documento por sector), sin recorrer símbolos ni tweets.
+    """
+    try:
+        return await SectorRollupService.get_sectors_sentiment()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener sentimientos de sectores: {str(e)}"
+        )
+
+@app.get("/market-sentiment")
+async def get_market_sentiment():
+    """Sentimiento agregado de todo el mercado, leído de un único documento mantenido"""
+    try:
+        result = await SectorRollupService.get_market_sentiment()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener sentimiento del mercado: {str(e)}"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Todavía no hay agregado de mercado: ejecutar POST /create-sentiment-collection"
+        )
+    return result
+
+@app.get("/sentiment-feed/status")
+async def sentiment_feed_status(request: Request):
+    """
+    Estado del consumidor del change feed de tweets: si está corriendo, el lag actual
+    (antigüedad del evento pendiente más viejo), eventos pendientes y aplicados.
+    """
+    feed = request.app.state.sentiment_feed
+    if feed is None:
+        return {"running": False, "enabled": False}
+    return {"enabled": True, **feed.status()}
+
+@app.get("/classification-cache/stats")
+async def classification_cache_stats():
+    """
+    Estadísticas de la caché de clasificaciones de este worker (copias dentro del lote,
+    aciertos y fallos en memoria y en MongoDB, desalojos de la LRU) y tamaño de la
+    colección persistente, para dimensionarla según la tasa real de duplicados.
+    """
+    try:
+        db = Database.get_db()
+        store_size = await db[classification_cache.COLLECTION].estimated_document_count()
+        return {**classification_cache.stats(), "store_size": store_size}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener estadísticas de la caché: {str(e)}"
+        )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
@@ -0,0 +1,237 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from pymongo import monitoring
+
+# Métricas en memoria del proceso con exposición en formato de texto de Prometheus.
+# Los listeners de pymongo se ejecutan en los hilos de Motor, por eso cada métrica
+# protege sus series con un lock (una sección crítica de pocas operaciones).
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return self._header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in series
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._series[labels] = value
+
+class Histogram(Metric):
+    """Histograma acumulativo con buckets fijos: observe es O(log buckets)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [conteos por bucket (+Inf al final), suma, cantidad]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items()]
+        lines = self._header()
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Duración de las solicitudes HTTP por ruta", ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Solicitudes HTTP en curso", ("method",)
+))
+MONGO_COMMAND_DURATION = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "Duración de los comandos de MongoDB", ("command", "collection")
+))
+MONGO_DOCUMENTS_RETURNED = registry.register(Counter(
+    "mongodb_command_documents_returned_total", "Documentos devueltos por los comandos de MongoDB",
+    ("command", "collection")
+))
+MONGO_COMMAND_FAILURES = registry.register(Counter(
+    "mongodb_command_failures_total", "Comandos de MongoDB con error", ("command", "collection")
+))
+STARTUP_PHASE_SECONDS = registry.register(Gauge(
+    "startup_phase_seconds", "Duración de cada fase del arranque del worker", ("phase",)
+))
+INGESTED_TWEETS = registry.register(Counter(
+    "ingested_tweets_total", "Tweets recibidos por POST /tweets/batch según resultado", ("outcome",)
+))
+INGEST_BATCHES = registry.register(Counter(
+    "ingest_batches_total", "Lotes de POST /tweets/batch según resultado", ("status",)
+))
+EVENT_LOOP_LAG = registry.register(Histogram(
+    "event_loop_lag_seconds", "Retraso del event loop respecto de una tarea periódica (loop_lag.py)"
+))
+EVENT_LOOP_STALLS = registry.register(Counter(
+    "event_loop_stalls_total", "Mediciones del event loop con retraso de al menos LOOP_LAG_STALL_MS"
+))
+JOB_DURATION = registry.register(Histogram(
+    "recompute_job_duration_seconds", "Duración de los jobs de recálculo por tipo y estado final",
+    ("type", "status"), buckets=JOB_BUCKETS
+))
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Listener de comandos de pymongo: duración, documentos devueltos y errores por
+    comando y colección. Se registra en el cliente de Motor en Database.connect_db.
+    """
+
+    def __init__(self):
+        # (connection_id, request_id) -> colección del comando en curso
+        self._collections: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        command_name = event.command_name
+        if command_name == "getMore":
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(command_name)
+        self._collections[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def _collection(self, event) -> str:
+        return self._collections.pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        collection = self._collection(event)
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name, collection)
+        returned = self._documents_returned(event.reply)
+        if returned:
+            MONGO_DOCUMENTS_RETURNED.inc(event.command_name, collection, amount=returned)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name, collection)
+        MONGO_COMMAND_FAILURES.inc(event.command_name, collection)
+
+    @staticmethod
+    def _documents_returned(reply) -> int:
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict):
+            return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+        if "value" in reply:
+            # findAndModify
+            return 1 if reply["value"] is not None else 0
+        return 0
+
+def _route_template(scope) -> str:
+    """Plantilla de la ruta ('/symbols-sentiment/{symbol}') para acotar la cardinalidad"""
+    route = scope.get("route")
+    if route is None:
+        # Hay versiones de Starlette que no dejan la ruta en el scope: se busca por endpoint
+        endpoint = scope.get("endpoint")
+        router = scope.get("router")
+        if endpoint is not None and router is not None:
+            route = next((r for r in router.routes if getattr(r, "endpoint", None) is endpoint), None)
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia por ruta y estado, y solicitudes en curso"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method, _route_template(scope), status[0])
+
+def render_metrics() -> str:
+    return registry.render()
@@ -22,9 +22,13 @@ class SentimentResponse(BaseModel):
     """Respuesta del análisis de sentimientos"""
     total_symbols: int
     symbols_with_tweets: int
-    tweets_updated: int
+    tweets_updated: Optional[int] = None
+    symbols_updated: Optional[int] = None
     tweets_with_sentiment: int
     tweets_without_sentiment: int
+    symbols_update: Optional[SentimentUpdate] = None
+    tweets_per_second: Optional[float] = None
+    cache: Optional[dict] = None
     message: str
 
 class SymbolSentiment(BaseModel):
@@ -46,4 +50,27 @@ class CreateSentimentCollectionResponse(BaseModel):
     symbols_with_negative: int
     symbols_with_neutral: int
     symbols_with_mixed: int
+    symbols_skipped: Optional[int] = None
+    symbols_written: Optional[int] = None
+    writes_skipped: Optional[int] = None
+    tweets_processed: Optional[int] = None
+    partitions: Optional[int] = None
     message: str
+
+class JobResponse(BaseModel):
+    """Estado de un job de recálculo en segundo plano"""
+    id: str
+    type: str
+    params: dict
+    status: str
+    created: Optional[bool] = None
+    owner: Optional[str] = None
+    attempts: int
+    cancel_requested: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: dict
+    result: Optional[dict] = None
+    error: Optional[str] = None
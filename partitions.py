@@ -0,0 +1,280 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from config import settings
+from database import Database
+from jobs import WORKER_ID
+from progress import JobProgress
+from services import SentimentService, SentimentTimeseriesService
+
+class PartitionWorker:
+    """
+    Procesa particiones de recálculo tomadas con un lease en la colección 'recompute_partitions'.
+
+    Cualquier worker de cualquier instancia puede tomar una partición pendiente o una
+    cuyo lease venció (su worker murió). Mientras la procesa renueva el lease; si lo
+    pierde, abandona la partición. Cada partición se reconstruye con $set por símbolo,
+    así que procesarla dos veces deja el mismo resultado.
+    """
+
+    COLLECTION = "recompute_partitions"
+
+    def __init__(self, lease_seconds: float = None, poll_interval: float = None, max_attempts: int = None,
+                 idle_poll_interval: float = None):
+        self.worker_id = WORKER_ID
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.RECOMPUTE_LEASE_SECONDS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.RECOMPUTE_POLL_SECONDS
+        self.idle_poll_interval = max(self.poll_interval, (
+            idle_poll_interval if idle_poll_interval is not None else settings.RECOMPUTE_IDLE_POLL_SECONDS
+        ))
+        self.max_attempts = max_attempts if max_attempts is not None else settings.RECOMPUTE_MAX_ATTEMPTS
+        self._task: Optional[asyncio.Task] = None
+
+    def _collection(self):
+        return Database.get_db()[self.COLLECTION]
+
+    async def claim(self, run_id: Optional[str] = None) -> Optional[Dict]:
+        """Toma la próxima partición libre (pendiente o con lease vencido), opcionalmente de un run"""
+        now = datetime.utcnow()
+        query = {
+            "$or": [
+                {"status": "pending"},
+                {"status": "leased", "lease_expires_at": {"$lt": now}}
+            ],
+            "attempts": {"$lt": self.max_attempts}
+        }
+        if run_id is not None:
+            query["run_id"] = run_id
+        return await self._collection().find_one_and_update(
+            query,
+            {"$set": {
+                "status": "leased",
+                "lease_owner": self.worker_id,
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+            }, "$inc": {"attempts": 1}},
+            sort=[("created_at", ASCENDING), ("index", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def _recompute(partition: Dict) -> Dict:
+        stats = await SentimentService._recompute_symbols(partition["symbols"])
+        await SentimentTimeseriesService.rebuild_buckets([symbol["symbol"] for symbol in partition["symbols"]])
+        return stats
+
+    def _release_status(self, partition: Dict) -> str:
+        """Estado de una partición que no se completó: 'failed' si agotó los intentos"""
+        return "failed" if partition["attempts"] >= self.max_attempts else "pending"
+
+    async def process(self, partition: Dict) -> bool:
+        """Procesa una partición tomada renovando su lease; True si quedó completa"""
+        collection = self._collection()
+        owned = {"_id": partition["_id"], "lease_owner": self.worker_id, "status": "leased"}
+        work = asyncio.create_task(self._recompute(partition))
+        try:
+            while not work.done():
+                await asyncio.wait({work}, timeout=self.lease_seconds / 3)
+                if work.done():
+                    break
+                renewed = await collection.update_one(
+                    owned, {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                )
+                if renewed.matched_count == 0:
+                    # Otro worker tomó la partición tras vencer el lease
+                    work.cancel()
+                    return False
+        except asyncio.CancelledError:
+            # Apagado del worker: liberar la partición para que otro la tome de inmediato
+            # (o darla por fallida si este era su último intento: ya no se puede tomar)
+            work.cancel()
+            await collection.update_one(owned, {"$set": {
+                "status": self._release_status(partition), "lease_owner": None,
+                "error": "Worker detenido durante el proceso"
+            }})
+            raise
+
+        if work.exception() is not None:
+            error = work.exception()
+            await collection.update_one(owned, {"$set": {
+                "status": self._release_status(partition), "lease_owner": None,
+                "error": f"{type(error).__name__}: {error}"
+            }})
+            return False
+
+        finished = await collection.update_one(owned, {"$set": {
+            "status": "done", "result": work.result(), "finished_at": datetime.utcnow()
+        }})
+        return finished.matched_count > 0
+
+    async def run_forever(self):
+        """
+        Toma y procesa particiones de cualquier recálculo en curso. Sin particiones
+        libres, el intervalo de consulta se duplica desde poll_interval hasta
+        idle_poll_interval; vuelve al mínimo al tomar una.
+        """
+        delay = self.poll_interval
+        while True:
+            try:
+                partition = await self.claim()
+                if partition is not None:
+                    await self.process(partition)
+                    delay = self.poll_interval
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error en el worker de particiones: {type(e).__name__}: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.idle_poll_interval)
+
+    async def start(self):
+        self._task = asyncio.create_task(self.run_forever())
+        print(f"Worker de particiones de recálculo iniciado ({self.worker_id})")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+class PartitionedRecompute:
+    """
+    Reconstrucción completa de symbols_sentiment repartida en particiones de símbolos.
+
+    El coordinador (el job de recálculo) crea las particiones de un run, procesa
+    particiones como un worker más y espera a que todas estén completas. Los demás
+    workers (PartitionWorker en cada proceso de la API o 'python partitions.py')
+    toman las restantes, de modo que el recálculo escala con la cantidad de workers
+    usando solo MongoDB para coordinarse.
+    """
+
+    def __init__(self, partition_size: int = None, worker: PartitionWorker = None):
+        self.partition_size = partition_size or settings.RECOMPUTE_PARTITION_SIZE
+        self.worker = worker or PartitionWorker()
+
+    def _build_partitions(self, run_id: str, sectors: Dict[str, Optional[str]]) -> List[Dict]:
+        """Particiones disjuntas de símbolos ordenados por nombre"""
+        names = sorted(sectors)
+        now = datetime.utcnow()
+        partitions = []
+        for index, offset in enumerate(range(0, len(names), self.partition_size)):
+            partitions.append({
+                "_id": f"{run_id}:{index}",
+                "run_id": run_id,
+                "index": index,
+                "symbols": [{"symbol": name, "sector": sectors[name]} for name in names[offset:offset + self.partition_size]],
+                "status": "pending",
+                "attempts": 0,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "created_at": now,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            })
+        return partitions
+
+    async def run(self, progress: Optional[JobProgress] = None) -> Dict:
+        progress = progress or JobProgress()
+        db = Database.get_db()
+        collection = db[PartitionWorker.COLLECTION]
+
+        symbols = await db["symbols"].find({}, {"symbol": 1, "sector": 1}).to_list(length=None)
+        # Un único sector por símbolo (el último gana, como en la reconstrucción completa)
+        sectors = {}
+        for symbol in symbols:
+            sectors[symbol.get("symbol", "Unknown")] = symbol.get("sector", None)
+        progress.set_total(len(sectors))
+
+        run_id = uuid.uuid4().hex
+        partitions = self._build_partitions(run_id, sectors)
+        if partitions:
+            await collection.insert_many(partitions)
+
+        reported_symbols = 0
+        reported_tweets = 0
+        try:
+            while True:
+                partition = await self.worker.claim(run_id)
+                if partition is not None:
+                    await self.worker.process(partition)
+
+                # Particiones que ya no se pueden tomar: lease vencido o liberadas tras
+                # agotar los reintentos
+                await collection.update_many(
+                    {"run_id": run_id, "attempts": {"$gte": self.worker.max_attempts}, "$or": [
+                        {"status": "leased", "lease_expires_at": {"$lt": datetime.utcnow()}},
+                        {"status": "pending"}
+                    ]},
+                    {"$set": {"status": "failed", "error": "Sin intentos disponibles tras agotar los reintentos"}}
+                )
+                states = await collection.find(
+                    {"run_id": run_id}, {"index": 1, "status": 1, "symbols": 1, "result": 1, "error": 1}
+                ).to_list(length=None)
+
+                done = [state for state in states if state["status"] == "done"]
+                done_symbols = sum(len(state["symbols"]) for state in done)
+                done_tweets = sum(state["result"]["tweets_processed"] for state in done)
+                progress.advance(symbols=done_symbols - reported_symbols, tweets=done_tweets - reported_tweets)
+                reported_symbols, reported_tweets = done_symbols, done_tweets
+
+                failed = [state for state in states if state["status"] == "failed"]
+                if failed:
+                    raise RuntimeError(f"Falló la partición {failed[0]['index']}: {failed[0]['error']}")
+                if len(done) == len(states):
+                    break
+                if partition is None:
+                    await asyncio.sleep(self.worker.poll_interval)
+        except asyncio.CancelledError:
+            # Las particiones aún no tomadas no se procesan; las tomadas terminan igual
+            await collection.update_many({"run_id": run_id, "status": "pending"}, {"$set": {"status": "cancelled"}})
+            raise
+
+        sentiment_stats = {}
+        symbols_created = 0
+        symbols_written = 0
+        writes_skipped = 0
+        for state in done:
+            symbols_created += state["result"]["symbols_created"]
+            symbols_written += state["result"].get("symbols_written", 0)
+            writes_skipped += state["result"].get("writes_skipped", 0)
+            for sentiment, count in state["result"]["sentiment_stats"].items():
+                sentiment_stats[sentiment] = sentiment_stats.get(sentiment, 0) + count
+        await collection.delete_many({"run_id": run_id})
+
+        return {
+            "total_symbols_processed": len(symbols),
+            "symbols_created": symbols_created,
+            "symbols_written": symbols_written,
+            "writes_skipped": writes_skipped,
+            "symbols_with_positive": sentiment_stats.get("positivo", 0),
+            "symbols_with_negative": sentiment_stats.get("negativo", 0),
+            "symbols_with_neutral": sentiment_stats.get("neutral", 0),
+            "symbols_with_mixed": sentiment_stats.get("mixto", 0),
+            "tweets_processed": reported_tweets,
+            "partitions": len(partitions),
+            "message": (
+                f"Colección 'symbols_sentiment' creada/actualizada exitosamente con {symbols_created} símbolos "
+                f"en {len(partitions)} particiones."
+            )
+        }
+
+async def _run_worker():
+    await Database.connect_db()
+    worker = PartitionWorker()
+    print(f"Worker de particiones de recálculo iniciado ({worker.worker_id})")
+    try:
+        await worker.run_forever()
+    finally:
+        await Database.close_db()
+
+if __name__ == "__main__":
+    # Worker dedicado: toma particiones de los recálculos que inicie cualquier instancia de la API
+    asyncio.run(_run_worker())
@@ -0,0 +1,364 @@
+import functools
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+from config import settings
+
+# Profiling bajo demanda de solicitudes (opt-in, PROFILING_ENABLED).
+#
+# Una solicitud se perfila si trae el header 'X-Profile-Token' con PROFILING_TOKEN o si
+# cae en la muestra PROFILING_SAMPLE_RATE de las rutas de PROFILING_SAMPLED_ROUTES. El
+# perfil viaja en un ContextVar: los métodos decorados con @profiled registran su fase
+# (tiempo total, CPU del hilo del loop y tiempo en MongoDB), el listener de comandos
+# suma cada comando a la fase en curso (Motor copia el contexto a sus hilos) y un hilo
+# muestrea la pila del loop cada PROFILING_STACK_INTERVAL_MS.
+#
+# Los jobs corren en un contexto propio (ver jobs.py): un job lanzado por una solicitud
+# perfilada tiene su propio perfil, 'job-<id del job>', en lugar de seguir escribiendo
+# en el de la solicitud cuando esta ya terminó.
+#
+# La CPU informada ('loop_cpu_ms') es la del hilo del loop mientras duró el perfil o la
+# fase: incluye lo que hayan hecho en ese lapso otras solicitudes concurrentes y no
+# incluye el trabajo enviado al pool de cpu_executor.
+#
+# Sin perfil activo, @profiled cuesta una lectura de ContextVar y el middleware y el
+# listener no se instalan si PROFILING_ENABLED es falso.
+
+PROFILE_HEADER = "x-profile-token"
+MAX_TOP_STACKS = 20
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_phase: ContextVar[Optional[str]] = ContextVar("request_profile_phase", default=None)
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+class RequestProfile:
+    """Fases, comandos de MongoDB y pilas muestreadas de una solicitud"""
+
+    def __init__(self, method: str, path: str, trigger: str, profile_id: Optional[str] = None):
+        self.id = profile_id or uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        # Código HTTP de la respuesta, o el estado final en el perfil de un job
+        self.status = None
+        # Perfiles de los jobs lanzados por la solicitud
+        self.job_profiles: List[str] = []
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        self._cpu_started = time.thread_time()
+        self._response_started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._last_phase_end: Optional[float] = None
+        self.total = 0.0
+        self.loop_cpu = 0.0
+        self.phases: Dict[str, Dict] = OrderedDict()
+        self.commands: Dict[str, Dict] = {}
+        self.stacks: Counter = Counter()
+        self.stack_samples = 0
+        # Los comandos se registran desde los hilos de Motor
+        self._lock = threading.Lock()
+
+    def _phase_entry(self, name: str) -> Dict:
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = {"calls": 0, "wall": 0.0, "cpu": 0.0, "db": 0.0, "db_commands": 0}
+        return entry
+
+    def add_phase(self, name: str, wall: float, cpu: float, top_level: bool):
+        with self._lock:
+            entry = self._phase_entry(name)
+            entry["calls"] += 1
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+            if top_level:
+                self._last_phase_end = time.perf_counter()
+
+    def add_command(self, command_name: str, duration: float, phase: Optional[str]):
+        with self._lock:
+            command = self.commands.setdefault(command_name, {"count": 0, "seconds": 0.0})
+            command["count"] += 1
+            command["seconds"] += duration
+            if phase is not None:
+                entry = self._phase_entry(phase)
+                entry["db"] += duration
+                entry["db_commands"] += 1
+
+    def add_stack(self, stack: str):
+        with self._lock:
+            self.stacks[stack] += 1
+            self.stack_samples += 1
+
+    def response_started(self, status: int):
+        self.status = status
+        self._response_started = time.perf_counter()
+
+    def finish(self):
+        self._finished = time.perf_counter()
+        self.total = self._finished - self._started
+        self.loop_cpu = time.thread_time() - self._cpu_started
+
+    def folded_stacks(self) -> str:
+        """Pilas en formato 'collapsed' (flamegraph.pl, speedscope): 'raíz;...;hoja muestras'"""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "status": self.status,
+            "started_at": self.started_at,
+            "total_ms": _ms(self.total)
+        }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            phases = [
+                {
+                    "name": name,
+                    "calls": entry["calls"],
+                    "wall_ms": _ms(entry["wall"]),
+                    "loop_cpu_ms": _ms(entry["cpu"]),
+                    "db_ms": _ms(entry["db"]),
+                    "db_commands": entry["db_commands"]
+                }
+                for name, entry in self.phases.items()
+            ]
+            commands = {
+                name: {"count": command["count"], "ms": _ms(command["seconds"])}
+                for name, command in self.commands.items()
+            }
+            top_stacks = [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common(MAX_TOP_STACKS)]
+
+        # Serialización: desde el fin de la última fase de servicio hasta el inicio de la respuesta
+        serialization = send = None
+        if self._response_started is not None and self._last_phase_end is not None \
+                and self._response_started >= self._last_phase_end:
+            serialization = _ms(self._response_started - self._last_phase_end)
+        if self._response_started is not None and self._finished is not None:
+            send = _ms(self._finished - self._response_started)
+        return {
+            **self.summary(),
+            "loop_cpu_ms": _ms(self.loop_cpu),
+            "db_ms": round(sum(command["ms"] for command in commands.values()), 3),
+            "db_commands": sum(command["count"] for command in commands.values()),
+            "serialization_ms": serialization,
+            "send_ms": send,
+            "job_profiles": list(self.job_profiles),
+            "phases": phases,
+            "commands": commands,
+            "stack_samples": self.stack_samples,
+            "stack_interval_ms": settings.PROFILING_STACK_INTERVAL_MS,
+            "top_stacks": top_stacks
+        }
+
+def profiled(name: str):
+    """
+    Registra la fase 'name' en el perfil de la solicitud en curso (si hay uno).
+    Los tiempos de las fases son inclusivos; los comandos de MongoDB se atribuyen a
+    la fase más interna.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await fn(*args, **kwargs)
+            top_level = _phase.get() is None
+            token = _phase.set(name)
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                profile.add_phase(name, time.perf_counter() - wall, time.thread_time() - cpu, top_level)
+                _phase.reset(token)
+        return wrapper
+    return decorator
+
+class ProfileCommandListener(monitoring.CommandListener):
+    """Suma la duración de cada comando de MongoDB al perfil de la solicitud que lo envió"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        profile = _current.get()
+        if profile is not None:
+            profile.add_command(event.command_name, event.duration_micros / 1e6, _phase.get())
+
+    def failed(self, event):
+        self.succeeded(event)
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class StackSampler:
+    """
+    Hilo que muestrea la pila del hilo del loop mientras haya perfiles activos.
+    Las muestras incluyen todo lo que corre en el loop (también otras solicitudes
+    concurrentes); las esperas de E/S aparecen como el select del loop.
+    """
+
+    def __init__(self):
+        self._profiles: List[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+
+    def attach(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.append(profile)
+            self._target = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+                self._thread.start()
+
+    def detach(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self):
+        interval = settings.PROFILING_STACK_INTERVAL_MS / 1000
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+                target = self._target
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            stack = _fold(frame)
+            del frame
+            for profile in profiles:
+                profile.add_stack(stack)
+
+class ProfileStore:
+    """Últimos PROFILING_MAX_PROFILES perfiles en memoria; opcionalmente también en PROFILING_DIR"""
+
+    def __init__(self):
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+
+    def add(self, profile: RequestProfile):
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > settings.PROFILING_MAX_PROFILES:
+            self._profiles.popitem(last=False)
+        if settings.PROFILING_DIR:
+            self._write(profile)
+
+    @staticmethod
+    def _write(profile: RequestProfile):
+        try:
+            os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+            base = os.path.join(settings.PROFILING_DIR, f"{profile.started_at:%Y%m%dT%H%M%S}-{profile.id}")
+            with open(f"{base}.json", "w") as f:
+                json.dump(profile.to_dict(), f, indent=2, default=str)
+            with open(f"{base}.folded", "w") as f:
+                f.write(profile.folded_stacks())
+        except OSError as e:
+            print(f"No se pudo guardar el perfil {profile.id}: {e}")
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        """Perfiles guardados, más nuevos primero"""
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+sampler = StackSampler()
+profile_store = ProfileStore()
+
+def current_profile() -> Optional[RequestProfile]:
+    """Perfil de la solicitud en curso (None si no se está perfilando)"""
+    return _current.get()
+
+def start_job_profile(job_id: str, job_type: str) -> RequestProfile:
+    """
+    Abre el perfil del job 'job_id' en el contexto actual, que debe ser el propio del
+    job: las fases y los comandos del job se registran ahí.
+    """
+    profile = RequestProfile("JOB", job_type, "job", profile_id=f"job-{job_id}")
+    _current.set(profile)
+    sampler.attach(profile)
+    return profile
+
+def finish_job_profile(profile: RequestProfile, status: str):
+    sampler.detach(profile)
+    profile.status = status
+    profile.finish()
+    profile_store.add(profile)
+
+def token_valid(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode(), settings.PROFILING_TOKEN.encode()
+    )
+
+def _sampled_routes() -> List[str]:
+    return [route.strip() for route in settings.PROFILING_SAMPLED_ROUTES.split(",") if route.strip()]
+
+class ProfilingMiddleware:
+    """Middleware ASGI: decide si se perfila la solicitud y guarda el perfil al terminar"""
+
+    def __init__(self, app):
+        self.app = app
+        self.sampled_routes = set(_sampled_routes())
+
+    def _trigger(self, scope) -> Optional[str]:
+        if scope["path"].startswith("/debug/profiles"):
+            return None
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER.encode():
+                return "header" if token_valid(value.decode("latin-1")) else None
+        if settings.PROFILING_SAMPLE_RATE > 0 and scope["path"] in self.sampled_routes \
+                and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], trigger)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.response_started(message["status"])
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        sampler.attach(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.detach(profile)
+            profile.finish()
+            _current.reset(token)
+            profile_store.add(profile)
@@ -0,0 +1,38 @@
+import time
+from typing import Dict, Optional
+
+class JobProgress:
+    """
+    Avance de un recálculo en curso: símbolos procesados, tweets leídos, ritmo y ETA.
+    Los servicios lo actualizan en memoria; el gestor de jobs lo persiste periódicamente.
+    """
+
+    def __init__(self):
+        self.symbols_total: Optional[int] = None
+        self.symbols_processed = 0
+        self.tweets_scanned = 0
+        self._started = time.monotonic()
+
+    def set_total(self, symbols_total: int):
+        self.symbols_total = symbols_total
+
+    def advance(self, symbols: int = 0, tweets: int = 0):
+        self.symbols_processed += symbols
+        self.tweets_scanned += tweets
+
+    def snapshot(self) -> Dict:
+        elapsed = time.monotonic() - self._started
+        symbols_per_second = self.symbols_processed / elapsed if elapsed > 0 else 0.0
+        eta_seconds = None
+        if self.symbols_total is not None and symbols_per_second > 0:
+            remaining = max(self.symbols_total - self.symbols_processed, 0)
+            eta_seconds = round(remaining / symbols_per_second, 1)
+        return {
+            "symbols_total": self.symbols_total,
+            "symbols_processed": self.symbols_processed,
+            "tweets_scanned": self.tweets_scanned,
+            "elapsed_seconds": round(elapsed, 1),
+            "symbols_per_second": round(symbols_per_second, 2),
+            "tweets_per_second": round(self.tweets_scanned / elapsed, 1) if elapsed > 0 else 0.0,
+            "eta_seconds": eta_seconds
+        }
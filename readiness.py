@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from config import settings
+from database import Database
+from metrics import STARTUP_PHASE_SECONDS
+
+# Momento en que se importó la aplicación: referencia del tiempo de arranque
+PROCESS_STARTED = time.monotonic()
+
+class ReadinessMonitor:
+    """
+    Estado de preparación del worker para los probes del orquestador.
+
+    El estado de la base se verifica en segundo plano cada READINESS_CHECK_INTERVAL_SECONDS,
+    de modo que /ready responde desde memoria sin importar cuán seguido se consulte.
+    El worker está listo cuando terminó el arranque (pool precalentado y datos
+    frecuentes precargados) y la última verificación de la base es exitosa y reciente.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval if interval is not None else settings.READINESS_CHECK_INTERVAL_SECONDS
+        self.started = False
+        self.ready_after_seconds: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.database_ok = False
+        self.checked_at: Optional[datetime] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._checked_monotonic: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record_phase(self, phase: str, started: float):
+        """Registra la duración de una fase del arranque iniciada en 'started' (time.monotonic())"""
+        elapsed = round(time.monotonic() - started, 3)
+        self.phases[phase] = elapsed
+        STARTUP_PHASE_SECONDS.set(elapsed, phase)
+
+    async def check(self) -> bool:
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(Database.get_db().command("ping"), timeout=settings.READINESS_PING_TIMEOUT_SECONDS)
+            self.database_ok = True
+            self.error = None
+        except Exception as e:
+            self.database_ok = False
+            self.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        self.latency_ms = round((time.monotonic() - started) * 1000, 2)
+        self.checked_at = datetime.utcnow()
+        self._checked_monotonic = time.monotonic()
+        return self.database_ok
+
+    async def _check_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    async def start(self):
+        """Marca el fin del arranque tras una primera verificación de la base"""
+        await self.check()
+        self.started = True
+        self.ready_after_seconds = round(time.monotonic() - PROCESS_STARTED, 3)
+        STARTUP_PHASE_SECONDS.set(self.ready_after_seconds, "total")
+        self._task = asyncio.create_task(self._check_periodically())
+
+    async def stop(self):
+        self.started = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Tuple[bool, Dict]:
+        """(listo, detalle) sin consultar la base"""
+        age = None if self._checked_monotonic is None else round(time.monotonic() - self._checked_monotonic, 3)
+        # Si la verificación periódica se detuvo, un estado viejo no cuenta como listo
+        fresh = age is not None and age <= self.interval * 3 + settings.READINESS_PING_TIMEOUT_SECONDS
+        ready = self.started and self.database_ok and fresh
+        return ready, {
+            "status": "ready" if ready else "not_ready",
+            "database": {
+                "connected": self.database_ok,
+                "checked_at": self.checked_at,
+                "check_age_seconds": age,
+                "latency_ms": self.latency_ms,
+                "error": self.error
+            },
+            "startup": {
+                "completed": self.started,
+                "ready_after_seconds": self.ready_after_seconds,
+                "phases": self.phases
+            }
+        }
+
+# Estado de preparación del proceso
+readiness = ReadinessMonitor()
+
+def _get(url: str, timeout: float = 5) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+def measure_cold_start(port: int, path: str, timeout: float) -> Dict:
+    """
+    Inicia la API en un proceso nuevo y mide, desde el lanzamiento, cuándo responde
+    /live, cuándo /ready y la latencia de las dos primeras solicitudes a 'path'.
+    """
+    base = f"http://127.0.0.1:{port}"
+    launched = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    )
+    result: Dict = {}
+    try:
+        deadline = launched + timeout
+        for probe in ("live", "ready"):
+            while _get(f"{base}/{probe}", timeout=1) != 200:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError(f"/{probe} no respondió 200 en {timeout}s")
+                time.sleep(0.05)
+            result[f"{probe}_after_seconds"] = round(time.monotonic() - launched, 3)
+        for attempt in ("first", "second"):
+            started = time.monotonic()
+            status = _get(f"{base}{path}", timeout=timeout)
+            result[f"{attempt}_request_ms"] = round((time.monotonic() - started) * 1000, 2)
+            result[f"{attempt}_request_status"] = status
+        result["first_response_after_seconds"] = round(
+            result["ready_after_seconds"] + result["first_request_ms"] / 1000, 3
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío de la API hasta la primera respuesta")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/symbols-sentiment", help="Solicitud a medir tras /ready")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    print(measure_cold_start(args.port, args.path, args.timeout))
@@ -0,0 +1,282 @@
+"""
+Motor vectorizado (NumPy) para normalizar y agregar sentimientos en lote.
+
+Equivale a SentimentService._normalize_sentiment, _calculate_overall_sentiment y
+_calculate_confidence_score, pero opera sobre arreglos:
+- las etiquetas crudas se internan una sola vez en códigos enteros pequeños,
+- los tweets sin etiqueta toman el argmax de una matriz densa de probabilidades,
+- los conteos por símbolo, el sentimiento general y la confianza se calculan para
+  todos los símbolos a la vez.
+
+Los empates exactos en sentiment_prob se resuelven, como en el recorrido escalar, por
+el orden de las claves en el diccionario de cada tweet (la primera gana).
+
+tests/test_scoring.py compara el motor con las funciones escalares sobre datos
+aleatorios.
+"""
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services import SentimentService
+
+# Códigos de los sentimientos normalizados
+SENTIMENTS = ("positivo", "negativo", "neutral", "desconocido")
+POSITIVE, NEGATIVE, NEUTRAL, UNKNOWN = range(len(SENTIMENTS))
+SENTIMENT_CODES = {sentiment: code for code, sentiment in enumerate(SENTIMENTS)}
+OVERALL_SENTIMENTS = ("positivo", "negativo", "neutral", "mixto")
+
+# Código de "sin etiqueta": se resuelve con sentiment_prob
+NO_LABEL = -1
+
+# Posición de una clave ausente en la matriz de orden de sentiment_prob
+ABSENT_KEY = np.iinfo(np.int16).max
+
+class SentimentEncoder:
+    """
+    Interna etiquetas crudas y claves de sentiment_prob en códigos enteros.
+    Cada etiqueta distinta se normaliza una sola vez.
+    """
+
+    def __init__(self):
+        self._label_codes: Dict[str, int] = {}
+        self.prob_keys: List[str] = []
+        self._prob_columns: Dict[str, int] = {}
+
+    def label_code(self, label: Any) -> int:
+        if not label:
+            return NO_LABEL
+        code = self._label_codes.get(label)
+        if code is None:
+            normalized = SentimentService.SENTIMENT_MAP.get(label.lower().strip(), "neutral")
+            code = self._label_codes[label] = SENTIMENT_CODES[normalized]
+        return code
+
+    def prob_column(self, key: str) -> int:
+        column = self._prob_columns.get(key)
+        if column is None:
+            column = self._prob_columns[key] = len(self.prob_keys)
+            self.prob_keys.append(key)
+        return column
+
+    def prob_key_codes(self) -> np.ndarray:
+        """Código de sentimiento de cada columna (la clave pasa por la misma normalización)"""
+        codes = [self.label_code(key) for key in self.prob_keys]
+        return np.array([NEUTRAL if code == NO_LABEL else code for code in codes], dtype=np.int8)
+
+    def encode(self, tweets: Iterable[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Codifica tweets en (códigos de etiqueta, matriz de probabilidades, matriz de orden).
+        Las matrices solo tienen filas para los tweets sin etiqueta; las probabilidades no
+        numéricas o NaN nunca ganan el argmax, igual que en el recorrido escalar. La
+        matriz de orden guarda la posición de cada clave en el diccionario del tweet
+        (ABSENT_KEY si no está) para resolver los empates.
+        """
+        labels = []
+        prob_rows: List[Tuple[int, Dict]] = []
+        for tweet in tweets:
+            code = self.label_code(tweet.get("sentiment", ""))
+            labels.append(code)
+            if code == NO_LABEL:
+                sentiment_prob = tweet.get("sentiment_prob", None)
+                if sentiment_prob:
+                    prob_rows.append((len(labels) - 1, sentiment_prob))
+
+        label_codes = np.array(labels, dtype=np.int8)
+        for _, sentiment_prob in prob_rows:
+            for key in sentiment_prob:
+                self.prob_column(key)
+
+        probs = np.zeros((len(label_codes), len(self.prob_keys)), dtype=np.float64)
+        order = np.full(probs.shape, ABSENT_KEY, dtype=np.int16)
+        for row, sentiment_prob in prob_rows:
+            for position, (key, prob) in enumerate(sentiment_prob.items()):
+                column = self._prob_columns[key]
+                order[row, column] = position
+                if isinstance(prob, (int, float)) and not math.isnan(prob):
+                    probs[row, column] = prob
+        return label_codes, probs, order
+
+def normalize_codes(label_codes: np.ndarray, probs: np.ndarray, prob_key_codes: np.ndarray,
+                    order: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Versión vectorizada de _normalize_sentiment sobre códigos.
+    Sin etiqueta: la columna con mayor probabilidad siempre que supere 0; si ninguna lo
+    hace, 'neutral'. Los empates los gana la clave que aparece primero en el tweet
+    ('order', ver SentimentEncoder.encode); sin 'order', la primera columna.
+    """
+    codes = label_codes.copy()
+    missing = codes == NO_LABEL
+    if not missing.any():
+        return codes
+    codes[missing] = NEUTRAL
+    if probs.shape[1] == 0:
+        return codes
+    rows = probs[missing]
+    if order is None:
+        best = rows.argmax(axis=1)
+    else:
+        tied = rows == rows.max(axis=1, keepdims=True)
+        best = np.where(tied, order[missing], ABSENT_KEY).argmin(axis=1)
+    best_prob = rows[np.arange(len(rows)), best]
+    resolved = np.where(best_prob > 0, prob_key_codes[best], NEUTRAL)
+    codes[missing] = resolved
+    return codes
+
+def count_by_symbol(symbol_codes: np.ndarray, sentiment_codes: np.ndarray, n_symbols: int) -> np.ndarray:
+    """Matriz (n_symbols x 4) con la cantidad de tweets de cada sentimiento por símbolo"""
+    flat = symbol_codes.astype(np.int64) * len(SENTIMENTS) + sentiment_codes
+    return np.bincount(flat, minlength=n_symbols * len(SENTIMENTS)).reshape(n_symbols, len(SENTIMENTS))
+
+def overall_sentiment_codes(counts: np.ndarray, dominant_threshold: float = 0.6,
+                            mixed_threshold: float = 0.4) -> np.ndarray:
+    """
+    Reglas de _calculate_overall_sentiment para todos los símbolos a la vez.
+    Devuelve índices de OVERALL_SENTIMENTS. Los umbrales por defecto son los de
+    producción; otros valores sirven para simular cambios de reglas.
+    """
+    positive = counts[:, POSITIVE]
+    negative = counts[:, NEGATIVE]
+    neutral = counts[:, NEUTRAL]
+    total = positive + negative + neutral
+    safe_total = np.where(total == 0, 1, total)
+    positive_pct = positive / safe_total
+    negative_pct = negative / safe_total
+
+    conditions = [
+        total == 0,
+        positive_pct > dominant_threshold,
+        negative_pct > dominant_threshold,
+        (positive_pct > mixed_threshold) & (negative_pct > mixed_threshold),
+        (positive > negative) & (positive > neutral),
+        (negative > positive) & (negative > neutral),
+    ]
+    choices = [2, 0, 1, 3, 0, 1]
+    return np.select(conditions, choices, default=2)
+
+def confidence_scores(counts: np.ndarray) -> List[float]:
+    """
+    Fórmula de _calculate_confidence_score para todos los símbolos a la vez.
+    El redondeo final usa round() de Python para obtener exactamente los mismos valores.
+    """
+    total = counts.sum(axis=1)
+    known = counts[:, [POSITIVE, NEGATIVE, NEUTRAL]]
+    known_count = known.sum(axis=1)
+    valid = (total > 0) & (known_count > 0)
+    safe_total = np.where(total == 0, 1, total)
+    safe_known = np.where(known_count == 0, 1, known_count)
+    known_ratio = known_count / safe_total
+    concentration = known.max(axis=1) / safe_known
+    confidence = np.where(valid, (known_ratio * 0.6) + (concentration * 0.4), 0.0)
+    return [round(float(value), 2) for value in confidence]
+
+def build_symbol_docs(symbol_names: List[str], sectors: List[Optional[str]], counts: np.ndarray,
+                      last_tweet_ids: List[Any], dominant_threshold: float = 0.6,
+                      mixed_threshold: float = 0.4, unlabeled: Optional[np.ndarray] = None) -> List[Dict]:
+    """
+    Documentos de symbols_sentiment con la misma forma que _build_symbol_sentiment_doc.
+    'unlabeled' es la cantidad de tweets sin sentimiento por símbolo (None si no se conoce).
+    """
+    overall = overall_sentiment_codes(counts, dominant_threshold, mixed_threshold)
+    confidence = confidence_scores(counts)
+    totals = counts.sum(axis=1)
+    now = datetime.utcnow()
+
+    docs = []
+    for index, symbol_name in enumerate(symbol_names):
+        total_tweets = int(totals[index])
+        if total_tweets == 0:
+            sentiment_counts = {"neutral": 1}
+            sentiment_percentages = {"neutral": 0.0}
+            overall_sentiment = "neutral"
+        else:
+            sentiment_counts = {
+                SENTIMENTS[code]: int(count) for code, count in enumerate(counts[index]) if count
+            }
+            sentiment_percentages = {
+                sentiment: round((count / total_tweets) * 100, 2)
+                for sentiment, count in sentiment_counts.items()
+            }
+            overall_sentiment = OVERALL_SENTIMENTS[overall[index]]
+        docs.append({
+            "symbol": symbol_name,
+            "sector": sectors[index],
+            "overall_sentiment": overall_sentiment,
+            "sentiment_counts": sentiment_counts,
+            "sentiment_percentages": sentiment_percentages,
+            "total_tweets": total_tweets,
+            "tweets_without_sentiment": None if unlabeled is None else int(unlabeled[index]),
+            "confidence_score": confidence[index],
+            "last_tweet_id": last_tweet_ids[index],
+            "last_updated": now
+        })
+    return docs
+
+class SymbolSentimentAccumulator:
+    """
+    Acumula por lotes los conteos de sentimiento de un conjunto fijo de símbolos.
+    Cada lote de tweets (con 'company', 'sentiment', 'sentiment_prob' y '_id') se
+    codifica y se suma a la matriz de conteos con operaciones vectorizadas.
+    """
+
+    def __init__(self, symbol_names: List[str]):
+        self.symbol_names = list(symbol_names)
+        self._symbol_index = {name: index for index, name in enumerate(self.symbol_names)}
+        self.encoder = SentimentEncoder()
+        self.counts = np.zeros((len(self.symbol_names), len(SENTIMENTS)), dtype=np.int64)
+        self.unlabeled = np.zeros(len(self.symbol_names), dtype=np.int64)
+        self.last_tweet_ids: List[Any] = [None] * len(self.symbol_names)
+        self.tweets_processed = 0
+
+    def add_batch(self, tweets: List[Dict]):
+        tweets = [tweet for tweet in tweets if tweet.get("company") in self._symbol_index]
+        if not tweets:
+            return
+        symbol_codes = np.fromiter(
+            (self._symbol_index[tweet["company"]] for tweet in tweets), dtype=np.int64, count=len(tweets)
+        )
+        for code, tweet in zip(symbol_codes, tweets):
+            tweet_id = tweet.get("_id")
+            last = self.last_tweet_ids[code]
+            if tweet_id is not None and (last is None or tweet_id > last):
+                self.last_tweet_ids[code] = tweet_id
+
+        label_codes, probs, order = self.encoder.encode(tweets)
+        codes = normalize_codes(label_codes, probs, self.encoder.prob_key_codes(), order)
+        self.counts += count_by_symbol(symbol_codes, codes, len(self.symbol_names))
+        # Sin etiqueta ni probabilidades: _has_sentiment es falso
+        unlabeled = np.fromiter(
+            (code == NO_LABEL and not tweet.get("sentiment_prob") for code, tweet in zip(label_codes, tweets)),
+            dtype=bool, count=len(tweets)
+        )
+        self.unlabeled += np.bincount(symbol_codes[unlabeled], minlength=len(self.symbol_names))
+        self.tweets_processed += len(tweets)
+
+    def merge(self, other: "SymbolSentimentAccumulator"):
+        """Suma los conteos de otro acumulador sobre los mismos símbolos (en el mismo orden)"""
+        self.counts += other.counts
+        self.unlabeled += other.unlabeled
+        for code, tweet_id in enumerate(other.last_tweet_ids):
+            last = self.last_tweet_ids[code]
+            if tweet_id is not None and (last is None or tweet_id > last):
+                self.last_tweet_ids[code] = tweet_id
+        self.tweets_processed += other.tweets_processed
+
+    def build_docs(self, sectors: Dict[str, Optional[str]]) -> Dict[str, Dict]:
+        """Documentos de symbols_sentiment por nombre de símbolo"""
+        docs = build_symbol_docs(
+            self.symbol_names, [sectors.get(name) for name in self.symbol_names],
+            self.counts, self.last_tweet_ids, unlabeled=self.unlabeled
+        )
+        return {doc["symbol"]: doc for doc in docs}
+
+def score_batch(tweets: List[Dict], symbol_names: List[str]) -> SymbolSentimentAccumulator:
+    """
+    Conteos parciales de un lote de tweets, para combinar con SymbolSentimentAccumulator.merge.
+    Se ejecuta en el pool de cpu_executor (también en otro proceso).
+    """
+    accumulator = SymbolSentimentAccumulator(symbol_names)
+    accumulator.add_batch(tweets)
+    return accumulator
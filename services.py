@@ -1,35 +1,127 @@
 from database import get_database, Database
-from typing import Dict, List
-from datetime import datetime
+from config import settings
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from snapshot import ResponseSnapshotCache
+from progress import JobProgress
+from classifier import SOURCE as CLASSIFIER_SOURCE, TweetClassifier
+from classification_cache import classification_cache
+from metrics import INGEST_BATCHES, INGESTED_TWEETS
+from profiling import profiled
+from cpu_executor import cpu_executor
 
 class SentimentService:
     """Servicio para análisis de sentimientos"""
+
+    # Campos que determinan la huella de contenido ('fingerprint') de symbols_sentiment
+    FINGERPRINT_FIELDS = (
+        "symbol", "sector", "overall_sentiment", "sentiment_counts", "sentiment_percentages",
+        "total_tweets", "tweets_without_sentiment", "confidence_score", "last_tweet_id"
+    )
+    
+    # Documento por recálculo con la fecha de la última ejecución
+    RECOMPUTE_STATE_COLLECTION = "recompute_state"
+    
+    # Modos de recálculo de create_symbols_sentiment_collection
+    RECOMPUTE_MODES = ("python", "aggregation", "incremental", "vectorized", "partitioned")
+
+    # Modos de análisis de analyze_and_update_sentiments
+    ANALYZE_MODES = ("python", "backfill", "classify")
+    
+    # Reintentos de la reescritura de un arreglo de tweets embebidos que cambió entre la lectura y la escritura
+    MAX_CONFLICT_RETRIES = 5
+
+    # Campos de symbols_sentiment que se pueden proyectar y ordenar en las consultas
+    QUERY_FIELDS = (
+        "symbol", "sector", "overall_sentiment", "sentiment_counts", "sentiment_percentages",
+        "total_tweets", "confidence_score", "last_updated"
+    )
+    
+    # Campos internos de symbols_sentiment (control de escritura y de deltas) que las
+    # lecturas de la API no devuelven
+    INTERNAL_FIELDS = (
+        "fingerprint", "revision", "last_tweet_id", "tweets_without_sentiment",
+        "rebuilt_from", "feed_position", "applied_batches"
+    )
+    QUERY_SORT_FIELDS = ("symbol", "confidence_score", "total_tweets")
+    
+    # Lotes de ingesta recientes que cada documento recuerda como ya aplicados
+    APPLIED_BATCHES_KEPT = 100
+
+    # Mapeo de las etiquetas crudas a los sentimientos estándar
+    SENTIMENT_MAP = {
+        "pos": "positivo",
+        "positive": "positivo",
+        "positivo": "positivo",
+        "neg": "negativo",
+        "negative": "negativo",
+        "negativo": "negativo",
+        "neu": "neutral",
+        "neutral": "neutral",
+        "neutro": "neutral",
+        "desconocido": "desconocido"
+    }
     
     @staticmethod
-    async def analyze_and_update_sentiments() -> Dict:
+    @profiled("analyze_and_update_sentiments")
+    async def analyze_and_update_sentiments(mode: str = "python", progress: Optional[JobProgress] = None) -> Dict:
         """
         Analiza la colección symbols y asigna sentimientos a los tweets.
         Si el tweet tiene sentimiento, lo mantiene.
         Si no tiene sentimiento, le asigna 'desconocido'.
+        
+        Modos:
+        - 'python': recorre los símbolos con un cursor por lotes y reescribe el arreglo
+          'tweets' solo de los símbolos que tenían tweets sin sentimiento.
+        - 'backfill': actualiza en MongoDB, con filtros de arreglo, únicamente los tweets
+          sin sentimiento; los documentos sin cambios nunca se reescriben.
+        - 'classify': en lugar de 'desconocido', clasifica el texto de los tweets sin
+          sentimiento con el clasificador léxico de classifier.py (con caché por texto).
+        
+        'progress' recibe el avance (símbolos y tweets recorridos) si se ejecuta como job.
         """
+        if mode not in SentimentService.ANALYZE_MODES:
+            raise ValueError(f"Modo de análisis inválido: {mode}")
+        progress = progress or JobProgress()
+        
+        if mode == "backfill":
+            return await SentimentService._backfill_unknown_sentiments(progress)
+        if mode == "classify":
+            return await SentimentService._classify_unlabeled_tweets(progress)
+        
         db = Database.get_db()
         symbols_collection = db["symbols"]
+        progress.set_total(await symbols_collection.estimated_document_count())
         
-        # Obtener todos los símbolos
-        symbols = await symbols_collection.find({}).to_list(length=None)
+        # Recorrer los símbolos por lotes, trayendo solo los tweets
+        cursor = symbols_collection.find({}, {"tweets": 1}).batch_size(settings.CURSOR_BATCH_SIZE)
         
-        total_symbols = len(symbols)
+        total_symbols = 0
         symbols_with_tweets = 0
         tweets_updated = 0
         tweets_with_sentiment = 0
         tweets_without_sentiment = 0
+        matched_count = 0
+        modified_count = 0
         
-        for symbol in symbols:
+        async for symbol in cursor:
+            total_symbols += 1
+            progress.advance(symbols=1, tweets=len(symbol.get("tweets") or []))
             if "tweets" in symbol and symbol["tweets"]:
                 symbols_with_tweets += 1
                 
                 # Procesar cada tweet
                 updated_tweets = []
+                symbol_tweets_updated = 0
                 for tweet in symbol["tweets"]:
                     # Verificar si el tweet tiene sentimiento
                     if "sentiment" in tweet and tweet["sentiment"]:
@@ -40,15 +132,18 @@ class SentimentService:
                         # No tiene sentimiento, asignar 'desconocido'
                         tweet["sentiment"] = "desconocido"
                         tweets_without_sentiment += 1
-                        tweets_updated += 1
+                        symbol_tweets_updated += 1
                         updated_tweets.append(tweet)
                 
-                # Actualizar el documento en la base de datos
-                if tweets_updated > 0:
-                    await symbols_collection.update_one(
+                # Actualizar el documento solo si alguno de sus tweets cambió
+                if symbol_tweets_updated > 0:
+                    tweets_updated += symbol_tweets_updated
+                    result = await symbols_collection.update_one(
                         {"_id": symbol["_id"]},
                         {"$set": {"tweets": updated_tweets}}
                     )
+                    matched_count += result.matched_count
+                    modified_count += result.modified_count
         
         return {
             "total_symbols": total_symbols,
@@ -56,9 +151,237 @@ class SentimentService:
             "tweets_updated": tweets_updated,
             "tweets_with_sentiment": tweets_with_sentiment,
             "tweets_without_sentiment": tweets_without_sentiment,
+            "symbols_update": {
+                "matched_count": matched_count,
+                "modified_count": modified_count
+            },
             "message": f"Análisis completado. {tweets_updated} tweets actualizados con sentimiento 'desconocido'."
         }
     
+    @staticmethod
+    async def _backfill_unknown_sentiments(progress: JobProgress) -> Dict:
+        """
+        Asigna 'desconocido' a los tweets embebidos sin sentimiento usando un update_many
+        con arrayFilters. Los conteos de tweets se calculan en el servidor antes de la
+        actualización; los de documentos ('symbols_updated' y 'symbols_update') son los
+        matched_count/modified_count reales de la actualización. update_many no informa
+        cuántos elementos cambió, así que 'tweets_updated' es None.
+        """
+        db = Database.get_db()
+        symbols_collection = db["symbols"]
+        
+        # Un tweet no tiene sentimiento si el campo falta, es null o es vacío
+        missing_sentiment = {"$in": [None, ""]}
+        tweets_array = {"$cond": [{"$isArray": "$tweets"}, "$tweets", []]}
+        
+        stats_pipeline = [
+            {"$project": {
+                "_id": 0,
+                "tweets_total": {"$size": tweets_array},
+                "tweets_missing": {"$size": {"$filter": {
+                    "input": tweets_array,
+                    "as": "tweet",
+                    "cond": {"$eq": [{"$ifNull": ["$$tweet.sentiment", ""]}, ""]}
+                }}}
+            }},
+            {"$group": {
+                "_id": None,
+                "total_symbols": {"$sum": 1},
+                "symbols_with_tweets": {"$sum": {"$cond": [{"$gt": ["$tweets_total", 0]}, 1, 0]}},
+                "tweets_total": {"$sum": "$tweets_total"},
+                "tweets_missing": {"$sum": "$tweets_missing"}
+            }}
+        ]
+        stats = await symbols_collection.aggregate(stats_pipeline).to_list(length=1)
+        stats = stats[0] if stats else {}
+        tweets_total = stats.get("tweets_total", 0)
+        tweets_missing = stats.get("tweets_missing", 0)
+        progress.set_total(stats.get("total_symbols", 0))
+        
+        result = await symbols_collection.update_many(
+            {"tweets": {"$elemMatch": {"sentiment": missing_sentiment}}},
+            {"$set": {"tweets.$[tweet].sentiment": "desconocido"}},
+            array_filters=[{"tweet.sentiment": missing_sentiment}]
+        )
+        
+        progress.advance(symbols=stats.get("total_symbols", 0), tweets=tweets_total)
+        
+        return {
+            "total_symbols": stats.get("total_symbols", 0),
+            "symbols_with_tweets": stats.get("symbols_with_tweets", 0),
+            "tweets_updated": None,
+            "symbols_updated": result.modified_count,
+            "tweets_with_sentiment": tweets_total - tweets_missing,
+            "tweets_without_sentiment": tweets_missing,
+            "symbols_update": {
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count
+            },
+            "message": (
+                f"Análisis completado. {result.modified_count} símbolos actualizados con sentimiento 'desconocido'."
+            )
+        }
+    
+    @staticmethod
+    def _is_unlabeled(tweet: Dict) -> bool:
+        """Si _classify_unlabeled_tweets debe clasificar el tweet (sin sentimiento ni sentiment_prob)"""
+        return tweet.get("sentiment") in (None, "", "desconocido") and not (
+            isinstance(tweet.get("sentiment_prob"), dict) and tweet["sentiment_prob"]
+        )
+    
+    @staticmethod
+    async def _classify_embedded_tweets(symbols_collection, symbol: Dict, classifier: TweetClassifier) -> int:
+        """
+        Clasifica los tweets embebidos sin sentimiento de un símbolo y reescribe su arreglo.
+        La escritura solo aplica si el arreglo sigue igual al leído; si otro proceso lo
+        cambió mientras tanto (un tweet agregado o etiquetado), se vuelve a leer y a
+        clasificar, hasta MAX_CONFLICT_RETRIES veces. Devuelve los tweets clasificados.
+        """
+        for _ in range(SentimentService.MAX_CONFLICT_RETRIES):
+            tweets = symbol.get("tweets") or []
+            targets = [
+                index for index, tweet in enumerate(tweets)
+                if SentimentService._is_unlabeled(tweet) and isinstance(tweet.get("text"), str)
+            ]
+            if not targets:
+                return 0
+            labels = await classification_cache.resolve([tweets[index]["text"] for index in targets], classifier)
+            updated = list(tweets)
+            for index, (sentiment, probabilities) in zip(targets, labels):
+                updated[index] = {
+                    **tweets[index],
+                    "sentiment": sentiment,
+                    "sentiment_prob": probabilities,
+                    "sentiment_source": CLASSIFIER_SOURCE
+                }
+            result = await symbols_collection.update_one(
+                {"_id": symbol["_id"], "tweets": tweets}, {"$set": {"tweets": updated}}
+            )
+            if result.matched_count:
+                return len(targets)
+            symbol = await symbols_collection.find_one({"_id": symbol["_id"]}, {"tweets": 1})
+            if symbol is None:
+                return 0
+        return 0
+    
+    @staticmethod
+    async def _classify_unlabeled_tweets(progress: JobProgress, classifier: Optional[TweetClassifier] = None) -> Dict:
+        """
+        Clasifica los tweets sin sentimiento (falta, vacío o 'desconocido') de la colección
+        tweets y de los arreglos 'tweets' de symbols, y escribe 'sentiment',
+        'sentiment_prob' y 'sentiment_source'. Los tweets que ya traen 'sentiment_prob'
+        (un objeto no vacío, como en _has_sentiment_expression) se dejan como están: sus
+        probabilidades vienen del modelo y el conteo ya las usa.
+        
+        Los textos se resuelven con classification_cache: las copias (retweets, alertas
+        repetidas) no se vuelven a clasificar. Los tweets se leen por _id en lotes de
+        CLASSIFIER_BATCH_SIZE; mientras se clasifica un lote se lee el siguiente. La
+        escritura solo aplica si el tweet sigue sin sentimiento, así no se pisa una
+        etiqueta asignada mientras tanto (en los embebidos, ver _classify_embedded_tweets).
+        
+        Los conteos abarcan la colección tweets y los tweets embebidos:
+        'tweets_without_sentiment' son los que no tenían sentimiento (también los sin
+        texto, que no se clasifican), 'tweets_updated' los que se escribieron y
+        'symbols_updated' los símbolos con algún tweet clasificado.
+        """
+        db = Database.get_db()
+        tweets_collection = db["tweets"]
+        symbols_collection = db["symbols"]
+        missing_sentiment = {"$in": [None, "", "desconocido"]}
+        missing_prob = [{"sentiment_prob": {"$not": {"$type": "object"}}}, {"sentiment_prob": {}}]
+        unlabeled = {"sentiment": missing_sentiment, "$or": missing_prob}
+        classifier = classifier or TweetClassifier()
+        
+        tweets_updated = 0
+        tweets_classified = 0
+        tweets_without_sentiment = 0
+        companies = set()
+        started = time.monotonic()
+        
+        async def classify_and_write(batch: List[Dict]) -> int:
+            labels = await classification_cache.resolve([tweet.get("text") for tweet in batch], classifier)
+            operations = [
+                UpdateOne(
+                    {"_id": tweet["_id"], **unlabeled},
+                    {"$set": {"sentiment": sentiment, "sentiment_prob": probabilities, "sentiment_source": CLASSIFIER_SOURCE}}
+                )
+                for tweet, (sentiment, probabilities) in zip(batch, labels)
+            ]
+            result = await tweets_collection.bulk_write(operations, ordered=False)
+            progress.advance(tweets=len(batch))
+            return result.modified_count
+        
+        # Los tweets sin texto se cuentan pero no se clasifican
+        cursor = tweets_collection.find(unlabeled, {"text": 1, "company": 1}).sort("_id", 1).batch_size(
+            settings.CURSOR_BATCH_SIZE
+        )
+        
+        pending = None
+        batch = []
+        try:
+            async for tweet in cursor:
+                tweets_without_sentiment += 1
+                if not isinstance(tweet.get("text"), str):
+                    continue
+                batch.append(tweet)
+                companies.add(tweet.get("company"))
+                if len(batch) >= classifier.batch_size:
+                    if pending is not None:
+                        tweets_updated += await pending
+                    tweets_classified += len(batch)
+                    pending = asyncio.create_task(classify_and_write(batch))
+                    batch = []
+            if pending is not None:
+                tweets_updated += await pending
+                pending = None
+            if batch:
+                tweets_classified += len(batch)
+                tweets_updated += await classify_and_write(batch)
+            
+            # Tweets embebidos en symbols
+            symbols_cursor = symbols_collection.find(
+                {"tweets": {"$elemMatch": unlabeled}}, {"symbol": 1, "tweets": 1}
+            ).batch_size(settings.CURSOR_BATCH_SIZE)
+            async for symbol in symbols_cursor:
+                tweets_without_sentiment += sum(1 for tweet in symbol["tweets"] if SentimentService._is_unlabeled(tweet))
+                classified = await SentimentService._classify_embedded_tweets(symbols_collection, symbol, classifier)
+                if classified:
+                    companies.add(symbol.get("symbol"))
+                tweets_classified += classified
+                tweets_updated += classified
+                progress.advance(tweets=classified)
+        finally:
+            if pending is not None:
+                pending.cancel()
+            classifier.close()
+        
+        # Totales reales de la colección tweets y de los arreglos embebidos
+        embedded = await symbols_collection.aggregate([
+            {"$group": {
+                "_id": None,
+                "tweets": {"$sum": {"$size": {"$cond": [{"$isArray": "$tweets"}, "$tweets", []]}}}
+            }}
+        ]).to_list(length=1)
+        total_tweets = await tweets_collection.count_documents({}) + (embedded[0]["tweets"] if embedded else 0)
+        companies_with_tweets = await tweets_collection.distinct("company")
+        symbols_with_tweets = await symbols_collection.count_documents({"$or": [
+            {"symbol": {"$in": companies_with_tweets}}, {"tweets.0": {"$exists": True}}
+        ]})
+        
+        elapsed = time.monotonic() - started
+        companies.discard(None)
+        return {
+            "total_symbols": await symbols_collection.count_documents({}),
+            "symbols_with_tweets": symbols_with_tweets,
+            "tweets_updated": tweets_updated,
+            "symbols_updated": len(companies),
+            "tweets_with_sentiment": max(total_tweets - tweets_without_sentiment, 0),
+            "tweets_without_sentiment": tweets_without_sentiment,
+            "tweets_per_second": round(tweets_classified / elapsed, 1) if elapsed > 0 else None,
+            "cache": classification_cache.stats(),
+            "message": f"Clasificación completada. {tweets_updated} tweets clasificados con el léxico '{CLASSIFIER_SOURCE}'."
+        }
+    
     @staticmethod
     def _normalize_sentiment(sentiment: str, sentiment_prob: dict = None) -> str:
         """
@@ -80,21 +403,90 @@ class SentimentService:
         
         sentiment = sentiment.lower().strip()
         
-        # Mapeo de sentimientos
-        sentiment_map = {
-            "pos": "positivo",
-            "positive": "positivo",
-            "positivo": "positivo",
-            "neg": "negativo",
-            "negative": "negativo",
-            "negativo": "negativo",
-            "neu": "neutral",
-            "neutral": "neutral",
-            "neutro": "neutral",
-            "desconocido": "desconocido"
+        return SentimentService.SENTIMENT_MAP.get(sentiment, "neutral")
+    
+    @staticmethod
+    def _has_sentiment(sentiment, sentiment_prob=None) -> bool:
+        """Si el tweet trae sentimiento: una etiqueta o probabilidades (el resto se cuenta como 'neutral')"""
+        return bool(sentiment or sentiment_prob)
+    
+    @staticmethod
+    def _has_sentiment_expression() -> Dict:
+        """Expresión de agregación equivalente a _has_sentiment"""
+        return {
+            "$or": [
+                {"$and": [
+                    {"$eq": [{"$type": "$sentiment"}, "string"]},
+                    {"$ne": ["$sentiment", ""]}
+                ]},
+                {"$cond": [
+                    {"$eq": [{"$type": "$sentiment_prob"}, "object"]},
+                    {"$gt": [{"$size": {"$objectToArray": "$sentiment_prob"}}, 0]},
+                    False
+                ]}
+            ]
+        }
+    
+    @staticmethod
+    def _normalize_sentiment_expression() -> Dict:
+        """
+        Expresión de agregación equivalente a _normalize_sentiment.
+        Si el tweet no tiene 'sentiment' (string no vacío), toma la clave de
+        'sentiment_prob' con la probabilidad más alta (la primera en caso de empate,
+        igual que el recorrido del dict en Python) o 'neutral' si ninguna supera 0.
+        """
+        has_label = {
+            "$and": [
+                {"$eq": [{"$type": "$sentiment"}, "string"]},
+                {"$ne": ["$sentiment", ""]}
+            ]
+        }
+        prob_items = {
+            "$cond": [
+                {"$eq": [{"$type": "$sentiment_prob"}, "object"]},
+                {"$objectToArray": "$sentiment_prob"},
+                []
+            ]
         }
+        best_prob = {
+            "$reduce": {
+                "input": prob_items,
+                "initialValue": {"k": "neutral", "v": 0},
+                "in": {
+                    "$cond": [
+                        {"$and": [
+                            {"$isNumber": "$$this.v"},
+                            {"$gt": ["$$this.v", "$$value.v"]}
+                        ]},
+                        "$$this",
+                        "$$value"
+                    ]
+                }
+            }
+        }
+        raw_sentiment = {
+            "$cond": [
+                has_label,
+                "$sentiment",
+                {"$let": {"vars": {"best": best_prob}, "in": "$$best.k"}}
+            ]
+        }
+        key = {"$trim": {"input": {"$toLower": raw_sentiment}}}
+        
+        # Agrupar las etiquetas crudas por sentimiento estándar
+        labels_by_sentiment: Dict[str, List[str]] = {}
+        for label, normalized in SentimentService.SENTIMENT_MAP.items():
+            labels_by_sentiment.setdefault(normalized, []).append(label)
         
-        return sentiment_map.get(sentiment, "neutral")
+        return {
+            "$switch": {
+                "branches": [
+                    {"case": {"$in": [key, labels]}, "then": normalized}
+                    for normalized, labels in labels_by_sentiment.items()
+                ],
+                "default": "neutral"
+            }
+        }
     
     @staticmethod
     def _calculate_overall_sentiment(sentiment_counts: Dict[str, int]) -> str:
@@ -176,10 +568,248 @@ class SentimentService:
         return round(confidence, 2)
     
     @staticmethod
-    async def create_symbols_sentiment_collection() -> Dict:
+    def _count_tweet_sentiments(tweets: List[Dict]) -> Dict:
+        """
+        Normaliza y cuenta los sentimientos de un trozo de tweets (trabajo de CPU: corre en
+        cpu_executor). Devuelve {counts, total, unlabeled, last_tweet_id}, la misma forma que
+        cada símbolo de _aggregate_sentiment_counts.
+        """
+        sentiment_counts = {}
+        tweets_without_sentiment = 0
+        for tweet in tweets:
+            raw_sentiment = tweet.get("sentiment", "")
+            sentiment_prob = tweet.get("sentiment_prob", None)
+            
+            # Normalizar el sentimiento usando la función de normalización
+            # Si sentiment está vacío, usará sentiment_prob
+            sentiment = SentimentService._normalize_sentiment(raw_sentiment, sentiment_prob)
+            sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + 1
+            if not SentimentService._has_sentiment(raw_sentiment, sentiment_prob):
+                tweets_without_sentiment += 1
+        return {
+            "counts": sentiment_counts,
+            "total": len(tweets),
+            "unlabeled": tweets_without_sentiment,
+            "last_tweet_id": max((tweet["_id"] for tweet in tweets), default=None)
+        }
+    
+    @staticmethod
+    def _merge_tweet_counts(parts: List[Dict]) -> Dict:
+        """Combina los conteos parciales de _count_tweet_sentiments"""
+        merged = {"counts": {}, "total": 0, "unlabeled": 0, "last_tweet_id": None}
+        for part in parts:
+            for sentiment, count in part["counts"].items():
+                merged["counts"][sentiment] = merged["counts"].get(sentiment, 0) + count
+            merged["total"] += part["total"]
+            merged["unlabeled"] += part["unlabeled"]
+            if part["last_tweet_id"] is not None and (
+                merged["last_tweet_id"] is None or part["last_tweet_id"] > merged["last_tweet_id"]
+            ):
+                merged["last_tweet_id"] = part["last_tweet_id"]
+        return merged
+    
+    @staticmethod
+    def _build_symbol_sentiment_doc(symbol_name: str, symbol_sector: Optional[str],
+                                    sentiment_counts: Dict[str, int], total_tweets: int,
+                                    last_tweet_id=None, tweets_without_sentiment: Optional[int] = None) -> Dict:
+        """
+        Arma el documento de symbols_sentiment a partir del conteo de sentimientos.
+        'last_tweet_id' es la marca de agua: el mayor _id de tweet ya contabilizado.
+        'tweets_without_sentiment' cuenta los tweets sin 'sentiment' ni 'sentiment_prob'
+        (incluidos como 'neutral' en sentiment_counts); None si no se conoce.
+        """
+        # Si no hay tweets, asignar neutral
+        if total_tweets == 0:
+            overall_sentiment = "neutral"
+            sentiment_counts = {"neutral": 1}
+            sentiment_percentages = {"neutral": 0.0}
+            confidence_score = 0.0
+        else:
+            # Calcular sentimiento general
+            overall_sentiment = SentimentService._calculate_overall_sentiment(sentiment_counts)
+            confidence_score = SentimentService._calculate_confidence_score(sentiment_counts, total_tweets)
+            
+            # Calcular porcentajes
+            sentiment_percentages = {}
+            for sent, count in sentiment_counts.items():
+                percentage = round((count / total_tweets) * 100, 2)
+                sentiment_percentages[sent] = percentage
+        
+        doc = {
+            "symbol": symbol_name,
+            "sector": symbol_sector,
+            "overall_sentiment": overall_sentiment,
+            "sentiment_counts": sentiment_counts,
+            "sentiment_percentages": sentiment_percentages,
+            "total_tweets": total_tweets,
+            "tweets_without_sentiment": tweets_without_sentiment,
+            "confidence_score": confidence_score,
+            "last_tweet_id": last_tweet_id,
+            "last_updated": datetime.utcnow()
+        }
+        doc["fingerprint"] = SentimentService._fingerprint(doc)
+        return doc
+    
+    @staticmethod
+    def _fingerprint(doc: Dict) -> str:
+        """
+        Huella estable del contenido de un documento de symbols_sentiment: excluye
+        'last_updated' y 'revision', y no depende del orden de las claves.
+        """
+        content = {field: doc.get(field) for field in SentimentService.FINGERPRINT_FIELDS}
+        encoded = json.dumps(content, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    @profiled("write_symbol_docs")
+    async def _write_symbol_docs(sentiment_collection, docs: List[Dict],
+                                 rebuilt_from: Optional[datetime] = None) -> Dict:
+        """
+        Escribe solo los documentos cuyo contenido cambió: compara la huella calculada
+        con la guardada y envía los distintos (o nuevos) en un único bulk_write no
+        ordenado. Si un símbolo aparece repetido, gana el último documento.
+        
+        'rebuilt_from' es el inicio del escaneo de una reconstrucción completa: los
+        cambios escritos antes ya están en los conteos y apply_sentiment_changes los saltea.
+        """
+        latest = {doc["symbol"]: doc for doc in docs}
+        stored = {}
+        async for doc in sentiment_collection.find(
+            {"symbol": {"$in": list(latest)}}, {"symbol": 1, "fingerprint": 1}
+        ):
+            stored[doc["symbol"]] = doc.get("fingerprint")
+        
+        marker = {"rebuilt_from": rebuilt_from} if rebuilt_from is not None else {}
+        operations = [
+            UpdateOne({"symbol": symbol_name}, {"$set": dict(doc, **marker), "$inc": {"revision": 1}}, upsert=True)
+            for symbol_name, doc in latest.items()
+            if symbol_name not in stored or stored[symbol_name] != doc["fingerprint"]
+        ]
+        if operations:
+            await sentiment_collection.bulk_write(operations, ordered=False)
+        return {"symbols_written": len(operations), "writes_skipped": len(latest) - len(operations)}
+    
+    @staticmethod
+    @profiled("aggregate_sentiment_counts")
+    async def _aggregate_sentiment_counts(tweets_collection, match: Dict) -> Dict[str, Dict]:
+        """
+        Cuenta los sentimientos normalizados por 'company' en un único pipeline de agregación.
+        Solo viajan los vectores de conteo:
+        {company: {"counts": sentiment_counts, "total": total_tweets, "unlabeled": tweets sin
+        sentimiento, "last_tweet_id": _id máximo}}.
+        """
+        pipeline = [
+            {"$match": match},
+            {"$project": {
+                "company": 1,
+                "sentiment": SentimentService._normalize_sentiment_expression(),
+                "unlabeled": {"$cond": [SentimentService._has_sentiment_expression(), 0, 1]}
+            }},
+            {"$group": {
+                "_id": {"company": "$company", "sentiment": "$sentiment"},
+                "count": {"$sum": 1},
+                "unlabeled": {"$sum": "$unlabeled"},
+                "last_tweet_id": {"$max": "$_id"}
+            }},
+            {"$group": {
+                "_id": "$_id.company",
+                "counts": {"$push": {"k": "$_id.sentiment", "v": "$count"}},
+                "total": {"$sum": "$count"},
+                "unlabeled": {"$sum": "$unlabeled"},
+                "last_tweet_id": {"$max": "$last_tweet_id"}
+            }}
+        ]
+        
+        results = {}
+        async for row in tweets_collection.aggregate(pipeline, allowDiskUse=True):
+            results[row["_id"]] = {
+                "counts": {item["k"]: item["v"] for item in row["counts"]},
+                "total": row["total"],
+                "unlabeled": row["unlabeled"],
+                "last_tweet_id": row["last_tweet_id"]
+            }
+        return results
+    
+    @staticmethod
+    @profiled("create_symbols_sentiment_collection")
+    async def create_symbols_sentiment_collection(mode: str = "python",
+                                                  progress: Optional[JobProgress] = None) -> Dict:
         """
         Crea/actualiza la colección symbols_sentiment con el sentimiento agregado de cada símbolo.
         Lee los tweets desde la colección 'tweets' y los agrupa por el campo 'company'.
+        
+        Modos:
+        - 'python': recorre los tweets de cada símbolo y los normaliza en el proceso de la API
+          (en el pool de cpu_executor, para no bloquear el event loop).
+        - 'aggregation': normaliza y cuenta en MongoDB con un solo pipeline y escribe
+          todos los resultados con un único bulk_write.
+        - 'incremental': solo suma los tweets posteriores a la marca de agua de cada
+          símbolo. Los demás modos son reconstrucciones completas.
+        - 'vectorized': lee los tweets por lotes y los normaliza y agrega con el motor
+          NumPy de scoring.py.
+        - 'partitioned': reparte los símbolos en particiones que cualquier worker puede
+          tomar con un lease en MongoDB (ver partitions.py).
+        
+        Las reconstrucciones completas recalculan además los buckets de la serie temporal
+        y los agregados por sector y de mercado; el modo incremental solo les suma los
+        tweets nuevos.
+        
+        Solo se escriben los símbolos cuyo contenido cambió (ver '_write_symbol_docs'); el
+        resultado informa 'symbols_written' y 'writes_skipped', y la fecha del recálculo
+        queda en la colección recompute_state.
+        
+        'progress' recibe el avance (símbolos y tweets recorridos) si se ejecuta como job.
+        """
+        if mode not in SentimentService.RECOMPUTE_MODES:
+            raise ValueError(f"Modo de recálculo inválido: {mode}")
+        progress = progress or JobProgress()
+        
+        if mode == "aggregation":
+            result = await SentimentService._create_symbols_sentiment_aggregation(progress)
+        elif mode == "incremental":
+            result = await SentimentService._create_symbols_sentiment_incremental(progress)
+        elif mode == "vectorized":
+            result = await SentimentService._create_symbols_sentiment_vectorized(progress)
+        elif mode == "partitioned":
+            # Importación diferida: partitions depende de SentimentService
+            from partitions import PartitionedRecompute
+            result = await PartitionedRecompute().run(progress)
+        else:
+            result = await SentimentService._create_symbols_sentiment_python(progress)
+        
+        if mode not in ("incremental", "partitioned"):
+            # Las reconstrucciones completas también recalculan la serie temporal
+            # (el modo particionado lo hace partición por partición)
+            db = Database.get_db()
+            symbol_names = await db["symbols"].distinct("symbol")
+            await SentimentTimeseriesService.rebuild_buckets(symbol_names)
+        if mode != "incremental":
+            # Agregados por sector y de mercado desde los documentos recién escritos
+            await SectorRollupService.rebuild()
+        
+        # 'last_updated' de cada símbolo solo cambia con su contenido: la fecha del último
+        # recálculo se guarda aparte, en un único documento
+        await Database.get_db()[SentimentService.RECOMPUTE_STATE_COLLECTION].update_one(
+            {"_id": "symbols_sentiment"},
+            {"$set": {
+                "last_computed_at": datetime.utcnow(),
+                "mode": mode,
+                "symbols_written": result.get("symbols_written"),
+                "writes_skipped": result.get("writes_skipped")
+            }},
+            upsert=True
+        )
+        
+        # Publicar la nueva instantánea de GET /symbols-sentiment
+        await symbols_sentiment_snapshot.refresh()
+        return result
+    
+    @staticmethod
+    @profiled("mode.python")
+    async def _create_symbols_sentiment_python(progress: JobProgress) -> Dict:
+        """
+        Recorre los tweets de cada símbolo con un cursor por lotes y los normaliza en el
+        proceso de la API (en cpu_executor, de a CPU_CHUNK_SIZE tweets)
         """
         db = Database.get_db()
         symbols_collection = db["symbols"]
@@ -188,9 +818,12 @@ class SentimentService:
         
         # Obtener todos los símbolos
         symbols = await symbols_collection.find({}).to_list(length=None)
+        progress.set_total(len(symbols))
+        rebuilt_from = datetime.utcnow()
         
         total_symbols_processed = 0
         symbols_created = 0
+        docs = []
         sentiment_stats = {
             "positivo": 0,
             "negativo": 0,
@@ -203,90 +836,612 @@ class SentimentService:
             symbol_name = symbol.get("symbol", "Unknown")
             symbol_sector = symbol.get("sector", None)
             
-            # Buscar tweets del símbolo en la colección tweets
-            tweets = await tweets_collection.find({"company": symbol_name}).to_list(length=None)
-            
-            # Analizar tweets del símbolo
-            sentiment_counts = {}
-            total_tweets = len(tweets)
-            
-            if tweets:
-                for tweet in tweets:
-                    raw_sentiment = tweet.get("sentiment", "")
-                    sentiment_prob = tweet.get("sentiment_prob", None)
-                    
-                    # Normalizar el sentimiento usando la función de normalización
-                    # Si sentiment está vacío, usará sentiment_prob
-                    sentiment = SentimentService._normalize_sentiment(raw_sentiment, sentiment_prob)
-                    
-                    if sentiment in sentiment_counts:
-                        sentiment_counts[sentiment] += 1
-                    else:
-                        sentiment_counts[sentiment] = 1
+            # Leer los tweets del símbolo con un cursor por lotes (sin cargarlos todos en
+            # memoria) y analizarlos fuera del event loop de a un trozo de cpu_executor
+            cursor = tweets_collection.find(
+                {"company": symbol_name}, {"sentiment": 1, "sentiment_prob": 1}
+            ).batch_size(settings.CURSOR_BATCH_SIZE)
+            parts = []
+            batch = []
+            async for tweet in cursor:
+                batch.append(tweet)
+                if len(batch) >= cpu_executor.chunk_size:
+                    parts += await cpu_executor.map_chunks(SentimentService._count_tweet_sentiments, batch)
+                    batch = []
+            parts += await cpu_executor.map_chunks(SentimentService._count_tweet_sentiments, batch)
+            counted = SentimentService._merge_tweet_counts(parts)
+            total_tweets = counted["total"]
             
-            # Si no hay tweets, asignar neutral
-            if total_tweets == 0:
-                overall_sentiment = "neutral"
-                sentiment_counts = {"neutral": 1}
-                sentiment_percentages = {"neutral": 0.0}
-                confidence_score = 0.0
-            else:
-                # Calcular sentimiento general
-                overall_sentiment = SentimentService._calculate_overall_sentiment(sentiment_counts)
-                confidence_score = SentimentService._calculate_confidence_score(sentiment_counts, total_tweets)
-                
-                # Calcular porcentajes
-                sentiment_percentages = {}
-                for sent, count in sentiment_counts.items():
-                    percentage = round((count / total_tweets) * 100, 2)
-                    sentiment_percentages[sent] = percentage
+            # Crear/actualizar documento en symbols_sentiment
+            symbol_sentiment_doc = SentimentService._build_symbol_sentiment_doc(
+                symbol_name, symbol_sector, counted["counts"], total_tweets, counted["last_tweet_id"],
+                counted["unlabeled"]
+            )
+            overall_sentiment = symbol_sentiment_doc["overall_sentiment"]
             
             # Actualizar estadísticas
             sentiment_stats[overall_sentiment] = sentiment_stats.get(overall_sentiment, 0) + 1
             
-            # Crear/actualizar documento en symbols_sentiment
-            symbol_sentiment_doc = {
-                "symbol": symbol_name,
-                "sector": symbol_sector,
-                "overall_sentiment": overall_sentiment,
-                "sentiment_counts": sentiment_counts,
-                "sentiment_percentages": sentiment_percentages,
-                "total_tweets": total_tweets,
-                "confidence_score": confidence_score,
-                "last_updated": datetime.utcnow()
-            }
-            
-            # Usar upsert para crear o actualizar
-            await sentiment_collection.update_one(
-                {"symbol": symbol_name},
-                {"$set": symbol_sentiment_doc},
-                upsert=True
-            )
+            docs.append(symbol_sentiment_doc)
             symbols_created += 1
+            progress.advance(symbols=1, tweets=total_tweets)
+        
+        # Solo se escriben los símbolos cuyo contenido cambió
+        writes = await SentimentService._write_symbol_docs(sentiment_collection, docs, rebuilt_from)
         
         return {
             "total_symbols_processed": total_symbols_processed,
             "symbols_created": symbols_created,
+            **writes,
+            "symbols_with_positive": sentiment_stats.get("positivo", 0),
+            "symbols_with_negative": sentiment_stats.get("negativo", 0),
+            "symbols_with_neutral": sentiment_stats.get("neutral", 0),
+            "symbols_with_mixed": sentiment_stats.get("mixto", 0),
+            "message": f"Colección 'symbols_sentiment' creada/actualizada exitosamente con {symbols_created} símbolos."
+        }
+    
+    @staticmethod
+    @profiled("mode.aggregation")
+    async def _create_symbols_sentiment_aggregation(progress: JobProgress) -> Dict:
+        """
+        Variante de create_symbols_sentiment_collection que evita el patrón N+1:
+        un pipeline de agregación para todos los símbolos y un único bulk_write.
+        """
+        db = Database.get_db()
+        symbols_collection = db["symbols"]
+        
+        # Solo se necesitan el nombre y el sector de cada símbolo
+        symbols = await symbols_collection.find({}, {"symbol": 1, "sector": 1}).to_list(length=None)
+        progress.set_total(len(symbols))
+        
+        stats = await SentimentService._recompute_symbols(symbols)
+        progress.advance(symbols=len(symbols), tweets=stats["tweets_processed"])
+        
+        sentiment_stats = stats["sentiment_stats"]
+        symbols_created = stats["symbols_created"]
+        return {
+            "total_symbols_processed": len(symbols),
+            "symbols_created": symbols_created,
+            "symbols_written": stats["symbols_written"],
+            "writes_skipped": stats["writes_skipped"],
+            "symbols_with_positive": sentiment_stats.get("positivo", 0),
+            "symbols_with_negative": sentiment_stats.get("negativo", 0),
+            "symbols_with_neutral": sentiment_stats.get("neutral", 0),
+            "symbols_with_mixed": sentiment_stats.get("mixto", 0),
+            "message": f"Colección 'symbols_sentiment' creada/actualizada exitosamente con {symbols_created} símbolos."
+        }
+    
+    @staticmethod
+    @profiled("recompute_symbols")
+    async def _recompute_symbols(symbols: List[Dict]) -> Dict:
+        """
+        Reconstrucción completa de los símbolos indicados ({symbol, sector}): un pipeline
+        de agregación y un único bulk_write con $set de los símbolos que cambiaron,
+        idempotente si se repite.
+        Devuelve {symbols_created, symbols_written, writes_skipped, sentiment_stats, tweets_processed}.
+        """
+        db = Database.get_db()
+        tweets_collection = db["tweets"]
+        sentiment_collection = db["symbols_sentiment"]
+        
+        symbol_names = list({symbol.get("symbol", "Unknown") for symbol in symbols})
+        rebuilt_from = datetime.utcnow()
+        counts_by_company = await SentimentService._aggregate_sentiment_counts(
+            tweets_collection, {"company": {"$in": symbol_names}}
+        )
+        
+        sentiment_stats = {
+            "positivo": 0,
+            "negativo": 0,
+            "neutral": 0,
+            "mixto": 0
+        }
+        docs = []
+        for symbol in symbols:
+            symbol_name = symbol.get("symbol", "Unknown")
+            aggregate = counts_by_company.get(
+                symbol_name, {"counts": {}, "total": 0, "unlabeled": 0, "last_tweet_id": None}
+            )
+            
+            symbol_sentiment_doc = SentimentService._build_symbol_sentiment_doc(
+                symbol_name, symbol.get("sector", None), dict(aggregate["counts"]),
+                aggregate["total"], aggregate["last_tweet_id"], aggregate["unlabeled"]
+            )
+            overall_sentiment = symbol_sentiment_doc["overall_sentiment"]
+            sentiment_stats[overall_sentiment] = sentiment_stats.get(overall_sentiment, 0) + 1
+            docs.append(symbol_sentiment_doc)
+        
+        writes = await SentimentService._write_symbol_docs(sentiment_collection, docs, rebuilt_from)
+        
+        return {
+            "symbols_created": len(docs),
+            **writes,
+            "sentiment_stats": sentiment_stats,
+            "tweets_processed": sum(aggregate["total"] for aggregate in counts_by_company.values())
+        }
+    
+    @staticmethod
+    @profiled("mode.vectorized")
+    async def _create_symbols_sentiment_vectorized(progress: JobProgress) -> Dict:
+        """
+        Reconstrucción completa con el motor vectorizado: un solo cursor proyectado sobre
+        los tweets de todos los símbolos, procesado en lotes de SCORING_BATCH_SIZE.
+        """
+        # Importación diferida: scoring depende de SentimentService
+        from scoring import SymbolSentimentAccumulator, score_batch
+        
+        db = Database.get_db()
+        symbols_collection = db["symbols"]
+        tweets_collection = db["tweets"]
+        sentiment_collection = db["symbols_sentiment"]
+        
+        symbols = await symbols_collection.find({}, {"symbol": 1, "sector": 1}).to_list(length=None)
+        symbol_names = list(dict.fromkeys(symbol.get("symbol", "Unknown") for symbol in symbols))
+        progress.set_total(len(symbols))
+        
+        accumulator = SymbolSentimentAccumulator(symbol_names)
+        rebuilt_from = datetime.utcnow()
+        cursor = tweets_collection.find(
+            {"company": {"$in": symbol_names}},
+            {"company": 1, "sentiment": 1, "sentiment_prob": 1}
+        ).batch_size(settings.CURSOR_BATCH_SIZE)
+        
+        async def score(batch: List[Dict]):
+            # Codificación y conteo fuera del event loop, por trozos; las sumas parciales
+            # se combinan acá
+            for partial in await cpu_executor.map_chunks(score_batch, batch, symbol_names):
+                accumulator.merge(partial)
+            progress.advance(tweets=len(batch))
+        
+        batch = []
+        async for tweet in cursor:
+            batch.append(tweet)
+            if len(batch) >= settings.SCORING_BATCH_SIZE:
+                await score(batch)
+                batch = []
+        await score(batch)
+        
+        docs = accumulator.build_docs({})
+        
+        sentiment_stats = {
+            "positivo": 0,
+            "negativo": 0,
+            "neutral": 0,
+            "mixto": 0
+        }
+        symbol_docs = []
+        for symbol in symbols:
+            symbol_name = symbol.get("symbol", "Unknown")
+            symbol_sentiment_doc = dict(docs[symbol_name], sector=symbol.get("sector", None))
+            # El sector se asigna acá: la huella se recalcula con el documento completo
+            symbol_sentiment_doc["fingerprint"] = SentimentService._fingerprint(symbol_sentiment_doc)
+            overall_sentiment = symbol_sentiment_doc["overall_sentiment"]
+            sentiment_stats[overall_sentiment] = sentiment_stats.get(overall_sentiment, 0) + 1
+            symbol_docs.append(symbol_sentiment_doc)
+        
+        writes = await SentimentService._write_symbol_docs(sentiment_collection, symbol_docs, rebuilt_from)
+        progress.advance(symbols=len(symbols))
+        
+        symbols_created = len(symbol_docs)
+        return {
+            "total_symbols_processed": len(symbols),
+            "symbols_created": symbols_created,
+            **writes,
             "symbols_with_positive": sentiment_stats.get("positivo", 0),
             "symbols_with_negative": sentiment_stats.get("negativo", 0),
             "symbols_with_neutral": sentiment_stats.get("neutral", 0),
             "symbols_with_mixed": sentiment_stats.get("mixto", 0),
+            "tweets_processed": accumulator.tweets_processed,
             "message": f"Colección 'symbols_sentiment' creada/actualizada exitosamente con {symbols_created} símbolos."
         }
     
     @staticmethod
+    @profiled("mode.incremental")
+    async def _create_symbols_sentiment_incremental(progress: JobProgress) -> Dict:
+        """
+        Recálculo incremental de symbols_sentiment.
+        Cada documento guarda en 'last_tweet_id' el mayor _id de tweet contabilizado; solo
+        se agregan los tweets posteriores y se suman con $inc a 'sentiment_counts'. Los
+        campos derivados se recalculan a partir de los conteos resultantes. El filtro por
+        la marca de agua leída evita aplicar dos veces el mismo delta si dos recálculos
+        corren a la vez.
+        
+        Los símbolos sin documento o sin marca de agua se reconstruyen completos. Los
+        cambios sobre tweets ya contabilizados solo se reflejan con una reconstrucción
+        completa (modos 'python' o 'aggregation').
+        
+        Supone que el orden de los _id es el orden de inserción, algo que ningún escritor
+        garantiza: los ObjectId los genera quien inserta (el scraper, con su reloj), no el
+        servidor. Un tweet insertado después de la última ejecución pero con un _id menor
+        que la marca de agua (generado antes de insertarse o con un reloj atrasado) no se
+        cuenta hasta la próxima reconstrucción completa. Conviene combinar este modo con
+        reconstrucciones completas periódicas.
+        
+        Los tweets de POST /tweets/batch ('ingest_batch') no se escanean: los cuenta su
+        lote. Con el change feed activo este modo se rechaza: contaría también los tweets
+        que el feed todavía no aplicó, y el feed ya mantiene los agregados al día.
+        """
+        if settings.FEED_ENABLED:
+            raise ValueError("El modo incremental no está disponible con el change feed activo (FEED_ENABLED)")
+        db = Database.get_db()
+        symbols_collection = db["symbols"]
+        tweets_collection = db["tweets"]
+        sentiment_collection = db["symbols_sentiment"]
+        
+        symbols = await symbols_collection.find({}, {"symbol": 1, "sector": 1}).to_list(length=None)
+        
+        # Un único sector por símbolo (el último gana, como en la reconstrucción completa)
+        sectors = {}
+        for symbol in symbols:
+            sectors[symbol.get("symbol", "Unknown")] = symbol.get("sector", None)
+        progress.set_total(len(sectors))
+        
+        existing = {}
+        async for doc in sentiment_collection.find(
+            {"symbol": {"$in": list(sectors)}},
+            {"symbol": 1, "sector": 1, "sentiment_counts": 1, "total_tweets": 1,
+             "tweets_without_sentiment": 1, "overall_sentiment": 1, "last_tweet_id": 1}
+        ):
+            # Sin 'tweets_without_sentiment' (documentos anteriores a ese conteo) se
+            # reconstruye completo, como si no tuviera marca de agua
+            if doc.get("tweets_without_sentiment") is None:
+                doc.pop("last_tweet_id", None)
+            existing[doc["symbol"]] = doc
+        
+        # Solo los tweets posteriores a la marca de agua de cada símbolo
+        clauses = []
+        for symbol_name in sectors:
+            watermark = existing.get(symbol_name, {}).get("last_tweet_id")
+            if watermark is not None:
+                clauses.append({"company": symbol_name, "_id": {"$gt": watermark}, "ingest_batch": {"$exists": False}})
+            else:
+                clauses.append({"company": symbol_name})
+        
+        deltas = {}
+        bucket_rows = {}
+        rebuilt_from = datetime.utcnow()
+        if clauses:
+            deltas = await SentimentService._aggregate_sentiment_counts(tweets_collection, {"$or": clauses})
+            for row in await SentimentTimeseriesService.aggregate_bucket_rows({"$or": clauses}):
+                bucket_rows.setdefault(row["symbol"], []).append(row)
+        progress.advance(tweets=sum(delta["total"] for delta in deltas.values()))
+        
+        sentiment_stats = {
+            "positivo": 0,
+            "negativo": 0,
+            "neutral": 0,
+            "mixto": 0
+        }
+        operations = []
+        rebuilt_symbols = []
+        guarded = {}
+        new_docs = {}
+        tweets_processed = 0
+        symbols_skipped = 0
+        for symbol_name, symbol_sector in sectors.items():
+            current = existing.get(symbol_name)
+            delta = deltas.get(symbol_name)
+            watermark = current.get("last_tweet_id") if current else None
+            
+            if delta:
+                tweets_processed += delta["total"]
+            
+            if watermark is None and current is not None and "last_tweet_id" in current and delta is None:
+                # Símbolo ya calculado, sin tweets antes ni ahora: no se escribe nada
+                symbols_skipped += 1
+                overall = current.get("overall_sentiment", "neutral")
+                sentiment_stats[overall] = sentiment_stats.get(overall, 0) + 1
+                continue
+            elif watermark is None:
+                # Sin marca de agua: reconstrucción completa de este símbolo
+                if delta is None:
+                    delta = {"counts": {}, "total": 0, "unlabeled": 0, "last_tweet_id": None}
+                doc = SentimentService._build_symbol_sentiment_doc(
+                    symbol_name, symbol_sector, dict(delta["counts"]), delta["total"], delta["last_tweet_id"],
+                    delta["unlabeled"]
+                )
+                rebuilt_symbols.append(symbol_name)
+                new_docs[symbol_name] = doc
+                operations.append(UpdateOne(
+                    {"symbol": symbol_name},
+                    {"$set": dict(doc, rebuilt_from=rebuilt_from), "$inc": {"revision": 1}},
+                    upsert=True
+                ))
+            elif delta is None:
+                # No hay tweets nuevos: no se escribe nada
+                symbols_skipped += 1
+                overall = current.get("overall_sentiment", "neutral")
+                sentiment_stats[overall] = sentiment_stats.get(overall, 0) + 1
+                continue
+            else:
+                sentiment_counts = dict(current.get("sentiment_counts", {}))
+                for sent, count in delta["counts"].items():
+                    sentiment_counts[sent] = sentiment_counts.get(sent, 0) + count
+                total_tweets = current.get("total_tweets", 0) + delta["total"]
+                tweets_without_sentiment = current["tweets_without_sentiment"] + delta["unlabeled"]
+                
+                doc = SentimentService._build_symbol_sentiment_doc(
+                    symbol_name, symbol_sector, sentiment_counts, total_tweets, delta["last_tweet_id"],
+                    tweets_without_sentiment
+                )
+                increments = {f"sentiment_counts.{sent}": count for sent, count in delta["counts"].items()}
+                increments["total_tweets"] = delta["total"]
+                increments["tweets_without_sentiment"] = delta["unlabeled"]
+                increments["revision"] = 1
+                derived = {
+                    k: v for k, v in doc.items()
+                    if k not in ("sentiment_counts", "total_tweets", "tweets_without_sentiment")
+                }
+                new_docs[symbol_name] = doc
+                guarded[symbol_name] = (
+                    {"symbol": symbol_name, "last_tweet_id": watermark},
+                    {"$inc": increments, "$set": derived}
+                )
+            
+            overall_sentiment = doc["overall_sentiment"]
+            sentiment_stats[overall_sentiment] = sentiment_stats.get(overall_sentiment, 0) + 1
+        
+        # Símbolos reconstruidos: sus buckets se reemplazan por los recién calculados
+        if operations:
+            await sentiment_collection.bulk_write(operations, ordered=False)
+            await db[SentimentTimeseriesService.COLLECTION].delete_many({"symbol": {"$in": rebuilt_symbols}})
+        
+        # Escrituras condicionadas a la marca de agua: solo los símbolos cuya escritura
+        # se aplicó suman el delta a sus buckets (otra ejecución pudo adelantarse)
+        applied_symbols = list(rebuilt_symbols)
+        if guarded:
+            results = await asyncio.gather(*(
+                sentiment_collection.update_one(query, update) for query, update in guarded.values()
+            ))
+            applied_symbols += [
+                symbol_name for symbol_name, result in zip(guarded, results) if result.matched_count
+            ]
+        await SentimentTimeseriesService.add_bucket_rows(
+            [row for symbol_name in applied_symbols for row in bucket_rows.get(symbol_name, [])]
+        )
+        rollup_deltas = {}
+        for symbol_name in applied_symbols:
+            SectorRollupService.add_symbol_delta(rollup_deltas, existing.get(symbol_name), new_docs[symbol_name])
+        await SectorRollupService.apply_deltas(rollup_deltas)
+        progress.advance(symbols=len(sectors))
+        
+        symbols_created = len(operations) + len(guarded)
+        return {
+            "total_symbols_processed": len(symbols),
+            "symbols_created": symbols_created,
+            "symbols_written": len(applied_symbols),
+            "writes_skipped": symbols_skipped,
+            "symbols_with_positive": sentiment_stats.get("positivo", 0),
+            "symbols_with_negative": sentiment_stats.get("negativo", 0),
+            "symbols_with_neutral": sentiment_stats.get("neutral", 0),
+            "symbols_with_mixed": sentiment_stats.get("mixto", 0),
+            "symbols_skipped": symbols_skipped,
+            "tweets_processed": tweets_processed,
+            "message": f"Colección 'symbols_sentiment' actualizada incrementalmente: {symbols_created} símbolos con tweets nuevos."
+        }
+    
+    @staticmethod
+    async def apply_sentiment_changes(changes: Dict[str, List[Tuple]], session=None,
+                                      batch_id: Optional[str] = None) -> Dict:
+        """
+        Aplica cambios a nivel tweet sobre los agregados de symbols_sentiment sin reescanear.
+        
+        'changes' agrupa por company tuplas (tweet_id, sentimiento_anterior, sentimiento_nuevo,
+        created_at, delta_sin_sentimiento, posición, momento) ya normalizadas:
+        - alta: (tweet_id, None, nuevo, created_at, 0|1, ...).
+        - modificación: (tweet_id, anterior, nuevo, created_at, -1|0|1, ...).
+        - baja: (tweet_id, anterior, None, created_at, -1|0, ...).
+        
+        'delta_sin_sentimiento' es el cambio en 'tweets_without_sentiment' (ver _has_sentiment).
+        
+        Cada documento registra, en la misma escritura que sus conteos, qué cambios ya
+        contiene; así un cambio repetido no se cuenta dos veces, sin depender del orden
+        de los _id (que generan escritores concurrentes):
+        - 'batch_id': lote de ingesta. Los últimos APPLIED_BATCHES_KEPT lotes aplicados
+          quedan en 'applied_batches' y un lote ya aplicado se saltea entero.
+        - 'posición': posición del evento en el change stream. 'feed_position' guarda la
+          última aplicada y se saltean las anteriores (al releer tras un reinicio).
+        - 'momento': cuándo se escribió el cambio. Los anteriores a 'rebuilt_from' (inicio
+          del escaneo de la última reconstrucción completa) ya están en los conteos.
+        'last_tweet_id' solo avanza con las altas fuera de un lote de ingesta (el modo
+        incremental escanea desde ahí y no escanea los tweets ingestados).
+        
+        Los cambios aplicados se suman también a los buckets de la serie temporal
+        según 'created_at' y a los agregados por sector y de mercado (en la misma
+        sesión, si se indica).
+        
+        Cada documento se escribe con control optimista sobre 'revision'; los símbolos
+        cuya revisión cambió entre la lectura y la escritura se devuelven en 'conflicts'
+        para que el llamador los reintente. Las companies sin documento en
+        symbols_sentiment (símbolos desconocidos) se ignoran.
+        """
+        db = Database.get_db()
+        sentiment_collection = db["symbols_sentiment"]
+        
+        current_docs = {}
+        async for doc in sentiment_collection.find(
+            {"symbol": {"$in": list(changes)}},
+            {"symbol": 1, "sector": 1, "sentiment_counts": 1, "total_tweets": 1,
+             "tweets_without_sentiment": 1, "last_tweet_id": 1, "revision": 1,
+             "applied_batches": 1, "feed_position": 1, "rebuilt_from": 1},
+            session=session
+        ):
+            current_docs[doc["symbol"]] = doc
+        
+        applied = 0
+        skipped = 0
+        unknown_symbols = []
+        conflicts = []
+        updated_symbols = []
+        bucket_rows = []
+        rollup_deltas = {}
+        cutoff = SentimentTimeseriesService._hourly_cutoff()
+        for symbol_name, symbol_changes in changes.items():
+            current = current_docs.get(symbol_name)
+            if current is None:
+                unknown_symbols.append(symbol_name)
+                continue
+            if batch_id is not None and batch_id in current.get("applied_batches", []):
+                # Un intento anterior del mismo lote ya sumó sus tweets a este símbolo
+                skipped += len(symbol_changes)
+                continue
+            
+            total_tweets = current.get("total_tweets", 0)
+            # Un símbolo sin tweets guarda {"neutral": 1} como marcador, no como conteo real
+            sentiment_counts = dict(current.get("sentiment_counts", {})) if total_tweets > 0 else {}
+            watermark = current.get("last_tweet_id")
+            feed_position = current.get("feed_position")
+            rebuilt_from = current.get("rebuilt_from")
+            # Sin conteo previo (documento anterior a ese campo) queda sin conocer hasta el
+            # próximo recálculo
+            tweets_without_sentiment = current.get("tweets_without_sentiment")
+            
+            symbol_applied = 0
+            symbol_buckets = {}
+            for tweet_id, old_sentiment, new_sentiment, created_at, unlabeled_step, position, changed_at in symbol_changes:
+                if position is not None and feed_position is not None and position <= feed_position:
+                    skipped += 1
+                    continue
+                if changed_at is not None and rebuilt_from is not None and changed_at <= rebuilt_from:
+                    skipped += 1
+                    continue
+                if position is not None:
+                    feed_position = position
+                
+                if old_sentiment is None:
+                    # Los tweets de un lote de ingesta no mueven la marca de agua: el modo
+                    # incremental no los escanea y sus _id (generados por la API) pueden
+                    # superar los de tweets del scraper insertados después
+                    if batch_id is None and (watermark is None or tweet_id > watermark):
+                        watermark = tweet_id
+                else:
+                    sentiment_counts[old_sentiment] = sentiment_counts.get(old_sentiment, 0) - 1
+                    if sentiment_counts[old_sentiment] <= 0:
+                        del sentiment_counts[old_sentiment]
+                    total_tweets -= 1
+                
+                if new_sentiment is not None:
+                    sentiment_counts[new_sentiment] = sentiment_counts.get(new_sentiment, 0) + 1
+                    total_tweets += 1
+                if tweets_without_sentiment is not None:
+                    tweets_without_sentiment += unlabeled_step
+                symbol_applied += 1
+                
+                bucket_key = SentimentTimeseriesService._bucket_key(created_at, cutoff)
+                if bucket_key is not None:
+                    row = symbol_buckets.setdefault(bucket_key, {
+                        "symbol": symbol_name,
+                        "granularity": bucket_key[0],
+                        "bucket_start": bucket_key[1],
+                        "sentiment_counts": {},
+                        "total_tweets": 0
+                    })
+                    for sent, step in ((old_sentiment, -1), (new_sentiment, 1)):
+                        if sent is not None:
+                            row["sentiment_counts"][sent] = row["sentiment_counts"].get(sent, 0) + step
+                            row["total_tweets"] += step
+            
+            if symbol_applied == 0:
+                continue
+            
+            doc = SentimentService._build_symbol_sentiment_doc(
+                symbol_name, current.get("sector"), sentiment_counts, total_tweets, watermark,
+                tweets_without_sentiment
+            )
+            update = {"$set": doc, "$inc": {"revision": 1}}
+            if feed_position is not None:
+                update["$set"] = dict(doc, feed_position=feed_position)
+            if batch_id is not None:
+                update["$push"] = {"applied_batches": {
+                    "$each": [batch_id], "$slice": -SentimentService.APPLIED_BATCHES_KEPT
+                }}
+            result = await sentiment_collection.update_one(
+                {"symbol": symbol_name, "revision": current.get("revision")},
+                update,
+                session=session
+            )
+            if result.matched_count == 0:
+                conflicts.append(symbol_name)
+                continue
+            applied += symbol_applied
+            updated_symbols.append(symbol_name)
+            bucket_rows.extend(symbol_buckets.values())
+            SectorRollupService.add_symbol_delta(rollup_deltas, current, doc)
+        
+        await SentimentTimeseriesService.add_bucket_rows(bucket_rows, session=session)
+        await SectorRollupService.apply_deltas(rollup_deltas, session=session)
+        
+        if updated_symbols:
+            symbols_sentiment_snapshot.invalidate()
+        
+        return {
+            "applied": applied,
+            "skipped": skipped,
+            "updated_symbols": updated_symbols,
+            "unknown_symbols": unknown_symbols,
+            "conflicts": conflicts
+        }
+    
+    @staticmethod
+    def _serialize_sentiment_doc(sentiment: Dict) -> Dict:
+        """Convierte el ObjectId del documento a string para serialización"""
+        if isinstance(sentiment.get("_id"), ObjectId):
+            sentiment["_id"] = str(sentiment["_id"])
+        return sentiment
+    
+    @staticmethod
+    def _encode_cursor(values: List[Any]) -> str:
+        """Cursor opaco de paginación: los valores de la clave de orden del último elemento"""
+        return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str, length: int) -> List[Any]:
+        """
+        Valores de un cursor de _encode_cursor con 'length' claves de orden. Solo se
+        aceptan escalares (texto, números o null): los valores van tal cual al filtro de
+        MongoDB y un objeto como {"$ne": ...} se interpretaría como un operador.
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, UnicodeError):
+            raise ValueError("Cursor de paginación inválido")
+        if not isinstance(values, list) or len(values) != length or not all(
+            value is None or (isinstance(value, (str, int, float)) and not isinstance(value, bool))
+            for value in values
+        ):
+            raise ValueError("Cursor de paginación inválido")
+        return values
+    
+    @staticmethod
+    def _projection(fields: Optional[List[str]], required: Tuple[str, ...] = ("symbol",)) -> Dict:
+        """
+        Proyección de las lecturas de symbols_sentiment: los campos pedidos o, sin
+        'fields', el documento sin los campos internos (INTERNAL_FIELDS)
+        """
+        if not fields:
+            return {field: 0 for field in SentimentService.INTERNAL_FIELDS}
+        invalid = [field for field in fields if field not in SentimentService.QUERY_FIELDS]
+        if invalid:
+            raise ValueError(f"Campos inválidos: {', '.join(invalid)}")
+        projection = {field: 1 for field in fields}
+        for field in required:
+            projection[field] = 1
+        projection["_id"] = 0
+        return projection
+    
+    @staticmethod
+    @profiled("get_symbols_sentiment")
     async def get_symbols_sentiment() -> Dict:
         """Obtiene todos los sentimientos de símbolos de la colección symbols_sentiment"""
         db = Database.get_db()
         sentiment_collection = db["symbols_sentiment"]
         
-        # Obtener todos los documentos
-        sentiments = await sentiment_collection.find({}).to_list(length=None)
+        # Obtener todos los documentos, sin los campos internos
+        sentiments = await sentiment_collection.find({}, SentimentService._projection(None)).to_list(length=None)
         
         # Convertir ObjectId a string para serialización
         for sentiment in sentiments:
-            if "_id" in sentiment:
-                sentiment["_id"] = str(sentiment["_id"])
+            SentimentService._serialize_sentiment_doc(sentiment)
         
         return {
             "total_symbols": len(sentiments),
@@ -294,50 +1449,1006 @@ class SentimentService:
         }
     
     @staticmethod
-    async def get_symbols_summary() -> Dict:
-        """Obtiene un resumen de los símbolos y sus tweets desde la colección tweets"""
+    def _sentiment_filter(sector: Optional[str] = None,
+                          overall_sentiment: Optional[str] = None,
+                          min_confidence: Optional[float] = None,
+                          min_total_tweets: Optional[int] = None) -> Dict[str, Any]:
+        """Filtro de symbols_sentiment para los parámetros de consulta"""
+        query: Dict[str, Any] = {}
+        if sector is not None:
+            query["sector"] = sector
+        if overall_sentiment is not None:
+            query["overall_sentiment"] = overall_sentiment
+        if min_confidence is not None:
+            query["confidence_score"] = {"$gte": min_confidence}
+        if min_total_tweets is not None:
+            query["total_tweets"] = {"$gte": min_total_tweets}
+        return query
+    
+    @staticmethod
+    async def iter_symbols_sentiment(sector: Optional[str] = None,
+                                     overall_sentiment: Optional[str] = None,
+                                     min_confidence: Optional[float] = None,
+                                     min_total_tweets: Optional[int] = None,
+                                     fields: Optional[List[str]] = None,
+                                     batch_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Recorre symbols_sentiment con un cursor por lotes, un documento por vez.
+        La memoria usada depende de 'batch_size', no de la cantidad de símbolos.
+        """
+        db = Database.get_db()
+        sentiment_collection = db["symbols_sentiment"]
+        
+        query = SentimentService._sentiment_filter(sector, overall_sentiment, min_confidence, min_total_tweets)
+        cursor = sentiment_collection.find(query, SentimentService._projection(fields)).sort("symbol", 1)
+        async for document in cursor.batch_size(batch_size or settings.CURSOR_BATCH_SIZE):
+            yield SentimentService._serialize_sentiment_doc(document)
+    
+    @staticmethod
+    @profiled("query_symbols_sentiment")
+    async def query_symbols_sentiment(sector: Optional[str] = None,
+                                      overall_sentiment: Optional[str] = None,
+                                      min_confidence: Optional[float] = None,
+                                      min_total_tweets: Optional[int] = None,
+                                      fields: Optional[List[str]] = None,
+                                      sort: str = "symbol",
+                                      order: str = "asc",
+                                      limit: int = 50,
+                                      cursor: Optional[str] = None) -> Dict:
+        """
+        Consulta paginada de symbols_sentiment con filtros, proyección y orden.
+        
+        La paginación es por clave (keyset): el orden es (sort, symbol) y el cursor guarda
+        esos valores del último elemento devuelto, de modo que cada página es un rango
+        de índice y su costo depende del tamaño de página, no de la cantidad de símbolos.
+        """
+        if sort not in SentimentService.QUERY_SORT_FIELDS:
+            raise ValueError(f"Campo de orden inválido: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Orden inválido: {order}")
+        
+        db = Database.get_db()
+        sentiment_collection = db["symbols_sentiment"]
+        
+        query = SentimentService._sentiment_filter(sector, overall_sentiment, min_confidence, min_total_tweets)
+        
+        direction = 1 if order == "asc" else -1
+        comparison = "$gt" if order == "asc" else "$lt"
+        if sort == "symbol":
+            sort_keys = [("symbol", direction)]
+        else:
+            sort_keys = [(sort, direction), ("symbol", direction)]
+        
+        if cursor:
+            values = SentimentService._decode_cursor(cursor, len(sort_keys))
+            if sort == "symbol":
+                after = {"symbol": {comparison: values[0]}}
+            else:
+                after = {"$or": [
+                    {sort: {comparison: values[0]}},
+                    {sort: values[0], "symbol": {comparison: values[1]}}
+                ]}
+            query = {"$and": [query, after]} if query else after
+        
+        projection = SentimentService._projection(fields, required=("symbol", sort))
+        documents = await sentiment_collection.find(query, projection).sort(sort_keys).limit(limit + 1).to_list(length=None)
+        
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = SentimentService._encode_cursor([last.get(key) for key, _ in sort_keys])
+        
+        for document in documents:
+            SentimentService._serialize_sentiment_doc(document)
+            # El campo de orden se proyecta para el cursor aunque no se haya pedido
+            # ('symbol' se devuelve siempre)
+            if fields and sort not in fields and sort != "symbol":
+                document.pop(sort, None)
+        
+        return {
+            "count": len(documents),
+            "symbols": documents,
+            "next_cursor": next_cursor
+        }
+    
+    @staticmethod
+    async def get_symbol_sentiment(symbol: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """Obtiene el sentimiento agregado de un único símbolo (None si no existe)"""
+        db = Database.get_db()
+        sentiment_collection = db["symbols_sentiment"]
+        
+        document = await sentiment_collection.find_one(
+            {"symbol": symbol}, SentimentService._projection(fields)
+        )
+        return SentimentService._serialize_sentiment_doc(document) if document else None
+    
+    @staticmethod
+    @profiled("get_symbols_sentiment_batch")
+    async def get_symbols_sentiment_batch(symbols: List[str], fields: Optional[List[str]] = None) -> Dict:
+        """Obtiene el sentimiento agregado de una lista de símbolos en una sola consulta"""
+        db = Database.get_db()
+        sentiment_collection = db["symbols_sentiment"]
+        
+        found = {}
+        async for document in sentiment_collection.find(
+            {"symbol": {"$in": symbols}}, SentimentService._projection(fields)
+        ):
+            found[document["symbol"]] = SentimentService._serialize_sentiment_doc(document)
+        
+        # Respetar el orden pedido e informar los símbolos inexistentes
+        return {
+            "count": len(found),
+            "symbols": [found[symbol] for symbol in dict.fromkeys(symbols) if symbol in found],
+            "missing": [symbol for symbol in dict.fromkeys(symbols) if symbol not in found]
+        }
+    
+    # Campos de symbols_sentiment con los que se arma el resumen de un símbolo
+    SUMMARY_FIELDS = {
+        "_id": 0, "symbol": 1, "sentiment_counts": 1, "total_tweets": 1,
+        "tweets_without_sentiment": 1, "last_updated": 1
+    }
+    
+    @staticmethod
+    def _summarize_symbol(symbol_name: str, sentiment: Optional[Dict]) -> Dict:
+        """
+        Resumen de los tweets de un símbolo a partir de su documento de symbols_sentiment.
+        Los tweets sin sentimiento están contados como 'neutral' en sentiment_counts: se
+        descuentan de ahí para informar solo los sentimientos presentes en los tweets.
+        """
+        symbol_data = {
+            "symbol": symbol_name,
+            "total_tweets": 0,
+            "tweets_with_sentiment": 0,
+            "tweets_without_sentiment": 0,
+            "sentiments": {},
+            "last_updated": sentiment.get("last_updated") if sentiment else None
+        }
+        if not sentiment or not sentiment.get("total_tweets"):
+            return symbol_data
+        
+        total_tweets = sentiment["total_tweets"]
+        # None: documento anterior al conteo, hasta el próximo recálculo
+        tweets_without_sentiment = sentiment.get("tweets_without_sentiment") or 0
+        sentiments = dict(sentiment.get("sentiment_counts", {}))
+        if tweets_without_sentiment:
+            sentiments["neutral"] = sentiments.get("neutral", 0) - tweets_without_sentiment
+        
+        symbol_data["total_tweets"] = total_tweets
+        symbol_data["tweets_with_sentiment"] = total_tweets - tweets_without_sentiment
+        symbol_data["tweets_without_sentiment"] = tweets_without_sentiment
+        symbol_data["sentiments"] = {sent: count for sent, count in sentiments.items() if count > 0}
+        return symbol_data
+    
+    @staticmethod
+    def _summarize_chunk(symbols: List[Tuple[str, Optional[Dict]]]) -> List[Dict]:
+        """Resúmenes de un trozo de pares (símbolo, documento); corre en cpu_executor"""
+        return [SentimentService._summarize_symbol(name, sentiment) for name, sentiment in symbols]
+    
+    @staticmethod
+    @profiled("summarize_symbols")
+    async def _summarize_symbols(sentiment_collection, symbol_names: List[str]) -> List[Dict]:
+        """Resúmenes de varios símbolos, en el orden pedido, con una sola consulta"""
+        found = {}
+        async for doc in sentiment_collection.find(
+            {"symbol": {"$in": symbol_names}}, SentimentService.SUMMARY_FIELDS
+        ):
+            found[doc["symbol"]] = doc
+        chunks = await cpu_executor.map_chunks(
+            SentimentService._summarize_chunk, [(name, found.get(name)) for name in symbol_names]
+        )
+        return [summary for chunk in chunks for summary in chunk]
+    
+    @staticmethod
+    async def iter_symbols_summary(sector: Optional[str] = None,
+                                   batch_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Versión en streaming de get_symbols_summary: un resumen de símbolo por vez"""
         db = Database.get_db()
         symbols_collection = db["symbols"]
+        sentiment_collection = db["symbols_sentiment"]
+        batch_size = batch_size or settings.CURSOR_BATCH_SIZE
+        
+        query = {"sector": sector} if sector is not None else {}
+        symbols = symbols_collection.find(query, {"symbol": 1}).sort("symbol", 1).batch_size(batch_size)
+        names = []
+        async for symbol in symbols:
+            names.append(symbol.get("symbol", "Unknown"))
+            if len(names) >= batch_size:
+                for summary in await SentimentService._summarize_symbols(sentiment_collection, names):
+                    yield summary
+                names = []
+        for summary in await SentimentService._summarize_symbols(sentiment_collection, names):
+            yield summary
+    
+    @staticmethod
+    async def iter_tweets_per_company(batch_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Cantidad de tweets por company, agrupada en MongoDB y leída por lotes"""
+        db = Database.get_db()
         tweets_collection = db["tweets"]
         
-        # Obtener todos los símbolos
-        symbols = await symbols_collection.find({}).to_list(length=None)
+        pipeline = [
+            {"$group": {"_id": "$company", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        cursor = tweets_collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size or settings.CURSOR_BATCH_SIZE)
+        async for row in cursor:
+            yield {"company": row["_id"], "count": row["count"]}
+    
+    @staticmethod
+    @profiled("get_symbols_summary")
+    async def get_symbols_summary(sector: Optional[str] = None,
+                                  limit: Optional[int] = None,
+                                  cursor: Optional[str] = None) -> Dict:
+        """
+        Obtiene un resumen de los símbolos y sus tweets desde los conteos ya calculados en
+        symbols_sentiment (no recorre la colección tweets).
+        Con 'limit' devuelve una página ordenada por símbolo y el cursor de la siguiente.
         
-        summary = []
-        for symbol in symbols:
-            symbol_name = symbol.get("symbol", "Unknown")
+        Frescura: 'last_updated' de cada símbolo es el último cambio de sus conteos y
+        'last_computed_at' el último recálculo de symbols_sentiment.
+        """
+        db = Database.get_db()
+        symbols_collection = db["symbols"]
+        sentiment_collection = db["symbols_sentiment"]
+        
+        query: Dict[str, Any] = {}
+        if sector is not None:
+            query["sector"] = sector
+        if cursor:
+            values = SentimentService._decode_cursor(cursor, 1)
+            query["symbol"] = {"$gt": values[0]}
+        
+        # Obtener los símbolos (todos o una página)
+        symbols_cursor = symbols_collection.find(query, {"symbol": 1})
+        if limit is not None:
+            symbols_cursor = symbols_cursor.sort("symbol", 1).limit(limit + 1)
+        symbols = await symbols_cursor.to_list(length=None)
+        
+        next_cursor = None
+        if limit is not None and len(symbols) > limit:
+            symbols = symbols[:limit]
+            next_cursor = SentimentService._encode_cursor([symbols[-1].get("symbol", "Unknown")])
+        
+        summary = await SentimentService._summarize_symbols(
+            sentiment_collection, [symbol.get("symbol", "Unknown") for symbol in symbols]
+        )
+        state = await db[SentimentService.RECOMPUTE_STATE_COLLECTION].find_one({"_id": "symbols_sentiment"})
+        
+        response = {
+            "total_symbols": len(summary),
+            "symbols": summary,
+            "last_computed_at": state.get("last_computed_at") if state else None
+        }
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+        return response
+
+class IngestionOverloadedError(Exception):
+    """No hubo lugar para procesar el lote dentro de INGEST_QUEUE_TIMEOUT_SECONDS"""
+    
+    def __init__(self, retry_after: float):
+        super().__init__(f"Ingesta saturada, reintentar en {retry_after:g}s")
+        self.retry_after = retry_after
+
+class IngestionInProgressError(Exception):
+    """Otro proceso está procesando el lote con la misma clave de idempotencia"""
+
+class TweetIngestionService:
+    """
+    Ingesta de tweets por lotes: inserta los tweets en la colección 'tweets' y suma en
+    la misma llamada sus conteos a symbols_sentiment, a los buckets y a los agregados
+    por sector (SentimentService.apply_sentiment_changes).
+    """
+    
+    COLLECTION = "ingest_batches"
+    MAX_CONFLICT_RETRIES = 5
+    MAX_REPORTED_ERRORS = 20
+    
+    # Lotes en proceso en este worker; se crea con el primer lote (necesita el loop)
+    _slots: Optional[asyncio.Semaphore] = None
+    
+    @staticmethod
+    def _parse_created_at(value) -> Optional[datetime]:
+        if value is None:
+            return datetime.utcnow()
+        if isinstance(value, datetime):
+            created_at = value
+        elif isinstance(value, str):
+            try:
+                created_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+        else:
+            return None
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return created_at
+    
+    @staticmethod
+    def _validate_tweet(item) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Validación liviana de un tweet recibido (sin un modelo Pydantic por ítem).
+        Devuelve (documento a insertar, None) o (None, error). Los campos no
+        reconocidos se descartan.
+        """
+        if not isinstance(item, dict):
+            return None, "el tweet debe ser un objeto"
+        company = item.get("company")
+        if not isinstance(company, str) or not company.strip():
+            return None, "'company' es obligatorio"
+        text = item.get("text")
+        if text is not None and not isinstance(text, str):
+            return None, "'text' debe ser un string"
+        sentiment = item.get("sentiment")
+        if sentiment is not None and not isinstance(sentiment, str):
+            return None, "'sentiment' debe ser un string"
+        sentiment_prob = item.get("sentiment_prob")
+        if sentiment_prob is not None and not (
+            isinstance(sentiment_prob, dict) and all(
+                isinstance(prob, (int, float)) and not isinstance(prob, bool) for prob in sentiment_prob.values()
+            )
+        ):
+            return None, "'sentiment_prob' debe ser un objeto de probabilidades"
+        created_at = TweetIngestionService._parse_created_at(item.get("created_at"))
+        if created_at is None:
+            return None, "'created_at' debe ser una fecha ISO 8601"
+        
+        doc = {"company": company.strip(), "text": text, "created_at": created_at}
+        if "sentiment" in item:
+            doc["sentiment"] = sentiment
+        if sentiment_prob is not None:
+            doc["sentiment_prob"] = sentiment_prob
+        return doc, None
+    
+    @staticmethod
+    def _digest(tweets: List) -> str:
+        """Huella del lote para detectar una clave de idempotencia reutilizada con otro contenido"""
+        encoded = json.dumps(tweets, default=str, separators=(",", ":"))
+        return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    async def _acquire_slot():
+        if TweetIngestionService._slots is None:
+            TweetIngestionService._slots = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENT_BATCHES)
+        try:
+            await asyncio.wait_for(
+                TweetIngestionService._slots.acquire(), timeout=settings.INGEST_QUEUE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            INGEST_BATCHES.inc("overloaded")
+            raise IngestionOverloadedError(settings.INGEST_QUEUE_TIMEOUT_SECONDS)
+    
+    @staticmethod
+    async def _claim(idempotency_key: str, digest: str,
+                     tweet_ids: List[ObjectId]) -> Tuple[Optional[Dict], List[ObjectId], Optional[datetime]]:
+        """
+        Registra el lote bajo su clave de idempotencia.
+        Devuelve (resultado guardado, None, None) si el lote ya se procesó, o (None, ids,
+        inserted_at) con los _id a usar: los nuevos, o los del intento anterior si se
+        retoma un lote cuyo proceso quedó a medias (así sus tweets no se insertan ni se
+        cuentan dos veces). 'inserted_at' es cuándo terminó de insertarlos ese intento
+        (None si no llegó a hacerlo).
+        """
+        collection = Database.get_db()[TweetIngestionService.COLLECTION]
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=settings.INGEST_LEASE_SECONDS)
+        try:
+            await collection.insert_one({
+                "_id": idempotency_key,
+                "digest": digest,
+                "status": "processing",
+                "tweet_ids": tweet_ids,
+                "lease_until": lease_until,
+                "created_at": now,
+                "result": None
+            })
+            return None, tweet_ids, None
+        except DuplicateKeyError:
+            existing = await collection.find_one({"_id": idempotency_key})
+        
+        if existing is None:
+            raise IngestionInProgressError(f"Lote {idempotency_key} en proceso")
+        if existing["digest"] != digest:
+            raise ValueError("La clave de idempotencia ya se usó con otro lote")
+        if existing["status"] == "completed":
+            return existing["result"], None, None
+        if existing["lease_until"] > now:
+            raise IngestionInProgressError(f"Lote {idempotency_key} en proceso")
+        
+        # El intento anterior quedó a medias: se retoma con sus mismos _id
+        claimed = await collection.find_one_and_update(
+            {"_id": idempotency_key, "status": "processing", "lease_until": existing["lease_until"]},
+            {"$set": {"lease_until": lease_until}},
+            return_document=ReturnDocument.AFTER
+        )
+        if claimed is None:
+            raise IngestionInProgressError(f"Lote {idempotency_key} en proceso")
+        return None, claimed["tweet_ids"], claimed.get("inserted_at")
+    
+    @staticmethod
+    async def _apply_counts(changes: Dict[str, List[Tuple]], batch_id: str) -> Dict:
+        """Suma los tweets insertados a los agregados reintentando los símbolos en conflicto"""
+        totals = {"applied": 0, "skipped": 0, "updated_symbols": [], "unknown_symbols": []}
+        pending = changes
+        for _ in range(TweetIngestionService.MAX_CONFLICT_RETRIES):
+            result = await SentimentService.apply_sentiment_changes(pending, batch_id=batch_id)
+            totals["applied"] += result["applied"]
+            totals["skipped"] += result["skipped"]
+            totals["updated_symbols"] += result["updated_symbols"]
+            totals["unknown_symbols"] += result["unknown_symbols"]
+            if not result["conflicts"]:
+                return totals
+            pending = {symbol: changes[symbol] for symbol in result["conflicts"]}
+        raise RuntimeError(f"Conflictos persistentes al aplicar los conteos: {sorted(pending)}")
+    
+    @staticmethod
+    @profiled("ingest_tweets")
+    async def ingest_tweets(tweets: List, idempotency_key: Optional[str] = None) -> Dict:
+        """
+        Inserta un lote de tweets y actualiza los agregados en la misma llamada.
+        
+        - Cada tweet se valida con _validate_tweet; los inválidos se informan en
+          'rejected'/'errors' y el resto se inserta con un insert_many no ordenado.
+        - Los conteos se suman por company con el sentimiento normalizado por
+          _normalize_sentiment. Los tweets de símbolos sin documento en symbols_sentiment
+          se insertan igual y se cuentan en el próximo recálculo.
+        - Con 'idempotency_key', un lote reintentado devuelve el resultado guardado
+          ('replayed': true) sin volver a insertar ni a contar.
+        - Cada tweet guarda su lote en 'ingest_batch' (la clave de idempotencia o un id
+          nuevo) y cada documento de symbols_sentiment los lotes que ya sumó: un lote
+          retomado no se cuenta dos veces y los lotes concurrentes no se descartan entre
+          sí, en cualquier orden de _id. El change feed y el modo incremental no cuentan
+          los tweets con 'ingest_batch'.
+        - A lo sumo INGEST_MAX_CONCURRENT_BATCHES lotes en proceso por worker: si no se
+          libera un lugar en INGEST_QUEUE_TIMEOUT_SECONDS se lanza IngestionOverloadedError.
+        """
+        if len(tweets) > settings.INGEST_MAX_BATCH_SIZE:
+            raise ValueError(f"Se admiten como máximo {settings.INGEST_MAX_BATCH_SIZE} tweets por lote")
+        
+        docs = []
+        errors = []
+        for index, item in enumerate(tweets):
+            doc, error = TweetIngestionService._validate_tweet(item)
+            if error is None:
+                docs.append(doc)
+            else:
+                errors.append({"index": index, "error": error})
+        
+        await TweetIngestionService._acquire_slot()
+        claimed = False
+        try:
+            tweet_ids = [ObjectId() for _ in docs]
+            inserted_at = None
+            if idempotency_key:
+                stored, tweet_ids, inserted_at = await TweetIngestionService._claim(
+                    idempotency_key, TweetIngestionService._digest(tweets), tweet_ids
+                )
+                if stored is not None:
+                    INGEST_BATCHES.inc("replayed")
+                    return {**stored, "replayed": True}
+                claimed = True
             
-            # Buscar tweets del símbolo
-            tweets = await tweets_collection.find({"company": symbol_name}).to_list(length=None)
+            batch_id = idempotency_key or str(ObjectId())
+            inserted = 0
+            duplicates = 0
+            for doc, tweet_id in zip(docs, tweet_ids):
+                doc["_id"] = tweet_id
+                doc["ingest_batch"] = batch_id
+            if docs:
+                try:
+                    insert_result = await Database.get_db()["tweets"].insert_many(docs, ordered=False)
+                    inserted = len(insert_result.inserted_ids)
+                except BulkWriteError as e:
+                    # Al retomar un lote, los tweets que ya se insertaron dan clave duplicada
+                    other = [error for error in e.details["writeErrors"] if error["code"] != 11000]
+                    if other:
+                        raise
+                    inserted = e.details["nInserted"]
+                    duplicates = len(e.details["writeErrors"])
             
-            symbol_data = {
-                "symbol": symbol_name,
-                "total_tweets": len(tweets),
-                "tweets_with_sentiment": 0,
-                "tweets_without_sentiment": 0,
-                "sentiments": {}
-            }
+            # Los tweets ya están escritos: una reconstrucción que empiece después los incluye.
+            # Un lote retomado conserva la fecha del intento que los insertó
+            if inserted_at is None:
+                inserted_at = datetime.utcnow()
+                if idempotency_key:
+                    await Database.get_db()[TweetIngestionService.COLLECTION].update_one(
+                        {"_id": idempotency_key}, {"$set": {"inserted_at": inserted_at}}
+                    )
             
-            # Analizar tweets
-            for tweet in tweets:
-                sentiment = tweet.get("sentiment", "")
-                sentiment_prob = tweet.get("sentiment_prob", None)
-                
-                # Normalizar sentimiento
-                normalized_sentiment = SentimentService._normalize_sentiment(sentiment, sentiment_prob)
-                
-                if sentiment or sentiment_prob:
-                    symbol_data["tweets_with_sentiment"] += 1
-                    if normalized_sentiment in symbol_data["sentiments"]:
-                        symbol_data["sentiments"][normalized_sentiment] += 1
-                    else:
-                        symbol_data["sentiments"][normalized_sentiment] = 1
-                else:
-                    symbol_data["tweets_without_sentiment"] += 1
+            changes: Dict[str, List[Tuple]] = {}
+            for doc in docs:
+                raw_sentiment, sentiment_prob = doc.get("sentiment", ""), doc.get("sentiment_prob")
+                sentiment = SentimentService._normalize_sentiment(raw_sentiment, sentiment_prob)
+                unlabeled = 0 if SentimentService._has_sentiment(raw_sentiment, sentiment_prob) else 1
+                changes.setdefault(doc["company"], []).append(
+                    (doc["_id"], None, sentiment, doc["created_at"], unlabeled, None, inserted_at)
+                )
+            counts = await TweetIngestionService._apply_counts(changes, batch_id)
             
-            summary.append(symbol_data)
+            result = {
+                "received": len(tweets),
+                "inserted": inserted,
+                "duplicates": duplicates,
+                "rejected": len(errors),
+                "errors": errors[:TweetIngestionService.MAX_REPORTED_ERRORS],
+                "counted": counts["applied"],
+                "updated_symbols": counts["updated_symbols"],
+                "unknown_symbols": counts["unknown_symbols"],
+                "replayed": False
+            }
+            if idempotency_key:
+                await Database.get_db()[TweetIngestionService.COLLECTION].update_one(
+                    {"_id": idempotency_key},
+                    {"$set": {"status": "completed", "result": result}, "$unset": {"tweet_ids": ""}}
+                )
+        except Exception:
+            INGEST_BATCHES.inc("failed")
+            if claimed:
+                # Liberar el lease para que el reintento retome el lote sin esperar
+                await Database.get_db()[TweetIngestionService.COLLECTION].update_one(
+                    {"_id": idempotency_key, "status": "processing"},
+                    {"$set": {"lease_until": datetime.utcnow()}}
+                )
+            raise
+        finally:
+            TweetIngestionService._slots.release()
         
+        INGEST_BATCHES.inc("completed")
+        INGESTED_TWEETS.inc("inserted", amount=inserted)
+        if errors:
+            INGESTED_TWEETS.inc("rejected", amount=len(errors))
+        if duplicates:
+            INGESTED_TWEETS.inc("duplicate", amount=duplicates)
+        return result
+
+class SentimentTimeseriesService:
+    """
+    Serie temporal de sentimientos por símbolo en buckets precalculados.
+    
+    Cada documento de 'symbols_sentiment_buckets' guarda el vector de conteos de un
+    símbolo en un intervalo: buckets horarios ('1h') para los tweets recientes y
+    diarios ('1d') para los anteriores a BUCKETS_HOURLY_RETENTION_DAYS. Las consultas
+    por ventana solo leen buckets, nunca tweets.
+    """
+    
+    COLLECTION = "symbols_sentiment_buckets"
+    HOURLY = "1h"
+    DAILY = "1d"
+    
+    # Límites de GET /symbols-sentiment/{symbol}/timeseries
+    MAX_WINDOW = timedelta(days=366)
+    MAX_POINTS = 1000
+    
+    @staticmethod
+    def _hourly_cutoff(now: Optional[datetime] = None) -> datetime:
+        """Inicio (UTC, alineado al día) de la zona con buckets horarios"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=settings.BUCKETS_HOURLY_RETENTION_DAYS)
+        return cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def _bucket_key(created_at: Any, cutoff: datetime) -> Optional[Tuple[str, datetime]]:
+        """(granularidad, inicio del bucket) de un tweet; None si no tiene fecha válida"""
+        if not isinstance(created_at, datetime):
+            return None
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if created_at < cutoff:
+            return SentimentTimeseriesService.DAILY, created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        return SentimentTimeseriesService.HOURLY, created_at.replace(minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def _bucket_pipeline(match: Dict, cutoff: datetime) -> List[Dict]:
+        """Pipeline que agrupa los tweets de 'match' en filas de bucket"""
+        is_daily = {"$lt": ["$created_at", cutoff]}
+        return [
+            {"$match": {"$and": [match, {"created_at": {"$type": "date"}}]}},
+            {"$project": {
+                "company": 1,
+                "sentiment": SentimentService._normalize_sentiment_expression(),
+                "granularity": {"$cond": [is_daily, SentimentTimeseriesService.DAILY, SentimentTimeseriesService.HOURLY]},
+                "bucket_start": {"$dateTrunc": {
+                    "date": "$created_at",
+                    "unit": {"$cond": [is_daily, "day", "hour"]}
+                }}
+            }},
+            {"$group": {
+                "_id": {
+                    "symbol": "$company",
+                    "granularity": "$granularity",
+                    "bucket_start": "$bucket_start",
+                    "sentiment": "$sentiment"
+                },
+                "count": {"$sum": 1}
+            }},
+            {"$group": {
+                "_id": {
+                    "symbol": "$_id.symbol",
+                    "granularity": "$_id.granularity",
+                    "bucket_start": "$_id.bucket_start"
+                },
+                "counts": {"$push": {"k": "$_id.sentiment", "v": "$count"}},
+                "total": {"$sum": "$count"}
+            }},
+            {"$project": {
+                "_id": 0,
+                "symbol": "$_id.symbol",
+                "granularity": "$_id.granularity",
+                "bucket_start": "$_id.bucket_start",
+                "sentiment_counts": {"$arrayToObject": "$counts"},
+                "total_tweets": "$total"
+            }}
+        ]
+    
+    @staticmethod
+    async def aggregate_bucket_rows(match: Dict) -> List[Dict]:
+        """Filas de bucket ({symbol, granularity, bucket_start, sentiment_counts, total_tweets}) de los tweets de 'match'"""
+        db = Database.get_db()
+        pipeline = SentimentTimeseriesService._bucket_pipeline(match, SentimentTimeseriesService._hourly_cutoff())
+        return await db["tweets"].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    
+    @staticmethod
+    async def add_bucket_rows(rows: List[Dict], session=None) -> int:
+        """
+        Suma filas de bucket (los conteos pueden ser negativos) con $inc.
+        Solo se crean buckets nuevos para filas sin restas.
+        """
+        operations = []
+        for row in rows:
+            increments = {f"sentiment_counts.{sent}": count for sent, count in row["sentiment_counts"].items() if count}
+            if row["total_tweets"]:
+                increments["total_tweets"] = row["total_tweets"]
+            if not increments:
+                continue
+            operations.append(UpdateOne(
+                {"symbol": row["symbol"], "granularity": row["granularity"], "bucket_start": row["bucket_start"]},
+                {"$inc": increments},
+                upsert=all(count >= 0 for count in increments.values())
+            ))
+        if operations:
+            db = Database.get_db()
+            await db[SentimentTimeseriesService.COLLECTION].bulk_write(operations, ordered=False, session=session)
+        return len(operations)
+    
+    @staticmethod
+    @profiled("rebuild_buckets")
+    async def rebuild_buckets(symbol_names: List[str]) -> None:
+        """
+        Recalcula en MongoDB los buckets de los símbolos indicados ($merge sobre la
+        colección de buckets) y borra los que ya no tienen tweets.
+        """
+        db = Database.get_db()
+        computed_at = datetime.utcnow()
+        pipeline = SentimentTimeseriesService._bucket_pipeline(
+            {"company": {"$in": symbol_names}}, SentimentTimeseriesService._hourly_cutoff(computed_at)
+        )
+        pipeline += [
+            {"$set": {"computed_at": computed_at}},
+            {"$merge": {
+                "into": SentimentTimeseriesService.COLLECTION,
+                "on": ["symbol", "granularity", "bucket_start"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        await db["tweets"].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+        await db[SentimentTimeseriesService.COLLECTION].delete_many({
+            "symbol": {"$in": symbol_names},
+            "computed_at": {"$lt": computed_at}
+        })
+    
+    @staticmethod
+    def _daily_key(bucket: Dict) -> Dict:
+        """Clave del bucket diario que consolida un bucket horario"""
         return {
-            "total_symbols": len(summary),
-            "symbols": summary
+            "symbol": bucket["symbol"],
+            "granularity": SentimentTimeseriesService.DAILY,
+            "bucket_start": bucket["bucket_start"].replace(hour=0, minute=0, second=0, microsecond=0)
         }
+    
+    @staticmethod
+    def _rollup_operation(bucket: Dict) -> UpdateOne:
+        """
+        Suma un bucket horario a su bucket diario y avanza 'rolled_up_through' hasta su
+        inicio; el filtro descarta los diarios que ya sumaron esa hora (o una posterior),
+        así sumarlo de nuevo no hace nada. Las horas de un día deben sumarse en orden.
+        """
+        increments = {f"sentiment_counts.{sent}": count for sent, count in bucket.get("sentiment_counts", {}).items()}
+        increments["total_tweets"] = bucket.get("total_tweets", 0)
+        return UpdateOne(
+            {**SentimentTimeseriesService._daily_key(bucket),
+             "rolled_up_through": {"$not": {"$gte": bucket["bucket_start"]}}},
+            {"$inc": increments,
+             "$set": {"rolled_up_through": bucket["bucket_start"]},
+             # Campo de la versión anterior, que guardaba los _id de cada horario sumado
+             "$unset": {"rolled_up_from": ""}}
+        )
+    
+    @staticmethod
+    async def rollup_buckets(now: Optional[datetime] = None) -> Dict:
+        """
+        Consolida en buckets diarios los buckets horarios anteriores al corte de retención,
+        por tandas de CURSOR_BATCH_SIZE en orden de 'bucket_start': crea los diarios que
+        falten, suma la tanda en orden (un bulk_write ordenado) y después borra sus
+        horarios (un delete_many). Cada diario guarda la última hora que sumó
+        ('rolled_up_through'), así que si el proceso se corta entre los pasos, o dos
+        procesos consolidan a la vez, la tanda se vuelve a sumar sin contar nada dos veces.
+        """
+        db = Database.get_db()
+        collection = db[SentimentTimeseriesService.COLLECTION]
+        cutoff = SentimentTimeseriesService._hourly_cutoff(now)
+        query = {"granularity": SentimentTimeseriesService.HOURLY, "bucket_start": {"$lt": cutoff}}
+        projection = {"symbol": 1, "bucket_start": 1, "sentiment_counts": 1, "total_tweets": 1}
+        
+        rolled_up = 0
+        while True:
+            buckets = await collection.find(query, projection).sort("bucket_start", 1).limit(
+                settings.CURSOR_BATCH_SIZE
+            ).to_list(length=None)
+            if not buckets:
+                break
+            days = {}
+            for bucket in buckets:
+                key = SentimentTimeseriesService._daily_key(bucket)
+                days[(key["symbol"], key["bucket_start"])] = key
+            try:
+                await collection.bulk_write([
+                    UpdateOne(key, {"$setOnInsert": {"sentiment_counts": {}, "total_tweets": 0}}, upsert=True)
+                    for key in days.values()
+                ], ordered=False)
+            except BulkWriteError as e:
+                # Otro proceso creó el diario a la vez (clave duplicada en el upsert): ya existe
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+            await collection.bulk_write(
+                [SentimentTimeseriesService._rollup_operation(bucket) for bucket in buckets], ordered=True
+            )
+            result = await collection.delete_many({"_id": {"$in": [bucket["_id"] for bucket in buckets]}})
+            rolled_up += result.deleted_count
+        
+        return {"hourly_buckets_rolled_up": rolled_up, "cutoff": cutoff}
+    
+    @staticmethod
+    def parse_duration(value: str) -> timedelta:
+        """Convierte '24h' o '7d' en timedelta (resolución mínima: una hora)"""
+        match = re.fullmatch(r"(\d+)([hd])", value.strip())
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"Duración inválida: {value} (usar por ejemplo '24h' o '7d')")
+        amount = int(match.group(1))
+        return timedelta(hours=amount) if match.group(2) == "h" else timedelta(days=amount)
+    
+    @staticmethod
+    def _window_stats(sentiment_counts: Dict[str, int], total_tweets: int) -> Dict:
+        """Conteos, porcentajes, sentimiento general y confianza de un intervalo"""
+        sentiment_counts = {sent: count for sent, count in sentiment_counts.items() if count > 0}
+        if total_tweets <= 0:
+            return {
+                "sentiment_counts": {},
+                "sentiment_percentages": {},
+                "total_tweets": 0,
+                "overall_sentiment": "neutral",
+                "confidence_score": 0.0
+            }
+        return {
+            "sentiment_counts": sentiment_counts,
+            "sentiment_percentages": {
+                sent: round((count / total_tweets) * 100, 2) for sent, count in sentiment_counts.items()
+            },
+            "total_tweets": total_tweets,
+            "overall_sentiment": SentimentService._calculate_overall_sentiment(sentiment_counts),
+            "confidence_score": SentimentService._calculate_confidence_score(sentiment_counts, total_tweets)
+        }
+    
+    @staticmethod
+    async def get_timeseries(symbol: str, window: str = "24h", step: str = "1h") -> Optional[Dict]:
+        """
+        Serie de sentimientos de un símbolo en la ventana que termina en la hora actual,
+        en pasos de 'step'. Cada punto y el resumen de la ventana se calculan solo con
+        los buckets del intervalo. Un bucket diario se cuenta en el paso que contiene su
+        inicio. Devuelve None si el símbolo no existe.
+        """
+        window_delta = SentimentTimeseriesService.parse_duration(window)
+        step_delta = SentimentTimeseriesService.parse_duration(step)
+        if window_delta > SentimentTimeseriesService.MAX_WINDOW:
+            raise ValueError("La ventana máxima es de 366 días")
+        if step_delta > window_delta or window_delta % step_delta:
+            raise ValueError("La ventana debe ser un múltiplo del paso")
+        points_count = window_delta // step_delta
+        if points_count > SentimentTimeseriesService.MAX_POINTS:
+            raise ValueError(f"La serie no puede tener más de {SentimentTimeseriesService.MAX_POINTS} puntos")
+        
+        db = Database.get_db()
+        if await db["symbols_sentiment"].find_one({"symbol": symbol}, {"_id": 1}) is None:
+            return None
+        
+        end = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        start = end - window_delta
+        
+        points = [{"counts": {}, "total": 0} for _ in range(points_count)]
+        window_counts = {}
+        window_total = 0
+        async for bucket in db[SentimentTimeseriesService.COLLECTION].find(
+            {"symbol": symbol, "bucket_start": {"$gte": start, "$lt": end}},
+            {"_id": 0, "bucket_start": 1, "sentiment_counts": 1, "total_tweets": 1}
+        ):
+            point = points[(bucket["bucket_start"] - start) // step_delta]
+            for sent, count in bucket.get("sentiment_counts", {}).items():
+                point["counts"][sent] = point["counts"].get(sent, 0) + count
+                window_counts[sent] = window_counts.get(sent, 0) + count
+            point["total"] += bucket.get("total_tweets", 0)
+            window_total += bucket.get("total_tweets", 0)
+        
+        return {
+            "symbol": symbol,
+            "window": window,
+            "step": step,
+            "start": start,
+            "end": end,
+            "summary": SentimentTimeseriesService._window_stats(window_counts, window_total),
+            "points": [
+                {
+                    "start": start + i * step_delta,
+                    "end": start + (i + 1) * step_delta,
+                    **SentimentTimeseriesService._window_stats(point["counts"], point["total"])
+                }
+                for i, point in enumerate(points)
+            ]
+        }
+
+class SectorRollupService:
+    """
+    Agregados de sentimiento por sector y de todo el mercado en la colección 'sentiment_rollups'.
+    
+    Cada documento ('scope': 'sector' o 'market') suma los conteos de sus símbolos; el
+    sentimiento general y la confianza se calculan sobre los conteos sumados, de modo
+    que cada símbolo pesa según su cantidad de tweets. Se mantienen con los deltas de
+    los agregados de símbolo (modo incremental y change feed) y se reconstruyen desde
+    symbols_sentiment tras cada reconstrucción completa: nunca se leen tweets.
+    """
+    
+    COLLECTION = "sentiment_rollups"
+    SECTOR = "sector"
+    MARKET = "market"
+    
+    @staticmethod
+    def _effective_counts(doc: Optional[Dict]) -> Dict[str, int]:
+        """Conteos reales de un documento de symbols_sentiment ({"neutral": 1} sin tweets es un marcador)"""
+        if not doc or doc.get("total_tweets", 0) <= 0:
+            return {}
+        return dict(doc.get("sentiment_counts", {}))
+    
+    @staticmethod
+    def add_symbol_delta(deltas: Dict, old_doc: Optional[Dict], new_doc: Optional[Dict]):
+        """
+        Acumula en 'deltas' (sector -> {counts, total, symbols}) el cambio de un símbolo
+        entre dos versiones de su documento (None: no existía / dejó de existir).
+        """
+        for doc, sign in ((old_doc, -1), (new_doc, 1)):
+            if doc is None:
+                continue
+            delta = deltas.setdefault(doc.get("sector"), {"counts": {}, "total": 0, "symbols": 0})
+            for sent, count in SectorRollupService._effective_counts(doc).items():
+                delta["counts"][sent] = delta["counts"].get(sent, 0) + sign * count
+            delta["total"] += sign * max(doc.get("total_tweets", 0), 0)
+            delta["symbols"] += sign
+    
+    @staticmethod
+    def _rollup_doc(scope: str, sector: Optional[str], sentiment_counts: Dict[str, int],
+                    total_tweets: int, symbols: int) -> Dict:
+        doc = SentimentTimeseriesService._window_stats(sentiment_counts, total_tweets)
+        doc.update({"scope": scope, "sector": sector, "symbols": symbols, "last_updated": datetime.utcnow()})
+        return doc
+    
+    @staticmethod
+    async def apply_deltas(deltas: Dict, session=None) -> int:
+        """
+        Suma los deltas por sector (y su total al mercado) con $inc y recalcula los campos
+        derivados. El $set de los derivados está condicionado a la revisión que dejó el
+        propio $inc: si otro escritor se adelantó, él escribe los derivados más nuevos.
+        """
+        collection = Database.get_db()[SectorRollupService.COLLECTION]
+        market = {"counts": {}, "total": 0, "symbols": 0}
+        targets = []
+        for sector, delta in deltas.items():
+            for sent, count in delta["counts"].items():
+                market["counts"][sent] = market["counts"].get(sent, 0) + count
+            market["total"] += delta["total"]
+            market["symbols"] += delta["symbols"]
+            targets.append(({"scope": SectorRollupService.SECTOR, "sector": sector}, delta))
+        targets.append(({"scope": SectorRollupService.MARKET, "sector": None}, market))
+        
+        updated = 0
+        for query, delta in targets:
+            increments = {f"sentiment_counts.{sent}": count for sent, count in delta["counts"].items() if count}
+            if delta["total"]:
+                increments["total_tweets"] = delta["total"]
+            if delta["symbols"]:
+                increments["symbols"] = delta["symbols"]
+            if not increments:
+                continue
+            increments["revision"] = 1
+            rollup = await collection.find_one_and_update(
+                query, {"$inc": increments}, upsert=True, return_document=ReturnDocument.AFTER, session=session
+            )
+            doc = SectorRollupService._rollup_doc(
+                query["scope"], query["sector"], rollup.get("sentiment_counts", {}),
+                rollup.get("total_tweets", 0), rollup.get("symbols", 0)
+            )
+            derived = {k: v for k, v in doc.items() if k not in ("sentiment_counts", "total_tweets", "symbols")}
+            await collection.update_one(
+                {"_id": rollup["_id"], "revision": rollup["revision"]}, {"$set": derived}, session=session
+            )
+            updated += 1
+        return updated
+    
+    @staticmethod
+    @profiled("sector_rollups.rebuild")
+    async def rebuild() -> Dict:
+        """Reconstruye todos los agregados sumando los documentos de symbols_sentiment"""
+        db = Database.get_db()
+        collection = db[SectorRollupService.COLLECTION]
+        deltas: Dict = {}
+        async for doc in db["symbols_sentiment"].find(
+            {}, {"sector": 1, "sentiment_counts": 1, "total_tweets": 1}
+        ).batch_size(settings.CURSOR_BATCH_SIZE):
+            SectorRollupService.add_symbol_delta(deltas, None, doc)
+        
+        market = {"counts": {}, "total": 0, "symbols": 0}
+        operations = []
+        for sector, delta in deltas.items():
+            for sent, count in delta["counts"].items():
+                market["counts"][sent] = market["counts"].get(sent, 0) + count
+            market["total"] += delta["total"]
+            market["symbols"] += delta["symbols"]
+            doc = SectorRollupService._rollup_doc(
+                SectorRollupService.SECTOR, sector, delta["counts"], delta["total"], delta["symbols"]
+            )
+            operations.append(UpdateOne(
+                {"scope": SectorRollupService.SECTOR, "sector": sector},
+                {"$set": doc, "$inc": {"revision": 1}},
+                upsert=True
+            ))
+        doc = SectorRollupService._rollup_doc(
+            SectorRollupService.MARKET, None, market["counts"], market["total"], market["symbols"]
+        )
+        operations.append(UpdateOne(
+            {"scope": SectorRollupService.MARKET, "sector": None},
+            {"$set": doc, "$inc": {"revision": 1}},
+            upsert=True
+        ))
+        await collection.bulk_write(operations, ordered=False)
+        # Sectores que ya no tienen símbolos
+        await collection.delete_many({"scope": SectorRollupService.SECTOR, "sector": {"$nin": list(deltas)}})
+        return {"sectors": len(deltas), "symbols": market["symbols"], "total_tweets": market["total"]}
+    
+    @staticmethod
+    def _serialize(doc: Dict) -> Dict:
+        doc.pop("_id", None)
+        doc.pop("scope", None)
+        doc.pop("revision", None)
+        doc["sentiment_counts"] = {sent: count for sent, count in doc.get("sentiment_counts", {}).items() if count > 0}
+        return doc
+    
+    @staticmethod
+    async def get_sectors_sentiment() -> Dict:
+        """Agregados de todos los sectores, ordenados por sector"""
+        collection = Database.get_db()[SectorRollupService.COLLECTION]
+        sectors = [
+            SectorRollupService._serialize(doc)
+            async for doc in collection.find({"scope": SectorRollupService.SECTOR}).sort("sector", 1)
+        ]
+        return {"count": len(sectors), "sectors": sectors}
+    
+    @staticmethod
+    async def get_market_sentiment() -> Optional[Dict]:
+        """Agregado de todo el mercado; None si todavía no se calculó"""
+        collection = Database.get_db()[SectorRollupService.COLLECTION]
+        doc = await collection.find_one({"scope": SectorRollupService.MARKET})
+        if doc is None:
+            return None
+        doc = SectorRollupService._serialize(doc)
+        doc.pop("sector", None)
+        return doc
+
+# Instantánea de la respuesta de GET /symbols-sentiment
+symbols_sentiment_snapshot = ResponseSnapshotCache(SentimentService.get_symbols_sentiment)
@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from config import settings
+
+def render_json(payload: Any) -> bytes:
+    """Serializa igual que JSONResponse de FastAPI"""
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+class ResponseSnapshot:
+    """Respuesta JSON ya serializada e inmutable: cuerpo, copia gzip y ETag"""
+
+    __slots__ = ("body", "gzip_body", "etag", "generated_at", "_built_monotonic")
+
+    def __init__(self, payload: Dict):
+        self.body = render_json(payload)
+        self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.generated_at = datetime.utcnow()
+        self._built_monotonic = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self._built_monotonic
+
+class ResponseSnapshotCache:
+    """
+    Mantiene la instantánea vigente de una respuesta de solo lectura.
+
+    La instantánea se reemplaza de forma atómica (una sola asignación) y se invalida
+    cuando cambian los datos de origen en este proceso. Como otros workers pueden
+    modificar la colección, nunca se sirve una instantánea más vieja que 'max_age'
+    segundos: pasado ese tiempo se reconstruye con 'loader'. Las reconstrucciones
+    concurrentes se unifican en una sola.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Dict]], max_age: float = None):
+        self.loader = loader
+        self.max_age = max_age if max_age is not None else settings.SNAPSHOT_MAX_AGE_SECONDS
+        self._snapshot: Optional[ResponseSnapshot] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Descarta la instantánea vigente; la próxima lectura la reconstruye"""
+        self._generation += 1
+        self._snapshot = None
+
+    def _is_fresh(self, snapshot: Optional[ResponseSnapshot]) -> bool:
+        return snapshot is not None and snapshot.age() < self.max_age
+
+    async def refresh(self) -> ResponseSnapshot:
+        """Reconstruye la instantánea desde la base de datos y la publica"""
+        self.invalidate()
+        async with self._lock:
+            return await self._rebuild()
+
+    async def _rebuild(self) -> ResponseSnapshot:
+        generation = self._generation
+        snapshot = ResponseSnapshot(await self.loader())
+        # Si hubo una invalidación mientras se cargaba, no publicar datos viejos
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    async def get(self) -> ResponseSnapshot:
+        """Instantánea vigente; sin acceso a la base mientras no esté vencida ni invalidada"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        async with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            return await self._rebuild()
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+def snapshot_response(request: Request, snapshot: ResponseSnapshot) -> Response:
+    """Sirve los bytes de la instantánea, con 304 si el cliente ya tiene el mismo ETag"""
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
@@ -0,0 +1,24 @@
+from typing import AsyncIterator, Dict
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from snapshot import render_json
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    """El cliente pide NDJSON con 'Accept: application/x-ndjson' o con ?stream=true"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def _ndjson_lines(records: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    async for record in records:
+        yield render_json(record) + b"\n"
+
+def ndjson_response(records: AsyncIterator[Dict]) -> StreamingResponse:
+    """
+    Respuesta en streaming con un registro JSON por línea.
+    Cada registro se serializa y se envía apenas se lee del cursor, por lo que el primer
+    byte llega enseguida y la memoria no crece con la cantidad de registros.
+    """
+    return StreamingResponse(_ndjson_lines(records), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import random
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+# Generador reproducible de datos sintéticos del MERVAL para benchmarks y desarrollo.
+# Con la misma semilla y los mismos parámetros produce exactamente los mismos documentos.
+
+TICKERS = [
+    "GGAL", "YPFD", "PAMP", "BMA", "TXAR", "ALUA", "CEPU", "TGSU2", "LOMA", "CRES", "BBAR",
+    "SUPV", "EDN", "TECO2", "COME", "MIRG", "VALO", "TRAN", "BYMA", "HARG", "CVH", "TGNO4"
+]
+
+SECTORS = [
+    "Bancos", "Energía", "Materiales", "Utilities", "Telecomunicaciones", "Consumo",
+    "Agro", "Holdings", "Construcción", "Servicios Financieros"
+]
+
+# Etiquetas crudas tal como llegan de los distintos scrapers y modelos
+RAW_LABELS = {
+    "positivo": ["positivo", "pos", "POS", "positive", "Positivo "],
+    "negativo": ["negativo", "neg", "NEG", "negative"],
+    "neutral": ["neutral", "neu", "NEU", "neutro"],
+}
+
+PHRASES = {
+    "positivo": [
+        "{t} sube fuerte hoy 🚀", "excelente balance de {t}, supera expectativas", "{t} en máximos, muy alcista",
+        "compré más {t}, rebote confirmado 📈", "{t} paga dividendos, buena oportunidad"
+    ],
+    "negativo": [
+        "{t} se desploma en la apertura 📉", "pésimo trimestre de {t}, pérdidas otra vez",
+        "{t} cae con el riesgo país", "vendo todo {t}, esto es pánico", "{t} en mínimos, bajista"
+    ],
+    "neutral": [
+        "¿qué opinan de {t}?", "{t} cierra sin cambios", "hoy presenta balance {t}",
+        "volumen normal en {t}", "{t} mañana abre a las 11"
+    ],
+}
+
+def _object_id(created_at: datetime, rng: random.Random) -> ObjectId:
+    """ObjectId determinista cuyo timestamp coincide con created_at"""
+    seconds = int((created_at - datetime(1970, 1, 1)).total_seconds())
+    return ObjectId(struct.pack(">I", seconds) + rng.getrandbits(64).to_bytes(8, "big"))
+
+def _tweet_counts(symbols: int, tweets_per_symbol: int, skew: float) -> List[int]:
+    """Reparte symbols * tweets_per_symbol con una distribución tipo Zipf (skew=0: uniforme)"""
+    weights = [1 / (rank ** skew) for rank in range(1, symbols + 1)]
+    total_weight = sum(weights)
+    total = symbols * tweets_per_symbol
+    return [max(1, round(total * weight / total_weight)) for weight in weights]
+
+def generate_dataset(seed: int = 42,
+                     symbols: int = 30,
+                     sectors: int = 6,
+                     tweets_per_symbol: int = 500,
+                     skew: float = 1.0,
+                     labeled_ratio: float = 0.6,
+                     prob_only_ratio: float = 0.25,
+                     embedded_ratio: float = 0.2,
+                     duplicate_ratio: float = 0.3,
+                     days: int = 30,
+                     now: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+    """
+    Genera {'symbols': [...], 'tweets': [...]}.
+
+    - Los símbolos usan tickers reales del MERVAL y luego nombres sintéticos; los sectores
+      se asignan al azar entre los primeros 'sectors'.
+    - La cantidad de tweets por símbolo sigue una distribución sesgada ('skew').
+    - Cada tweet es etiquetado ('labeled_ratio', con etiquetas crudas variadas), solo con
+      'sentiment_prob' ('prob_only_ratio') o sin sentimiento (el resto).
+    - 'embedded_ratio' de los tweets de cada símbolo va al arreglo 'tweets' del símbolo
+      (modelo embebido); el resto a la colección tweets.
+    - 'duplicate_ratio' de los textos son copias (retweets) de textos anteriores.
+    """
+    rng = random.Random(seed)
+    now = now or datetime(2025, 1, 1)
+    sector_names = SECTORS[:max(1, min(sectors, len(SECTORS)))]
+    names = TICKERS[:symbols] + [f"SYM{i:03d}" for i in range(len(TICKERS), symbols)]
+
+    symbol_docs = []
+    tweet_docs = []
+    previous_texts = []
+    for name, count in zip(names, _tweet_counts(len(names), tweets_per_symbol, skew)):
+        # Cada símbolo tiene su sesgo de sentimiento
+        bias = rng.choices(["positivo", "negativo", "neutral"], weights=[0.4, 0.3, 0.3])[0]
+        embedded = []
+        for _ in range(count):
+            weights = {"positivo": 1.0, "negativo": 1.0, "neutral": 1.0}
+            weights[bias] = 2.5
+            sentiment = rng.choices(list(weights), weights=list(weights.values()))[0]
+
+            if previous_texts and rng.random() < duplicate_ratio:
+                text = rng.choice(previous_texts)
+                if rng.random() < 0.5:
+                    text = f"RT @merval_bot: {text}"
+            else:
+                text = rng.choice(PHRASES[sentiment]).format(t=name)
+                previous_texts.append(text)
+
+            created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+            tweet = {"_id": _object_id(created_at, rng), "company": name, "text": text, "created_at": created_at}
+            roll = rng.random()
+            if roll < labeled_ratio:
+                tweet["sentiment"] = rng.choice(RAW_LABELS[sentiment])
+            elif roll < labeled_ratio + prob_only_ratio:
+                key = {"positivo": "pos", "negativo": "neg", "neutral": "neu"}[sentiment]
+                probabilities = {"pos": rng.random() * 0.4, "neg": rng.random() * 0.4, "neu": rng.random() * 0.4}
+                probabilities[key] += 0.5
+                tweet["sentiment"] = ""
+                tweet["sentiment_prob"] = {k: round(v, 4) for k, v in probabilities.items()}
+            elif rng.random() < 0.5:
+                tweet["sentiment"] = None
+
+            if rng.random() < embedded_ratio:
+                embedded.append({k: v for k, v in tweet.items() if k not in ("_id", "company")})
+            else:
+                tweet_docs.append(tweet)
+
+        symbol_docs.append({"symbol": name, "sector": rng.choice(sector_names), "tweets": embedded})
+
+    tweet_docs.sort(key=lambda tweet: tweet["_id"])
+    return {"symbols": symbol_docs, "tweets": tweet_docs}
+
+def generate_ingest_batch(rng: random.Random, symbols: List[str], size: int) -> List[Dict]:
+    """Lote de tweets nuevos con la forma del cuerpo de POST /tweets/batch (fechas ISO 8601)"""
+    now = datetime.utcnow()
+    batch = []
+    for _ in range(size):
+        name = rng.choice(symbols)
+        sentiment = rng.choice(list(PHRASES))
+        batch.append({
+            "company": name,
+            "text": rng.choice(PHRASES[sentiment]).format(t=name),
+            "sentiment": rng.choice(RAW_LABELS[sentiment]),
+            "created_at": (now - timedelta(seconds=rng.randint(0, 3600))).isoformat()
+        })
+    return batch
+
+# Colecciones que escriben la API y los recálculos (se vacían al cargar un dataset)
+DERIVED_COLLECTIONS = (
+    "symbols_sentiment", "symbols_sentiment_buckets", "jobs", "recompute_partitions",
+    "classification_cache", "change_feed_state", "sentiment_rollups", "recompute_state", "ingest_batches"
+)
+
+async def load_dataset(db, dataset: Dict[str, List[Dict]], chunk_size: int = 5000):
+    """Reemplaza symbols y tweets por el dataset y vacía las colecciones derivadas"""
+    for name in ("symbols", "tweets") + DERIVED_COLLECTIONS:
+        await db[name].delete_many({})
+    for name in ("symbols", "tweets"):
+        docs = dataset[name]
+        for offset in range(0, len(docs), chunk_size):
+            await db[name].insert_many([dict(doc) for doc in docs[offset:offset + chunk_size]], ordered=False)
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Parámetros del generador, compartidos con benchmark.py"""
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--symbols", type=int, default=30)
+    parser.add_argument("--sectors", type=int, default=6)
+    parser.add_argument("--tweets-per-symbol", type=int, default=500)
+    parser.add_argument("--skew", type=float, default=1.0, help="Sesgo Zipf de tweets por símbolo (0 = uniforme)")
+    parser.add_argument("--labeled-ratio", type=float, default=0.6)
+    parser.add_argument("--prob-only-ratio", type=float, default=0.25)
+    parser.add_argument("--embedded-ratio", type=float, default=0.2)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3)
+
+def dataset_config(args: argparse.Namespace) -> Dict:
+    return {
+        "seed": args.seed,
+        "symbols": args.symbols,
+        "sectors": args.sectors,
+        "tweets_per_symbol": args.tweets_per_symbol,
+        "skew": args.skew,
+        "labeled_ratio": args.labeled_ratio,
+        "prob_only_ratio": args.prob_only_ratio,
+        "embedded_ratio": args.embedded_ratio,
+        "duplicate_ratio": args.duplicate_ratio,
+    }
+
+async def _load(args: argparse.Namespace):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    dataset = generate_dataset(**dataset_config(args))
+    client = AsyncIOMotorClient(args.uri)
+    await load_dataset(client[args.database], dataset)
+    client.close()
+    print(f"Cargados {len(dataset['symbols'])} símbolos y {len(dataset['tweets'])} tweets en '{args.database}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga un dataset sintético del MERVAL en MongoDB")
+    add_arguments(parser)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="sentiment_benchmark", help="Base destino (se vacía)")
+    args = parser.parse_args()
+    asyncio.run(_load(args))
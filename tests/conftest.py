@@ -0,0 +1,58 @@
+import os
+import uuid
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from config import settings
+from database import Database
+from services import symbols_sentiment_snapshot
+
+# Los tests corren sobre mongomock-motor (fixture 'db'). Los que necesitan operadores
+# que mongomock no implementa ($trim, $merge, change streams) usan 'mongod_db' y se
+# saltean si no hay un mongod en MONGODB_TEST_URI.
+MONGODB_TEST_URI = os.getenv("MONGODB_TEST_URI", "mongodb://localhost:27017")
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db(monkeypatch):
+    """Base en memoria con los índices de Database.INDEXES"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr(Database, "client", mongomock_motor.AsyncMongoMockClient())
+    monkeypatch.setattr(settings, "DATABASE_NAME", f"test_{uuid.uuid4().hex[:8]}")
+    await Database.ensure_indexes()
+    # Las instantáneas de respuestas son del proceso: no deben pasar de un test a otro
+    symbols_sentiment_snapshot.invalidate()
+    yield Database.get_db()
+
+@pytest.fixture
+async def client(db):
+    """Cliente HTTP de la API sobre la base del test (sin el lifespan de la aplicación)"""
+    httpx = pytest.importorskip("httpx")
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+@pytest.fixture
+async def mongod_db(monkeypatch):
+    """Base temporal en un mongod real; se borra al terminar"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"No hay un mongod en {MONGODB_TEST_URI}")
+    name = f"test_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(Database, "client", client)
+    monkeypatch.setattr(settings, "DATABASE_NAME", name)
+    await Database.ensure_indexes()
+    symbols_sentiment_snapshot.invalidate()
+    yield client[name]
+    await client.drop_database(name)
+    client.close()
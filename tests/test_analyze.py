@@ -0,0 +1,62 @@
+import pytest
+
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+SYMBOLS = [
+    {"symbol": "GGAL", "tweets": [
+        {"text": "sube", "sentiment": "positivo"},
+        {"text": "sin etiqueta"},
+        {"text": "vacío", "sentiment": ""},
+        {"text": "nulo", "sentiment": None}
+    ]},
+    {"symbol": "YPFD", "tweets": [{"text": "baja", "sentiment": "negativo"}]},
+    {"symbol": "PAMP", "tweets": []},
+    {"symbol": "BMA"}
+]
+
+async def _embedded_sentiments(db):
+    return {
+        symbol["symbol"]: [tweet.get("sentiment") for tweet in symbol.get("tweets") or []]
+        async for symbol in db["symbols"].find({})
+    }
+
+async def test_python_mode_labels_missing_sentiments(db):
+    await db["symbols"].insert_many([dict(symbol) for symbol in SYMBOLS])
+
+    result = await SentimentService.analyze_and_update_sentiments(mode="python")
+
+    assert result["tweets_updated"] == 3
+    assert result["tweets_with_sentiment"] == 2
+    assert result["symbols_update"] == {"matched_count": 1, "modified_count": 1}
+    assert (await _embedded_sentiments(db))["GGAL"] == ["positivo", "desconocido", "desconocido", "desconocido"]
+
+# 'backfill' usa arrayFilters, que mongomock no implementa
+async def test_backfill_matches_python_and_reports_real_document_counts(mongod_db):
+    await mongod_db["symbols"].insert_many([dict(symbol) for symbol in SYMBOLS])
+
+    result = await SentimentService.analyze_and_update_sentiments(mode="backfill")
+
+    assert result["total_symbols"] == 4
+    assert result["symbols_with_tweets"] == 2
+    assert result["tweets_without_sentiment"] == 3
+    assert result["tweets_with_sentiment"] == 2
+    assert result["tweets_updated"] is None
+    assert result["symbols_updated"] == 1
+    assert result["symbols_update"] == {"matched_count": 1, "modified_count": 1}
+    assert await _embedded_sentiments(mongod_db) == {
+        "GGAL": ["positivo", "desconocido", "desconocido", "desconocido"],
+        "YPFD": ["negativo"],
+        "PAMP": [],
+        "BMA": []
+    }
+
+async def test_backfill_rerun_updates_nothing(mongod_db):
+    await mongod_db["symbols"].insert_many([dict(symbol) for symbol in SYMBOLS])
+    await SentimentService.analyze_and_update_sentiments(mode="backfill")
+
+    result = await SentimentService.analyze_and_update_sentiments(mode="backfill")
+
+    assert result["symbols_updated"] == 0
+    assert result["tweets_without_sentiment"] == 0
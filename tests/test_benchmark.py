@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from benchmark import Scenario, compare, measure, percentile
+from synthetic_data import generate_dataset, generate_ingest_batch, load_dataset
+
+pytestmark = pytest.mark.anyio
+
+def test_dataset_is_reproducible():
+    config = {"seed": 3, "symbols": 25, "sectors": 4, "tweets_per_symbol": 20}
+
+    first, second = generate_dataset(**config), generate_dataset(**config)
+
+    assert first == second
+    assert generate_dataset(**dict(config, seed=4)) != first
+
+def test_dataset_shape():
+    dataset = generate_dataset(seed=1, symbols=25, sectors=2, tweets_per_symbol=20, embedded_ratio=0.2)
+    tweets = dataset["tweets"]
+    embedded = [tweet for symbol in dataset["symbols"] for tweet in symbol["tweets"]]
+
+    # Tickers reales primero y luego nombres sintéticos
+    assert [symbol["symbol"] for symbol in dataset["symbols"]][-3:] == ["SYM022", "SYM023", "SYM024"]
+    assert len({symbol["sector"] for symbol in dataset["symbols"]}) <= 2
+    # Ordenados por _id, con el timestamp del _id igual a created_at
+    assert [tweet["_id"] for tweet in tweets] == sorted(tweet["_id"] for tweet in tweets)
+    assert all(tweet["_id"].generation_time.replace(tzinfo=None) == tweet["created_at"].replace(microsecond=0)
+               for tweet in tweets)
+    assert 0.1 < len(embedded) / (len(embedded) + len(tweets)) < 0.3
+    # Con skew el primer símbolo tiene más tweets que el último
+    counts = {}
+    for tweet in tweets:
+        counts[tweet["company"]] = counts.get(tweet["company"], 0) + 1
+    assert counts["GGAL"] > counts["SYM024"]
+
+def test_ingest_batch_matches_the_endpoint_body():
+    batch = generate_ingest_batch(random.Random(0), ["GGAL", "YPFD"], 5)
+
+    assert len(batch) == 5
+    assert all(set(tweet) == {"company", "text", "sentiment", "created_at"} for tweet in batch)
+    assert all(isinstance(tweet["created_at"], str) for tweet in batch)
+
+async def test_load_replaces_the_dataset_and_clears_derived_collections(db):
+    await db["symbols_sentiment"].insert_one({"symbol": "VIEJO"})
+    dataset = generate_dataset(seed=1, symbols=5, tweets_per_symbol=10)
+
+    await load_dataset(db, dataset, chunk_size=7)
+
+    assert await db["tweets"].count_documents({}) == len(dataset["tweets"])
+    assert await db["symbols"].count_documents({}) == 5
+    assert await db["symbols_sentiment"].count_documents({}) == 0
+
+def test_percentile_is_nearest_rank():
+    values = [1.0, 2.0, 3.0, 4.0]
+
+    assert [percentile(values, pct) for pct in (50, 95, 99)] == [2.0, 4.0, 4.0]
+
+async def test_measure_resets_outside_the_timing():
+    calls = []
+
+    async def run():
+        calls.append("run")
+
+    async def reset():
+        calls.append("reset")
+
+    result = await measure(Scenario("x", run, reset=True), iterations=3, warmup=1, reset=reset, counter=None)
+
+    assert calls == ["reset", "run"] * 4
+    assert result["iterations"] == 3
+    assert result["round_trips"] is None
+
+def test_compare_flags_only_significant_regressions():
+    baseline = {"scenarios": {
+        "lento": {"p50_ms": 10.0, "p95_ms": 20.0, "round_trips": 2},
+        "ruido": {"p50_ms": 0.1, "p95_ms": 0.2, "round_trips": 2},
+        "estable": {"p50_ms": 10.0, "p95_ms": 20.0, "round_trips": 2},
+    }}
+    results = {
+        "lento": {"p50_ms": 15.0, "p95_ms": 21.0, "round_trips": 2},
+        # +100% pero por debajo del mínimo absoluto
+        "ruido": {"p50_ms": 0.2, "p95_ms": 0.4, "round_trips": 2},
+        "estable": {"p50_ms": 10.5, "p95_ms": 20.0, "round_trips": 3},
+        "nuevo": {"p50_ms": 1.0, "p95_ms": 1.0, "round_trips": 1},
+    }
+
+    regressions = compare(results, baseline, threshold=0.2, min_delta_ms=1.0)
+
+    assert regressions == [
+        "lento: p50_ms 10.0 -> 15.0 (límite 12.000)",
+        "estable: round_trips 2 -> 3",
+    ]
@@ -0,0 +1,80 @@
+import pytest
+
+from progress import JobProgress
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def tweets(db):
+    await db["symbols"].insert_many([
+        {"symbol": "GGAL", "sector": "Bancos"}, {"symbol": "YPFD", "sector": "Energía"}, {"symbol": "BMA", "sector": "Bancos"}
+    ])
+    await db["tweets"].insert_many([
+        {"company": "GGAL", "sentiment": "positivo"},
+        {"company": "GGAL", "sentiment": "negativo"},
+        {"company": "YPFD", "sentiment": "neu"},
+    ])
+    return db
+
+def test_fingerprint_ignores_key_order_and_timestamps():
+    doc = SentimentService._build_symbol_sentiment_doc("GGAL", "Bancos", {"positivo": 2, "negativo": 1}, 3)
+    reordered = SentimentService._build_symbol_sentiment_doc("GGAL", "Bancos", {"negativo": 1, "positivo": 2}, 3)
+    reordered["last_updated"] = None
+    changed = SentimentService._build_symbol_sentiment_doc("GGAL", "Bancos", {"positivo": 3, "negativo": 1}, 4)
+
+    assert doc["fingerprint"] == reordered["fingerprint"]
+    assert doc["fingerprint"] != changed["fingerprint"]
+
+async def test_rerun_without_changes_writes_nothing(tweets):
+    first = await SentimentService._create_symbols_sentiment_python(JobProgress())
+    stored = {doc["symbol"]: doc async for doc in tweets["symbols_sentiment"].find({})}
+
+    second = await SentimentService._create_symbols_sentiment_python(JobProgress())
+
+    assert (first["symbols_written"], first["writes_skipped"]) == (3, 0)
+    assert (second["symbols_written"], second["writes_skipped"]) == (0, 3)
+    # Ni 'last_updated' ni 'revision' cambian si el contenido es el mismo
+    assert {doc["symbol"]: doc async for doc in tweets["symbols_sentiment"].find({})} == stored
+
+async def test_only_changed_symbols_are_rewritten(tweets):
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    before = {doc["symbol"]: doc async for doc in tweets["symbols_sentiment"].find({})}
+    await tweets["tweets"].insert_one({"company": "YPFD", "sentiment": "negativo"})
+
+    result = await SentimentService._create_symbols_sentiment_python(JobProgress())
+
+    after = {doc["symbol"]: doc async for doc in tweets["symbols_sentiment"].find({})}
+    assert (result["symbols_written"], result["writes_skipped"]) == (1, 2)
+    assert after["YPFD"]["revision"] == before["YPFD"]["revision"] + 1
+    assert after["YPFD"]["last_updated"] > before["YPFD"]["last_updated"]
+    assert after["GGAL"] == before["GGAL"]
+
+async def test_recompute_records_run_date_apart(mongod_db):
+    await mongod_db["symbols"].insert_one({"symbol": "GGAL", "sector": "Bancos"})
+    await mongod_db["tweets"].insert_one({"company": "GGAL", "text": "GGAL sube", "sentiment": "positivo"})
+    await SentimentService.create_symbols_sentiment_collection("python")
+    stored = await mongod_db["symbols_sentiment"].find_one({"symbol": "GGAL"})
+    first = await mongod_db[SentimentService.RECOMPUTE_STATE_COLLECTION].find_one({"_id": "symbols_sentiment"})
+
+    await SentimentService.create_symbols_sentiment_collection("python")
+
+    state = await mongod_db[SentimentService.RECOMPUTE_STATE_COLLECTION].find_one({"_id": "symbols_sentiment"})
+    assert state["last_computed_at"] > first["last_computed_at"]
+    assert (state["mode"], state["symbols_written"], state["writes_skipped"]) == ("python", 0, 1)
+    assert await mongod_db["symbols_sentiment"].find_one({"symbol": "GGAL"}) == stored
+
+async def test_reads_hide_internal_fields(tweets, client):
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    await tweets[SentimentService.RECOMPUTE_STATE_COLLECTION].insert_one(
+        {"_id": "symbols_sentiment", "last_computed_at": None}
+    )
+
+    symbol = (await client.get("/symbols-sentiment/GGAL")).json()
+    page = (await client.get("/symbols-sentiment", params={"limit": 10})).json()
+    summary = (await client.get("/symbols-summary")).json()
+
+    internal = set(SentimentService.INTERNAL_FIELDS)
+    assert symbol["symbol"] == "GGAL" and not internal & set(symbol)
+    assert all(not internal & set(doc) for doc in page["symbols"])
+    assert "last_computed_at" in summary
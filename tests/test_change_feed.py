@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from change_feed import InMemoryChangeSource, SentimentChangeFeed
+from database import Database
+from progress import JobProgress
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+CREATED_AT = datetime(2025, 1, 1, 12)
+
+def _tweet(company: str, sentiment, **fields):
+    return {"_id": ObjectId(), "company": company, "text": "texto", "sentiment": sentiment,
+            "created_at": CREATED_AT, **fields}
+
+def _insert(tweet):
+    return {"operationType": "insert", "documentKey": {"_id": tweet["_id"]}, "fullDocument": tweet}
+
+def _update(before, after):
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": before["_id"]},
+        "updateDescription": {"updatedFields": {"sentiment": after.get("sentiment")}, "removedFields": []},
+        "fullDocument": after,
+        "fullDocumentBeforeChange": before
+    }
+
+def _delete(tweet):
+    return {"operationType": "delete", "documentKey": {"_id": tweet["_id"]}, "fullDocumentBeforeChange": tweet}
+
+@pytest.fixture
+async def computed(db):
+    """symbols_sentiment reconstruido con un tweet positivo de GGAL y ninguno de YPFD"""
+    await db["symbols"].insert_many([{"symbol": "GGAL", "sector": "Bancos"}, {"symbol": "YPFD", "sector": "Energía"}])
+    await db["tweets"].insert_one(_tweet("GGAL", "positivo"))
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    return db
+
+async def _consume(source: InMemoryChangeSource, events, received: int = None) -> SentimentChangeFeed:
+    """Publica los eventos y corre un consumidor hasta recibir 'received' (por defecto, los publicados)"""
+    feed = SentimentChangeFeed(source=source, flush_interval=0.02, use_transactions=False)
+    for event in events:
+        source.push(event)
+    await feed.start()
+    for _ in range(200):
+        if feed.events_received >= (len(events) if received is None else received):
+            break
+        await asyncio.sleep(0.01)
+    await feed.stop()
+    return feed
+
+async def _counts(db, symbol: str):
+    doc = await db["symbols_sentiment"].find_one({"symbol": symbol})
+    return doc["sentiment_counts"], doc["total_tweets"], doc["tweets_without_sentiment"]
+
+async def test_inserts_updates_and_deletes_adjust_counts(computed):
+    relabeled = _tweet("GGAL", None)
+    removed = _tweet("YPFD", "negativo")
+    events = [
+        _insert(_tweet("GGAL", "neg")),
+        _insert(relabeled),
+        _update(relabeled, dict(relabeled, sentiment="positivo")),
+        _insert(removed),
+        _delete(removed)
+    ]
+
+    feed = await _consume(InMemoryChangeSource(max_await_time_ms=10), events)
+
+    assert feed.events_applied == 5
+    assert feed.last_error is None
+    assert await _counts(computed, "GGAL") == ({"positivo": 2, "negativo": 1}, 3, 0)
+    assert (await _counts(computed, "YPFD"))[1:] == (0, 0)
+
+async def test_replay_after_lost_resume_token_is_not_counted_twice(computed):
+    source = InMemoryChangeSource(max_await_time_ms=10)
+    events = [_insert(_tweet("GGAL", "positivo")), _insert(_tweet("GGAL", "negativo"))]
+    await _consume(source, events)
+    expected = await _counts(computed, "GGAL")
+    # Sin transacciones, un corte entre los deltas y el token deja el token sin guardar
+    await computed["change_feed_state"].delete_many({})
+
+    replay = await _consume(source, [], received=2)
+
+    assert replay.events_received == 2
+    assert replay.events_skipped == 2
+    assert replay.events_applied == 0
+    assert await _counts(computed, "GGAL") == expected
+
+async def test_resume_token_skips_applied_events(computed):
+    source = InMemoryChangeSource(max_await_time_ms=10)
+    await _consume(source, [_insert(_tweet("GGAL", "positivo"))])
+
+    resumed = await _consume(source, [_insert(_tweet("GGAL", "negativo"))])
+
+    assert resumed.events_received == 1
+    assert await _counts(computed, "GGAL") == ({"positivo": 2, "negativo": 1}, 3, 0)
+
+async def test_ingested_tweets_are_left_to_their_batch(computed):
+    feed = await _consume(
+        InMemoryChangeSource(max_await_time_ms=10), [_insert(_tweet("GGAL", "negativo", ingest_batch="lote-1"))]
+    )
+
+    assert feed.events_received == 1
+    assert feed.events_applied == 0
+    assert await _counts(computed, "GGAL") == ({"positivo": 1}, 1, 0)
+
+async def test_company_change_and_missing_pre_image_are_unresolved(computed):
+    tweet = _tweet("GGAL", "positivo")
+    moved = _update(tweet, dict(tweet, company="YPFD"))
+    moved["updateDescription"]["updatedFields"] = {"company": "YPFD"}
+    without_pre_image = _update(tweet, dict(tweet, sentiment="negativo"))
+    del without_pre_image["fullDocumentBeforeChange"]
+
+    feed = await _consume(InMemoryChangeSource(max_await_time_ms=10), [moved, without_pre_image])
+
+    assert feed.events_unresolved == 2
+    assert feed.events_applied == 0
+    assert await _counts(computed, "GGAL") == ({"positivo": 1}, 1, 0)
+
+class _ConcurrentWriterDb:
+    """Base cuya primera escritura condicionada de symbols_sentiment pierde contra otro escritor"""
+
+    def __init__(self, db):
+        self._db = db
+        self.interfered = False
+
+    def __getitem__(self, name):
+        collection = self._db[name]
+        if name != "symbols_sentiment":
+            return collection
+        writer = self
+
+        class Collection:
+            def __getattr__(self, attr):
+                return getattr(collection, attr)
+
+            async def update_one(self, query, update, **kwargs):
+                if not writer.interfered and "revision" in query:
+                    writer.interfered = True
+                    await collection.update_one({"symbol": query["symbol"]}, {"$inc": {"revision": 1}})
+                return await collection.update_one(query, update, **kwargs)
+
+        return Collection()
+
+async def test_revision_conflicts_are_retried(computed, monkeypatch):
+    concurrent = _ConcurrentWriterDb(computed)
+    monkeypatch.setattr(Database, "get_db", classmethod(lambda cls: concurrent))
+
+    feed = await _consume(InMemoryChangeSource(max_await_time_ms=10), [_insert(_tweet("GGAL", "negativo"))])
+
+    assert concurrent.interfered
+    assert feed.events_applied == 1
+    assert await _counts(computed, "GGAL") == ({"positivo": 1, "negativo": 1}, 2, 0)
@@ -0,0 +1,69 @@
+import pytest
+
+from classification_cache import ClassificationCache, LRUCache, normalize_text, text_hash
+from classifier import TweetClassifier
+
+pytestmark = pytest.mark.anyio
+
+class CountingClassifier(TweetClassifier):
+    """Clasificador en proceso que registra los textos que le llegan"""
+
+    def __init__(self):
+        super().__init__(workers=0)
+        self.texts = []
+
+    async def classify(self, texts):
+        self.texts.extend(texts)
+        return await super().classify(texts)
+
+def test_copies_share_a_key():
+    original = "GGAL sube fuerte hoy https://t.co/abc"
+    copies = ["RT @trader: GGAL sube   fuerte hoy", "rt rt GGAL SUBE fuerte hoy @alguien", "GGAL súbe fuerte hoy"]
+
+    assert normalize_text(original) == "ggal sube fuerte hoy"
+    assert {text_hash(copy) for copy in copies} == {text_hash(original)}
+    assert text_hash("GGAL cae") != text_hash(original)
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", ("positivo", {}))
+    cache.put("b", ("negativo", {}))
+    cache.get("a")
+    cache.put("c", ("neutral", {}))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (2, 1, 1, 2)
+
+async def test_only_unseen_texts_reach_the_classifier(db):
+    cache = ClassificationCache(max_size=10)
+    classifier = CountingClassifier()
+
+    first = await cache.resolve(["GGAL sube", "RT GGAL sube", "YPF cae"], classifier)
+    second = await cache.resolve(["YPF cae", "BMA vuela"], classifier)
+
+    assert classifier.texts == ["GGAL sube", "YPF cae", "BMA vuela"]
+    assert first[0] == first[1] and first[2] == second[0]
+    stats = cache.stats()
+    assert stats["batch_duplicates"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["store_misses"] == 3
+
+async def test_store_is_shared_between_workers(db):
+    classifier = CountingClassifier()
+    await ClassificationCache(max_size=10).resolve(["GGAL sube"], classifier)
+
+    # Otro worker (LRU vacía) lo encuentra en la colección sin clasificar
+    other = ClassificationCache(max_size=10)
+    labels = await other.resolve(["GGAL sube"], classifier)
+
+    assert classifier.texts == ["GGAL sube"]
+    assert labels[0][0] == "positivo"
+    assert other.stats()["store_hits"] == 1
+    assert await db[ClassificationCache.COLLECTION].count_documents({}) == 1
+
+async def test_stats_endpoint(client):
+    response = await client.get("/classification-cache/stats")
+
+    assert response.status_code == 200
+    assert {"hit_ratio", "evictions", "memory_max_size", "store_size"} <= set(response.json())
@@ -0,0 +1,82 @@
+import pytest
+
+from classifier import SOURCE, TweetClassifier, score_text
+from progress import JobProgress
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+def test_lexicon_handles_negation_and_intensifiers():
+    assert score_text("GGAL sube fuerte 🚀")[0] == "positivo"
+    assert score_text("YPF no sube")[0] == "negativo"
+    assert score_text("hoy abre el mercado")[0] == "neutral"
+    weak, strong = score_text("cae")[1], score_text("muy cae")[1]
+    assert strong["neg"] > weak["neg"]
+
+@pytest.fixture
+async def unlabeled(db):
+    await db["tweets"].insert_many([
+        {"company": "GGAL", "text": "GGAL sube 🚀", "sentiment": None},
+        {"company": "GGAL", "text": "GGAL se desploma", "sentiment": "desconocido"},
+        {"company": "GGAL", "sentiment": ""},
+        {"company": "YPFD", "text": "YPF sube", "sentiment": "negativo"},
+        {"company": "YPFD", "text": "YPF cae", "sentiment_prob": {"pos": 0.9, "neg": 0.1}},
+    ])
+    await db["symbols"].insert_many([
+        {"symbol": "BMA", "tweets": [
+            {"text": "BMA en rally", "sentiment": ""},
+            {"text": "BMA cae", "sentiment": "positivo"}
+        ]},
+        {"symbol": "PAMP", "tweets": []},
+        {"symbol": "GGAL"},
+    ])
+    return db
+
+async def _run():
+    return await SentimentService._classify_unlabeled_tweets(JobProgress(), TweetClassifier(workers=0))
+
+async def test_classifies_only_unlabeled_tweets(unlabeled):
+    await _run()
+
+    tweets = {tweet["text"]: tweet async for tweet in unlabeled["tweets"].find({"text": {"$exists": True}})}
+    assert tweets["GGAL sube 🚀"]["sentiment"] == "positivo"
+    assert tweets["GGAL sube 🚀"]["sentiment_source"] == SOURCE
+    assert tweets["GGAL se desploma"]["sentiment"] == "negativo"
+    # Etiquetas y probabilidades existentes no se tocan
+    assert tweets["YPF sube"]["sentiment"] == "negativo"
+    assert "sentiment_source" not in tweets["YPF cae"]
+    bma = await unlabeled["symbols"].find_one({"symbol": "BMA"})
+    assert [tweet["sentiment"] for tweet in bma["tweets"]] == ["positivo", "positivo"]
+    assert bma["tweets"][0]["sentiment_source"] == SOURCE
+
+async def test_reports_real_counts(unlabeled):
+    result = await _run()
+
+    assert result["total_symbols"] == 3
+    # GGAL (colección tweets) y BMA (embebidos); PAMP no tiene tweets
+    assert result["symbols_with_tweets"] == 2
+    # 4 sin sentimiento: 3 en la colección (uno sin texto) y 1 embebido
+    assert result["tweets_without_sentiment"] == 4
+    assert result["tweets_with_sentiment"] == 3
+    assert result["tweets_updated"] == 3
+    assert result["symbols_updated"] == 2
+
+    # Una segunda pasada no encuentra nada nuevo para clasificar
+    again = await _run()
+    assert again["tweets_updated"] == 0
+    assert again["tweets_without_sentiment"] == 1
+
+async def test_embedded_write_keeps_concurrent_changes(unlabeled):
+    symbols = unlabeled["symbols"]
+    stale = await symbols.find_one({"symbol": "BMA"})
+    # Entre la lectura y la escritura: otro proceso agrega un tweet y etiqueta el primero
+    await symbols.update_one({"symbol": "BMA"}, {"$push": {"tweets": {"text": "BMA se desploma", "sentiment": None}}})
+    await symbols.update_one({"symbol": "BMA"}, {"$set": {"tweets.0.sentiment": "neutral"}})
+
+    classified = await SentimentService._classify_embedded_tweets(symbols, stale, TweetClassifier(workers=0))
+
+    tweets = (await symbols.find_one({"symbol": "BMA"}))["tweets"]
+    assert classified == 1
+    assert [tweet["text"] for tweet in tweets] == ["BMA en rally", "BMA cae", "BMA se desploma"]
+    assert [tweet["sentiment"] for tweet in tweets] == ["neutral", "positivo", "negativo"]
+    assert "sentiment_source" not in tweets[0]
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from columnar import ColumnarStore, _millis, compare_with_database
+from progress import JobProgress
+from services import SentimentService
+from synthetic_data import generate_dataset, load_dataset
+
+pytestmark = pytest.mark.anyio
+
+# Sin tweets embebidos: la copia columnar solo exporta la colección tweets
+DATASET = {"seed": 5, "symbols": 6, "sectors": 2, "tweets_per_symbol": 50, "embedded_ratio": 0}
+
+FIELDS = ("sector", "overall_sentiment", "sentiment_counts", "sentiment_percentages",
+          "total_tweets", "confidence_score", "last_tweet_id")
+
+@pytest.fixture
+async def dataset(db):
+    await load_dataset(db, generate_dataset(**DATASET))
+    return db
+
+async def _python_docs(db):
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    return {doc["symbol"]: {field: doc.get(field) for field in FIELDS}
+            async for doc in db["symbols_sentiment"].find({})}
+
+def _columnar_docs(store, **kwargs):
+    return {doc["symbol"]: {field: doc[field] for field in FIELDS} for doc in store.recompute(**kwargs)["docs"]}
+
+async def test_recompute_matches_the_full_rebuild(dataset, tmp_path):
+    store = ColumnarStore(str(tmp_path))
+
+    result = await store.export(segment_size=70)
+
+    assert result["tweets_exported"] == await dataset["tweets"].count_documents({})
+    assert result["segments_written"] == -(-result["tweets_exported"] // 70)
+    assert _columnar_docs(ColumnarStore(str(tmp_path))) == await _python_docs(dataset)
+    assert (await compare_with_database(store.recompute()["docs"]))["different"] == 0
+
+async def test_export_only_appends_new_tweets(dataset, tmp_path):
+    store = ColumnarStore(str(tmp_path))
+    first = await store.export()
+    await dataset["tweets"].insert_many([
+        {"_id": ObjectId(), "company": "GGAL", "sentiment": "neg", "created_at": datetime(2025, 2, 1)},
+        {"_id": ObjectId(), "company": "NUEVO", "sentiment_prob": {"pos": 0.9}, "created_at": None},
+    ])
+
+    second = await store.export()
+
+    assert second["tweets_exported"] == 2
+    assert second["total_segments"] == first["total_segments"] + 1
+    assert second["total_tweets"] == first["total_tweets"] + 2
+    assert "NUEVO" in store.manifest["companies"]
+    assert _columnar_docs(store) == await _python_docs(dataset)
+    assert (await store.export())["tweets_exported"] == 0
+    assert (await store.export(full=True))["total_segments"] == 1
+
+async def test_recompute_by_date_and_thresholds(dataset, tmp_path):
+    store = ColumnarStore(str(tmp_path))
+    await store.export()
+    until = datetime(2024, 12, 20)
+    expected = {}
+    async for tweet in dataset["tweets"].find({"created_at": {"$lt": until}}):
+        expected[tweet["company"]] = expected.get(tweet["company"], 0) + 1
+
+    docs = store.recompute(until=_millis(until))["docs"]
+
+    assert {doc["symbol"]: doc["total_tweets"] for doc in docs if doc["total_tweets"]} == expected
+    # Con umbrales extremos ningún sentimiento es dominante ni mixto
+    strict = store.recompute(dominant_threshold=1.0, mixed_threshold=1.0)["docs"]
+    assert all(doc["overall_sentiment"] != "mixto" for doc in strict)
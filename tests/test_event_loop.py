@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+import services
+from cpu_executor import CpuExecutor
+from loop_lag import LoopLagMonitor
+from progress import JobProgress
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+def _square_chunk(chunk, offset=0):
+    return [value * value + offset for value in chunk]
+
+def test_unknown_executor_kind_is_rejected():
+    with pytest.raises(ValueError):
+        CpuExecutor(kind="gpu")
+
+@pytest.mark.parametrize("kind", ["thread", "inline"])
+async def test_map_chunks_keeps_chunk_order(kind):
+    executor = CpuExecutor(kind=kind, workers=2, chunk_size=3, min_items=0)
+    try:
+        chunks = await executor.map_chunks(_square_chunk, list(range(10)), 1)
+    finally:
+        executor.close()
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [value for chunk in chunks for value in chunk] == [value * value + 1 for value in range(10)]
+
+async def test_small_lists_stay_on_the_loop():
+    executor = CpuExecutor(kind="thread", chunk_size=3, min_items=100)
+    assert await executor.map_chunks(_square_chunk, [1, 2, 3, 4]) == [[1, 4, 9, 16]]
+    assert await executor.map_chunks(_square_chunk, []) == []
+    assert executor._pool is None
+
+async def test_inline_executor_yields_between_chunks():
+    executor = CpuExecutor(kind="inline", chunk_size=1, min_items=0)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(len(ticks))
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    before = len(ticks)
+    await executor.map_chunks(_square_chunk, list(range(5)))
+    task.cancel()
+
+    assert len(ticks) - before >= 4
+
+async def test_python_mode_streams_tweets_in_chunks(db, monkeypatch):
+    await db["symbols"].insert_many([{"symbol": "GGAL", "sector": "Bancos"}, {"symbol": "BMA", "sector": "Bancos"}])
+    await db["tweets"].insert_many(
+        [{"company": "GGAL", "text": f"t{i}", "sentiment": ["pos", "neg", None][i % 3]} for i in range(11)]
+        + [{"company": "BMA", "text": "b", "sentiment": "pos"}]
+    )
+    executor = CpuExecutor(kind="inline", chunk_size=4, min_items=0)
+    batches = []
+    original = executor.map_chunks
+
+    async def spy(fn, items, *args):
+        batches.append(len(items))
+        return await original(fn, items, *args)
+
+    monkeypatch.setattr(executor, "map_chunks", spy)
+    monkeypatch.setattr(services, "cpu_executor", executor)
+
+    result = await SentimentService._create_symbols_sentiment_python(JobProgress())
+
+    # GGAL en lotes de a un trozo (4 + 4 + 3), BMA en uno
+    assert batches == [4, 4, 3, 1]
+    assert result["symbols_created"] == 2
+    ggal = await db["symbols_sentiment"].find_one({"symbol": "GGAL"})
+    assert ggal["sentiment_counts"] == {"positivo": 4, "negativo": 4, "neutral": 3}
+    assert (ggal["total_tweets"], ggal["tweets_without_sentiment"]) == (11, 3)
+    assert ggal["last_tweet_id"] == max([doc["_id"] async for doc in db["tweets"].find({"company": "GGAL"})])
+
+def test_lag_percentiles_and_stalls():
+    monitor = LoopLagMonitor(interval=0.05, window=4, stall_threshold=0.1)
+    for lag in (0.001, 0.002, 0.3, 0.004, 0.005):
+        monitor.record(lag)
+
+    stats = monitor.stats()
+
+    # La ventana guarda las últimas 4 muestras; el máximo y los bloqueos son desde el inicio
+    assert stats["window"] == {"samples": 4, "p50_ms": 4.0, "p95_ms": 300.0, "p99_ms": 300.0, "max_ms": 300.0}
+    assert (stats["measured"], stats["max_ms"], stats["stalls"]) == (5, 300.0, 1)
+    monitor.reset()
+    assert monitor.stats()["window"]["samples"] == 0 and monitor.stats()["max_ms"] == 0.0
+
+async def test_monitor_measures_a_blocked_loop():
+    monitor = LoopLagMonitor(interval=0.005, window=100, stall_threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.08)
+        await asyncio.sleep(0.02)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["running"] is False
+    assert stats["max_ms"] >= 60
+    assert stats["stalls"] >= 1
+
+async def test_event_loop_endpoint(client):
+    body = (await client.get("/debug/event-loop")).json()
+    assert {"running", "window", "max_ms", "stalls"} <= set(body["lag"])
+    assert set(body["cpu_executor"]) == {"kind", "workers", "chunk_size", "min_items"}
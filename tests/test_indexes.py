@@ -0,0 +1,46 @@
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from database import Database
+from diagnostics import _collect_stages, _winning_plans, explain_hot_queries
+
+pytestmark = pytest.mark.anyio
+
+async def test_ensure_indexes_creates_every_declared_index(db):
+    # Una segunda llamada (otro arranque) no falla ni duplica índices
+    await Database.ensure_indexes()
+
+    for collection_name, indexes in Database.INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index in indexes:
+            assert index.document["name"] in existing, (collection_name, index.document["name"])
+
+async def test_symbols_sentiment_is_unique_by_symbol(db):
+    await db["symbols_sentiment"].insert_one({"symbol": "GGAL"})
+
+    with pytest.raises(DuplicateKeyError):
+        await db["symbols_sentiment"].insert_one({"symbol": "GGAL"})
+
+def test_plan_walk_finds_collscan_and_index_names():
+    explain = {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH",
+        "inputStage": {"stage": "IXSCAN", "indexName": "company_id"}
+    }}, "stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}]}
+    stages, indexes = [], []
+
+    for plan in _winning_plans(explain):
+        _collect_stages(plan, stages, indexes)
+
+    assert stages == ["FETCH", "IXSCAN", "COLLSCAN"]
+    assert indexes == ["company_id"]
+
+async def test_hot_queries_use_indexes(mongod_db):
+    await mongod_db["symbols"].insert_one({"symbol": "GGAL", "sector": "Bancos"})
+    await mongod_db["symbols_sentiment"].insert_one({"symbol": "GGAL", "sector": "Bancos", "total_tweets": 1})
+    await mongod_db["tweets"].insert_one({"company": "GGAL"})
+
+    report = await explain_hot_queries()
+
+    assert [entry for entry in report["queries"] if "error" in entry] == []
+    assert report["collscan_queries"] == []
+    assert report["ok"]
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from config import settings
+from progress import JobProgress
+from services import SentimentService, TweetIngestionService
+
+pytestmark = pytest.mark.anyio
+
+BATCH = {"tweets": [
+    {"company": "GGAL", "text": "GGAL sube", "sentiment": "pos", "created_at": "2025-01-01T10:00:00Z"},
+    {"company": "GGAL", "text": "GGAL sin etiqueta"},
+    {"company": "NADA", "text": "símbolo desconocido", "sentiment": "neg"},
+    {"text": "sin company"},
+]}
+
+async def _seed(database):
+    await database["symbols"].insert_one({"symbol": "GGAL", "sector": "Bancos"})
+    await database["tweets"].insert_one({"company": "GGAL", "text": "GGAL baja", "sentiment": "neg"})
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+
+@pytest.fixture(autouse=True)
+def fresh_slots(monkeypatch):
+    # El semáforo de lotes en proceso se crea con el loop del primer lote
+    monkeypatch.setattr(TweetIngestionService, "_slots", None)
+
+@pytest.fixture
+async def seeded(db):
+    await _seed(db)
+    return db
+
+async def test_batch_is_inserted_and_counted(seeded, client):
+    response = await client.post("/tweets/batch", json=BATCH)
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["received"], body["inserted"], body["rejected"], body["counted"]) == (4, 3, 1, 2)
+    assert body["errors"] == [{"index": 3, "error": "'company' es obligatorio"}]
+    assert body["unknown_symbols"] == ["NADA"]
+    doc = await seeded["symbols_sentiment"].find_one({"symbol": "GGAL"})
+    assert doc["sentiment_counts"] == {"negativo": 1, "positivo": 1, "neutral": 1}
+    assert (doc["total_tweets"], doc["tweets_without_sentiment"]) == (3, 1)
+
+async def test_retried_key_replays_without_counting_twice(seeded, client):
+    headers = {"Idempotency-Key": "lote-1"}
+    first = (await client.post("/tweets/batch", json=BATCH, headers=headers)).json()
+    doc = await seeded["symbols_sentiment"].find_one({"symbol": "GGAL"})
+
+    second = (await client.post("/tweets/batch", json=BATCH, headers=headers)).json()
+
+    assert (first["replayed"], second["replayed"]) == (False, True)
+    assert {**second, "replayed": False} == first
+    assert await seeded["tweets"].count_documents({"ingest_batch": "lote-1"}) == 3
+    assert await seeded["symbols_sentiment"].find_one({"symbol": "GGAL"}) == doc
+
+async def test_reused_key_with_other_batch_is_rejected(seeded, client):
+    headers = {"Idempotency-Key": "lote-1"}
+    await client.post("/tweets/batch", json=BATCH, headers=headers)
+
+    response = await client.post("/tweets/batch", json={"tweets": BATCH["tweets"][:1]}, headers=headers)
+
+    assert response.status_code == 400
+
+async def test_batch_in_progress_elsewhere_conflicts(seeded, client):
+    await seeded[TweetIngestionService.COLLECTION].insert_one({
+        "_id": "lote-1",
+        "digest": TweetIngestionService._digest(BATCH["tweets"]),
+        "status": "processing",
+        "tweet_ids": [],
+        "lease_until": datetime.utcnow() + timedelta(minutes=1)
+    })
+
+    response = await client.post("/tweets/batch", json=BATCH, headers={"Idempotency-Key": "lote-1"})
+
+    assert response.status_code == 409
+    assert await seeded["tweets"].count_documents({"ingest_batch": "lote-1"}) == 0
+
+async def test_full_worker_answers_503(seeded, client, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_MAX_CONCURRENT_BATCHES", 1)
+    monkeypatch.setattr(settings, "INGEST_QUEUE_TIMEOUT_SECONDS", 0.05)
+    await TweetIngestionService._acquire_slot()
+    try:
+        response = await client.post("/tweets/batch", json=BATCH)
+    finally:
+        TweetIngestionService._slots.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert await seeded["tweets"].count_documents({}) == 1
+
+@pytest.mark.parametrize("content", [b"no es json", b"[]", b'{"tweets": {}}'])
+async def test_invalid_body_is_rejected(seeded, client, content):
+    response = await client.post("/tweets/batch", content=content)
+    assert response.status_code == 400
+
+async def test_oversized_batch_is_rejected(seeded, client, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_MAX_BATCH_SIZE", 2)
+    response = await client.post("/tweets/batch", json=BATCH)
+    assert response.status_code == 400
+
+async def test_ingested_tweets_keep_the_watermark(seeded):
+    before = await seeded["symbols_sentiment"].find_one({"symbol": "GGAL"})
+
+    await TweetIngestionService.ingest_tweets(BATCH["tweets"])
+
+    after = await seeded["symbols_sentiment"].find_one({"symbol": "GGAL"})
+    assert after["total_tweets"] == before["total_tweets"] + 2
+    assert after["last_tweet_id"] == before["last_tweet_id"]
+
+async def test_incremental_counts_scraper_tweets_with_older_ids(mongod_db):
+    # El scraper genera el _id antes de que la API ingeste un lote y lo inserta después
+    await _seed(mongod_db)
+    scraper_id = ObjectId()
+    await TweetIngestionService.ingest_tweets(BATCH["tweets"][:2])
+    await mongod_db["tweets"].insert_one(
+        {"_id": scraper_id, "company": "GGAL", "text": "GGAL sube", "sentiment": "pos"}
+    )
+
+    result = await SentimentService._create_symbols_sentiment_incremental(JobProgress())
+
+    assert result["tweets_processed"] == 1
+    incremental = await mongod_db["symbols_sentiment"].find_one({"symbol": "GGAL"})
+    assert incremental["sentiment_counts"] == {"negativo": 1, "positivo": 2, "neutral": 1}
+    assert incremental["total_tweets"] == 4
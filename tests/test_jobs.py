@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from jobs import JobConflictError, JobManager
+from progress import JobProgress
+
+pytestmark = pytest.mark.anyio
+
+class FakeJob:
+    """Job de prueba: avanza y espera a que el test lo libere"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = []
+
+    async def __call__(self, mode: str, progress: JobProgress):
+        self.calls.append(mode)
+        progress.set_total(10)
+        progress.advance(symbols=4, tweets=40)
+        await self.release.wait()
+        if mode == "fail":
+            raise RuntimeError("falló")
+        return {"mode": mode}
+
+@pytest.fixture
+def fake(db, monkeypatch):
+    job = FakeJob()
+    monkeypatch.setitem(jobs.JOB_TYPES, "fake", job)
+    return job
+
+@pytest.fixture
+async def manager(db):
+    manager = JobManager(heartbeat_interval=0.01, stale_after=60)
+    yield manager
+    await manager.shutdown()
+
+async def _until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "timeout"
+        await asyncio.sleep(0.01)
+
+async def _called(fake):
+    return bool(fake.calls)
+
+async def test_same_params_join_the_active_job(fake, manager):
+    first, created = await manager.start("fake", {"mode": "python"})
+    second, joined_created = await manager.start("fake", {"mode": "python"})
+
+    assert created and not joined_created
+    assert second["id"] == first["id"]
+    fake.release.set()
+    finished = await manager.wait(first["id"], poll_interval=0.01)
+    assert finished["status"] == "completed"
+    assert finished["result"] == {"mode": "python"}
+    assert fake.calls == ["python"]
+
+async def test_finished_job_frees_the_type(fake, mongod_db):
+    # mongomock no respeta el partialFilterExpression del índice único: requiere mongod
+    manager = JobManager(heartbeat_interval=0.01, stale_after=60)
+    first, _ = await manager.start("fake", {"mode": "python"})
+    fake.release.set()
+    await manager.wait(first["id"], poll_interval=0.01)
+
+    second, created = await manager.start("fake", {"mode": "vectorized"})
+
+    assert created and second["id"] != first["id"]
+    await manager.wait(second["id"], poll_interval=0.01)
+
+async def test_other_params_conflict(fake, manager):
+    job, _ = await manager.start("fake", {"mode": "python"})
+
+    with pytest.raises(JobConflictError) as error:
+        await manager.start("fake", {"mode": "vectorized"})
+
+    assert error.value.job_id == job["id"]
+
+async def test_unknown_type_is_rejected(manager):
+    with pytest.raises(ValueError):
+        await manager.start("nope", {})
+
+async def test_heartbeat_persists_progress(fake, manager):
+    job, _ = await manager.start("fake", {"mode": "python"})
+
+    async def persisted():
+        return (await manager.get(job["id"]))["progress"]["symbols_processed"] == 4
+    await _until(persisted)
+
+    progress = (await manager.get(job["id"]))["progress"]
+    assert progress["symbols_total"] == 10
+    assert progress["tweets_scanned"] == 40
+
+async def test_cancel(fake, manager):
+    job, _ = await manager.start("fake", {"mode": "python"})
+
+    await manager.cancel(job["id"])
+
+    assert (await manager.wait(job["id"], poll_interval=0.01))["status"] == "cancelled"
+
+async def test_failure_is_recorded(fake, manager):
+    failing, _ = await manager.start("fake", {"mode": "fail"})
+    fake.release.set()
+    failed = await manager.wait(failing["id"], poll_interval=0.01)
+    assert failed["status"] == "failed"
+    assert "falló" in failed["error"]
+
+async def test_stale_job_is_resumed_by_another_worker(fake, manager, db):
+    old = datetime.utcnow() - timedelta(minutes=10)
+    await db["jobs"].insert_one({
+        "_id": "abandonado", "type": "fake", "params": {"mode": "python"}, "status": "running",
+        "active": True, "owner": "otro-worker", "attempts": 1, "cancel_requested": False,
+        "created_at": old, "started_at": old, "heartbeat_at": old, "finished_at": None,
+        "progress": JobProgress().snapshot(), "result": None, "error": None
+    })
+
+    assert await manager.resume_stale_jobs() == ["abandonado"]
+
+    fake.release.set()
+    finished = await manager.wait("abandonado", poll_interval=0.01)
+    assert finished["status"] == "completed"
+    assert finished["attempts"] == 2
+    assert finished["owner"] == manager.worker_id
+
+async def test_interrupted_job_is_cancelled_without_a_runner(fake, manager, db):
+    job, _ = await manager.start("fake", {"mode": "python"})
+    await _until(lambda: _called(fake))
+    await manager.shutdown()
+    assert (await manager.get(job["id"]))["status"] == "interrupted"
+
+    await JobManager().cancel(job["id"])
+
+    cancelled = await manager.get(job["id"])
+    assert cancelled["status"] == "cancelled"
+    assert await db["jobs"].count_documents({"active": True}) == 0
+
+async def test_endpoints_return_202_join_and_409(client, monkeypatch):
+    fake = FakeJob()
+    monkeypatch.setitem(jobs.JOB_TYPES, "create-sentiment-collection", fake)
+
+    started = await client.post("/create-sentiment-collection", params={"mode": "python"})
+    joined = await client.post("/create-sentiment-collection", params={"mode": "python"})
+    conflict = await client.post("/create-sentiment-collection", params={"mode": "vectorized"})
+
+    assert started.status_code == 202
+    assert started.headers["location"] == f"/jobs/{started.json()['id']}"
+    assert joined.json()["id"] == started.json()["id"] and joined.json()["created"] is False
+    assert conflict.status_code == 409
+    cancelled = await client.post(f"/jobs/{started.json()['id']}/cancel")
+    assert cancelled.status_code == 200
+    await jobs.job_manager.wait(started.json()["id"], poll_interval=0.01)
+    assert (await client.get(f"/jobs/{started.json()['id']}")).json()["status"] == "cancelled"
+    assert (await client.get("/jobs/nope")).status_code == 404
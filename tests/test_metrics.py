@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import (
+    MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES, MONGO_DOCUMENTS_RETURNED, Counter, Gauge, Histogram,
+    MongoCommandMetrics
+)
+
+pytestmark = pytest.mark.anyio
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latencia", "Latencia", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/x")
+
+    assert histogram.render()[2:] == [
+        'latencia_bucket{route="/x",le="0.1"} 2',
+        'latencia_bucket{route="/x",le="1.0"} 3',
+        'latencia_bucket{route="/x",le="+Inf"} 4',
+        'latencia_sum{route="/x"} 3.65',
+        'latencia_count{route="/x"} 4',
+    ]
+
+def test_counter_and_gauge_escape_labels():
+    counter = Counter("total", "Total", ("name",))
+    counter.inc('a"b\\c')
+    counter.inc('a"b\\c', amount=2)
+    gauge = Gauge("en_curso", "En curso")
+    gauge.inc()
+    gauge.dec()
+    gauge.set(7)
+
+    assert counter.render()[2:] == ['total{name="a\\"b\\\\c"} 3']
+    assert gauge.render() == ["# HELP en_curso En curso", "# TYPE en_curso gauge", "en_curso 7"]
+
+def _event(command_name, command, request_id, reply=None):
+    return SimpleNamespace(command_name=command_name, command=command, connection_id=("h", 1),
+                           request_id=request_id, duration_micros=1500, reply=reply or {})
+
+def _series(metric, *labels):
+    return metric._series.get(labels)
+
+def test_mongo_listener_tracks_collection_and_documents():
+    listener = MongoCommandMetrics()
+    returned = _series(MONGO_DOCUMENTS_RETURNED, "find", "metrics_test") or 0
+    failures = _series(MONGO_COMMAND_FAILURES, "aggregate", "metrics_test") or 0
+
+    listener.started(_event("find", {"find": "metrics_test"}, 1))
+    listener.succeeded(_event("find", {}, 1, {"cursor": {"firstBatch": [{}, {}, {}]}}))
+    listener.started(_event("getMore", {"getMore": 5, "collection": "metrics_test"}, 2))
+    listener.succeeded(_event("getMore", {}, 2, {"cursor": {"nextBatch": [{}]}}))
+    listener.started(_event("aggregate", {"aggregate": "metrics_test"}, 3))
+    listener.failed(_event("aggregate", {}, 3))
+
+    assert _series(MONGO_DOCUMENTS_RETURNED, "find", "metrics_test") == returned + 3
+    assert _series(MONGO_DOCUMENTS_RETURNED, "getMore", "metrics_test") >= 1
+    assert _series(MONGO_COMMAND_FAILURES, "aggregate", "metrics_test") == failures + 1
+    assert _series(MONGO_COMMAND_DURATION, "aggregate", "metrics_test")[2] >= 1
+    # No quedan comandos en curso sin cerrar
+    assert listener._collections == {}
+
+async def test_metrics_endpoint_reports_route_templates(client):
+    await client.get("/symbols-sentiment/NOPE")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/symbols-sentiment/{symbol}",status="404"' in response.text
+    assert "/symbols-sentiment/NOPE" not in response.text
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
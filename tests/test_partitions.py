@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import partitions
+from benchmark import EQUIVALENCE_FIELDS
+from partitions import PartitionedRecompute, PartitionWorker
+from progress import JobProgress
+from services import SentimentService
+from synthetic_data import generate_dataset, load_dataset
+
+pytestmark = pytest.mark.anyio
+
+SYMBOLS = {"ALUA": "Materiales", "BMA": "Bancos", "GGAL": "Bancos", "PAMP": "Energía", "YPFD": "Energía"}
+
+def _result(partition):
+    return {"symbols_created": len(partition["symbols"]), "symbols_written": len(partition["symbols"]),
+            "writes_skipped": 0, "sentiment_stats": {"positivo": len(partition["symbols"])},
+            "tweets_processed": 10 * len(partition["symbols"])}
+
+@pytest.fixture
+def recompute(monkeypatch):
+    """Reemplaza el recálculo de una partición (usa $merge) y registra qué símbolos procesó"""
+    processed = []
+    failing = set()
+
+    async def fake(partition):
+        names = [symbol["symbol"] for symbol in partition["symbols"]]
+        if failing & set(names):
+            raise RuntimeError("sin conexión")
+        processed.extend(names)
+        return _result(partition)
+
+    monkeypatch.setattr(PartitionWorker, "_recompute", staticmethod(fake))
+    return processed, failing
+
+@pytest.fixture
+async def run(db):
+    await db["symbols"].insert_many([{"symbol": name, "sector": sector} for name, sector in SYMBOLS.items()])
+    recompute = PartitionedRecompute(partition_size=2, worker=PartitionWorker(lease_seconds=30, poll_interval=0.01))
+    partitions_ = recompute._build_partitions("run", SYMBOLS)
+    await db[PartitionWorker.COLLECTION].insert_many(partitions_)
+    return recompute
+
+async def test_partitions_are_disjoint_and_ordered(db):
+    built = PartitionedRecompute(partition_size=2)._build_partitions("run", SYMBOLS)
+
+    assert [[symbol["symbol"] for symbol in partition["symbols"]] for partition in built] == [
+        ["ALUA", "BMA"], ["GGAL", "PAMP"], ["YPFD"]
+    ]
+
+async def test_claim_takes_each_free_partition_once(run):
+    worker = run.worker
+    other = PartitionWorker(lease_seconds=30)
+    other.worker_id = "otro-worker"
+
+    claimed = [await worker.claim("run"), await other.claim("run"), await worker.claim("run")]
+
+    assert [partition["index"] for partition in claimed] == [0, 1, 2]
+    assert claimed[1]["lease_owner"] == "otro-worker"
+    assert await worker.claim("run") is None
+
+async def test_expired_lease_is_reclaimed_until_attempts_run_out(run, db):
+    worker = PartitionWorker(lease_seconds=30, max_attempts=2)
+    await db[PartitionWorker.COLLECTION].update_many({"index": {"$ne": 0}}, {"$set": {"status": "done"}})
+    expired = {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+
+    assert (await worker.claim("run"))["attempts"] == 1
+    await db[PartitionWorker.COLLECTION].update_one({"index": 0}, expired)
+    assert (await worker.claim("run"))["attempts"] == 2
+    await db[PartitionWorker.COLLECTION].update_one({"index": 0}, expired)
+    assert await worker.claim("run") is None
+
+async def test_process_marks_done_or_releases(run, recompute, db):
+    _, failing = recompute
+    failing.add("GGAL")
+    worker = PartitionWorker(lease_seconds=30, max_attempts=2)
+
+    assert await worker.process(await worker.claim("run"))
+    assert not await worker.process(await worker.claim("run"))
+
+    states = {doc["index"]: doc async for doc in db[PartitionWorker.COLLECTION].find({})}
+    assert states[0]["status"] == "done" and states[0]["result"]["tweets_processed"] == 20
+    assert states[1]["status"] == "pending" and "sin conexión" in states[1]["error"]
+    # Segundo intento fallido: ya no se reintenta
+    await worker.process(await worker.claim("run"))
+    await worker.process(await worker.claim("run"))
+    assert (await db[PartitionWorker.COLLECTION].find_one({"index": 1}))["status"] == "failed"
+
+async def test_lost_lease_abandons_the_partition(run, db, monkeypatch):
+    async def slow(partition):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(PartitionWorker, "_recompute", staticmethod(slow))
+    worker = PartitionWorker(lease_seconds=0.03)
+    partition = await worker.claim("run")
+    await db[PartitionWorker.COLLECTION].update_one({"_id": partition["_id"]}, {"$set": {"lease_owner": "otro-worker"}})
+
+    assert await worker.process(partition) is False
+
+async def test_cancel_on_last_attempt_marks_failed(run, db, monkeypatch):
+    started = asyncio.Event()
+
+    async def slow(partition):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(PartitionWorker, "_recompute", staticmethod(slow))
+    worker = PartitionWorker(lease_seconds=30, max_attempts=1)
+    task = asyncio.create_task(worker.process(await worker.claim("run")))
+    await started.wait()
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert (await db[PartitionWorker.COLLECTION].find_one({"index": 0}))["status"] == "failed"
+
+async def test_idle_worker_backs_off(db, monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == 6:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(partitions.asyncio, "sleep", sleep)
+    worker = PartitionWorker(poll_interval=1, idle_poll_interval=5)
+
+    with pytest.raises(asyncio.CancelledError):
+        await worker.run_forever()
+
+    assert delays == [1, 2, 4, 5, 5, 5]
+
+async def test_run_collects_every_partition(db, recompute):
+    processed, _ = recompute
+    await db["symbols"].insert_many([{"symbol": name, "sector": sector} for name, sector in SYMBOLS.items()])
+    progress = JobProgress()
+
+    result = await PartitionedRecompute(partition_size=2, worker=PartitionWorker(poll_interval=0.01)).run(progress)
+
+    assert sorted(processed) == sorted(SYMBOLS)
+    assert result["partitions"] == 3
+    assert result["symbols_created"] == result["symbols_with_positive"] == len(SYMBOLS)
+    assert result["tweets_processed"] == progress.tweets_scanned == 10 * len(SYMBOLS)
+    assert progress.symbols_processed == len(SYMBOLS)
+    assert await db[PartitionWorker.COLLECTION].count_documents({}) == 0
+
+async def test_run_fails_when_a_partition_runs_out_of_attempts(db, recompute):
+    _, failing = recompute
+    failing.add("YPFD")
+    await db["symbols"].insert_many([{"symbol": name, "sector": sector} for name, sector in SYMBOLS.items()])
+    worker = PartitionWorker(poll_interval=0.01, max_attempts=2)
+
+    with pytest.raises(RuntimeError, match="partición 2"):
+        await PartitionedRecompute(partition_size=2, worker=worker).run()
+
+async def test_partitioned_matches_python(mongod_db):
+    await load_dataset(mongod_db, generate_dataset(seed=7, symbols=8, sectors=3, tweets_per_symbol=40))
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    expected = {doc["symbol"]: {field: doc.get(field) for field in EQUIVALENCE_FIELDS}
+                async for doc in mongod_db["symbols_sentiment"].find({})}
+    await mongod_db["symbols_sentiment"].delete_many({})
+
+    await PartitionedRecompute(partition_size=3, worker=PartitionWorker(poll_interval=0.01)).run()
+
+    assert {doc["symbol"]: {field: doc.get(field) for field in EQUIVALENCE_FIELDS}
+            async for doc in mongod_db["symbols_sentiment"].find({})} == expected
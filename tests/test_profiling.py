@@ -0,0 +1,112 @@
+from collections import OrderedDict
+
+import pytest
+
+from config import settings
+# main se importa antes de habilitar el profiling: así la app no instala su propio
+# ProfilingMiddleware y los tests la envuelven con uno
+from main import app
+from profiling import ProfilingMiddleware, RequestProfile, profile_store, profiled
+
+pytestmark = pytest.mark.anyio
+
+TOKEN = {"X-Profile-Token": "secreto"}
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secreto")
+    monkeypatch.setattr(settings, "PROFILING_STACK_INTERVAL_MS", 1)
+    monkeypatch.setattr(profile_store, "_profiles", OrderedDict())
+
+@pytest.fixture
+async def profiled_client(db, profiling):
+    """Cliente de la API detrás del middleware de profiling"""
+    httpx = pytest.importorskip("httpx")
+    transport = httpx.ASGITransport(app=ProfilingMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+@pytest.fixture
+async def symbols(db):
+    await db["symbols"].insert_many([{"symbol": "GGAL", "sector": "Bancos"}, {"symbol": "BMA", "sector": "Bancos"}])
+
+async def test_profiled_is_transparent_without_a_profile():
+    @profiled("fase")
+    async def double(value):
+        return value * 2
+
+    assert await double(21) == 42
+
+async def test_request_with_token_is_profiled(profiled_client, symbols):
+    response = await profiled_client.get("/symbols-summary", headers=TOKEN)
+    profile_id = response.headers["x-profile-id"]
+
+    listed = (await profiled_client.get("/debug/profiles", headers=TOKEN)).json()
+    profile = (await profiled_client.get(f"/debug/profiles/{profile_id}", headers=TOKEN)).json()
+    stacks = await profiled_client.get(f"/debug/profiles/{profile_id}/stacks", headers=TOKEN)
+
+    assert response.status_code == 200
+    assert [item["id"] for item in listed["profiles"]] == [profile_id]
+    assert (profile["path"], profile["trigger"], profile["status"]) == ("/symbols-summary", "header", 200)
+    assert [phase["name"] for phase in profile["phases"]] == ["summarize_symbols", "get_symbols_summary"]
+    assert profile["serialization_ms"] is not None and profile["total_ms"] > 0
+    assert stacks.headers["content-type"].startswith("text/plain")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.text.splitlines())
+
+async def test_requests_without_valid_token_are_not_profiled(profiled_client, symbols):
+    plain = await profiled_client.get("/symbols-summary")
+    wrong = await profiled_client.get("/symbols-summary", headers={"X-Profile-Token": "otro"})
+
+    assert "x-profile-id" not in plain.headers and "x-profile-id" not in wrong.headers
+    assert profile_store.list() == []
+    assert (await profiled_client.get("/debug/profiles", headers={"X-Profile-Token": "otro"})).status_code == 403
+    assert (await profiled_client.get("/debug/profiles/nada", headers=TOKEN)).status_code == 404
+
+async def test_debug_endpoints_are_hidden_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secreto")
+    assert (await client.get("/debug/profiles", headers=TOKEN)).status_code == 404
+
+async def test_sampled_routes(db, profiling, symbols, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "PROFILING_SAMPLED_ROUTES", "/symbols-summary")
+    transport = httpx.ASGITransport(app=ProfilingMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        sampled = await http.get("/symbols-summary")
+        other = await http.get("/live")
+
+    assert "x-profile-id" in sampled.headers and "x-profile-id" not in other.headers
+    assert [item["trigger"] for item in profile_store.list()] == ["sample"]
+
+async def test_profiles_are_written_to_disk(profiled_client, symbols, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+
+    profile_id = (await profiled_client.get("/symbols-summary", headers=TOKEN)).headers["x-profile-id"]
+
+    assert sorted(path.suffix for path in tmp_path.glob(f"*-{profile_id}.*")) == [".folded", ".json"]
+
+async def test_store_keeps_the_latest_profiles(profiling, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_MAX_PROFILES", 2)
+    for path in ("/a", "/b", "/c"):
+        profile = RequestProfile("GET", path, "header")
+        profile.finish()
+        profile_store.add(profile)
+
+    assert [item["path"] for item in profile_store.list()] == ["/c", "/b"]
+
+def test_commands_are_charged_to_their_phase():
+    profile = RequestProfile("GET", "/symbols-summary", "header")
+    profile.add_phase("summarize_symbols", 0.010, 0.002, top_level=True)
+    profile.add_command("find", 0.004, "summarize_symbols")
+    profile.add_command("find", 0.001, "summarize_symbols")
+    profile.add_command("ping", 0.001, None)
+    profile.finish()
+
+    result = profile.to_dict()
+
+    phase = result["phases"][0]
+    assert (phase["wall_ms"], phase["loop_cpu_ms"], phase["db_ms"], phase["db_commands"]) == (10.0, 2.0, 5.0, 2)
+    assert result["commands"] == {"find": {"count": 2, "ms": 5.0}, "ping": {"count": 1, "ms": 1.0}}
+    assert (result["db_ms"], result["db_commands"]) == (6.0, 3)
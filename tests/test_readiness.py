@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from database import Database
+from readiness import ReadinessMonitor, readiness
+
+pytestmark = pytest.mark.anyio
+
+class _DownDb:
+    async def command(self, name):
+        raise ConnectionError("sin servidor")
+
+class _HangingDb:
+    async def command(self, name):
+        await asyncio.sleep(10)
+
+async def test_ready_after_startup_and_a_successful_check(db):
+    monitor = ReadinessMonitor(interval=60)
+    assert monitor.status()[0] is False
+
+    monitor.record_phase("database", time.monotonic())
+    await monitor.start()
+    try:
+        ready, status = monitor.status()
+    finally:
+        await monitor.stop()
+
+    assert ready
+    assert status["database"]["connected"] and status["database"]["error"] is None
+    assert set(status["startup"]["phases"]) == {"database"}
+    assert status["startup"]["ready_after_seconds"] is not None
+
+async def test_failed_or_slow_ping_is_not_ready(db, monkeypatch):
+    monitor = ReadinessMonitor(interval=60)
+    monitor.started = True
+
+    monkeypatch.setattr(Database, "get_db", classmethod(lambda cls: _DownDb()))
+    assert await monitor.check() is False
+    assert monitor.status()[1]["database"]["error"] == "ConnectionError: sin servidor"
+
+    monkeypatch.setattr("readiness.settings.READINESS_PING_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr(Database, "get_db", classmethod(lambda cls: _HangingDb()))
+    assert await monitor.check() is False
+    assert monitor.status()[1]["database"]["error"] == "TimeoutError"
+
+async def test_stale_check_is_not_ready(db):
+    monitor = ReadinessMonitor(interval=1)
+    monitor.started = True
+    await monitor.check()
+    assert monitor.status()[0]
+
+    # La verificación periódica dejó de correr
+    monitor._checked_monotonic -= 60
+
+    assert monitor.status()[0] is False
+
+async def test_probes(client, monkeypatch):
+    assert (await client.get("/live")).json() == {"status": "alive"}
+    assert (await client.get("/ready")).status_code == 503
+
+    monkeypatch.setattr(readiness, "started", True)
+    await readiness.check()
+    response = await client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
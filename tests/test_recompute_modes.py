@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from benchmark import EQUIVALENCE_FIELDS, check_equivalence
+from config import settings
+from progress import JobProgress
+from services import SentimentService
+from synthetic_data import generate_dataset, load_dataset
+
+pytestmark = pytest.mark.anyio
+
+# Dataset chico con todas las variantes: etiquetas crudas, solo 'sentiment_prob', sin
+# sentimiento, tweets embebidos y textos repetidos
+DATASET = {"seed": 7, "symbols": 8, "sectors": 3, "tweets_per_symbol": 40}
+
+async def test_vectorized_matches_python(db):
+    await load_dataset(db, generate_dataset(**DATASET))
+    assert await check_equivalence(db, ["vectorized"]) == {"vectorized": []}
+
+@pytest.mark.parametrize("mode", ["aggregation", "vectorized", "incremental"])
+async def test_mode_matches_python_on_mongod(mongod_db, mode):
+    # 'aggregation' e 'incremental' normalizan con $trim, que mongomock no implementa
+    await load_dataset(mongod_db, generate_dataset(**DATASET))
+    assert await check_equivalence(mongod_db, [mode]) == {mode: []}
+
+async def _content(db):
+    return {
+        doc["symbol"]: {field: doc.get(field) for field in EQUIVALENCE_FIELDS}
+        async for doc in db["symbols_sentiment"].find({})
+    }
+
+async def test_incremental_rejected_with_change_feed(db, monkeypatch):
+    monkeypatch.setattr(settings, "FEED_ENABLED", True)
+    with pytest.raises(ValueError):
+        await SentimentService._create_symbols_sentiment_incremental(JobProgress())
+
+async def test_incremental_counts_only_new_tweets(mongod_db):
+    await load_dataset(mongod_db, generate_dataset(**DATASET))
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    await mongod_db["tweets"].insert_many([
+        {"_id": ObjectId(), "company": "GGAL", "text": "GGAL sube", "sentiment": "pos", "created_at": datetime(2025, 1, 1)},
+        {"_id": ObjectId(), "company": "GGAL", "text": "GGAL baja", "sentiment": None, "created_at": datetime(2025, 1, 1)}
+    ])
+
+    result = await SentimentService._create_symbols_sentiment_incremental(JobProgress())
+
+    assert result["symbols_written"] == 1
+    assert result["tweets_processed"] == 2
+    assert result["writes_skipped"] == DATASET["symbols"] - 1
+    incremental = await _content(mongod_db)
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    assert incremental == await _content(mongod_db)
+
+async def test_incremental_skips_symbols_without_tweets(mongod_db):
+    await mongod_db["symbols"].insert_many([{"symbol": "GGAL", "sector": "Bancos"}, {"symbol": "BMA", "sector": "Bancos"}])
+    await mongod_db["tweets"].insert_one({"company": "GGAL", "text": "sube", "sentiment": "positivo"})
+    await SentimentService._create_symbols_sentiment_incremental(JobProgress())
+    revisions = {doc["symbol"]: doc["revision"] async for doc in mongod_db["symbols_sentiment"].find({})}
+
+    result = await SentimentService._create_symbols_sentiment_incremental(JobProgress())
+
+    assert result["symbols_written"] == 0
+    assert result["writes_skipped"] == 2
+    assert {doc["symbol"]: doc["revision"] async for doc in mongod_db["symbols_sentiment"].find({})} == revisions
@@ -0,0 +1,104 @@
+import random
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+
+from scoring import (
+    OVERALL_SENTIMENTS, SENTIMENTS, SentimentEncoder, SymbolSentimentAccumulator, confidence_scores,
+    normalize_codes, overall_sentiment_codes
+)
+from services import SentimentService
+
+# Empates que el recorrido escalar resuelve por el orden de las claves de cada tweet
+TIE_CASES = [
+    {"sentiment_prob": {"neg": 0.5, "pos": 0.5}},
+    {"sentiment_prob": {"pos": 0.5, "neg": 0.5}},
+    {"sentiment_prob": {"neu": 0.4, "positive": 0.4, "NEGATIVE": 0.2}},
+    {"sentiment": "", "sentiment_prob": {"NEGATIVE": 0.4, "neu": 0.4, "positive": 0.2}}
+]
+
+SYMBOL_FIELDS = ("overall_sentiment", "sentiment_counts", "sentiment_percentages",
+                 "total_tweets", "tweets_without_sentiment", "confidence_score")
+
+def _random_tweet(rng: random.Random) -> Dict:
+    """Etiquetas en distintos formatos, probabilidades negativas o en cero, empates y dicts vacíos"""
+    labels = ["pos", "POSITIVE", " Positivo ", "neg", "Negative", "negativo", "neu", "NEUTRO",
+              "neutral", "desconocido", "otro", "", None]
+    prob_keys = ["pos", "neg", "neu", "positive", "NEGATIVE", "desconocido", "otro"]
+    tweet: Dict[str, Any] = {}
+    choice = rng.random()
+    if choice < 0.5:
+        tweet["sentiment"] = rng.choice(labels)
+    elif choice < 0.6:
+        tweet["sentiment"] = ""
+    if rng.random() < 0.7:
+        keys = rng.sample(prob_keys, rng.randint(0, 4))
+        if rng.random() < 0.3:
+            # Empates: varias claves con la misma probabilidad máxima, en cualquier orden
+            tied = rng.choice([0.5, 0.25, rng.random()])
+            tweet["sentiment_prob"] = {key: rng.choice([tied, tied, rng.random() * tied]) for key in keys}
+        else:
+            tweet["sentiment_prob"] = {key: rng.choice([rng.random(), -rng.random(), 0]) for key in keys}
+    return tweet
+
+def _scalar(tweet: Dict) -> str:
+    return SentimentService._normalize_sentiment(tweet.get("sentiment", ""), tweet.get("sentiment_prob", None))
+
+def test_tie_cases_follow_key_order():
+    encoder = SentimentEncoder()
+    label_codes, probs, order = encoder.encode(TIE_CASES)
+
+    codes = normalize_codes(label_codes, probs, encoder.prob_key_codes(), order)
+
+    assert [SENTIMENTS[code] for code in codes] == [_scalar(tweet) for tweet in TIE_CASES]
+    assert [SENTIMENTS[code] for code in codes] == ["negativo", "positivo", "neutral", "negativo"]
+
+@pytest.mark.parametrize("seed", range(3))
+def test_tweet_normalization_matches_scalar(seed):
+    rng = random.Random(seed)
+    tweets = [_random_tweet(rng) for _ in range(5000)]
+    encoder = SentimentEncoder()
+    label_codes, probs, order = encoder.encode(tweets)
+
+    codes = normalize_codes(label_codes, probs, encoder.prob_key_codes(), order)
+
+    assert [SENTIMENTS[code] for code in codes] == [_scalar(tweet) for tweet in tweets]
+
+@pytest.mark.parametrize("seed", range(3))
+def test_symbol_docs_match_scalar(seed):
+    rng = random.Random(seed)
+    names = [f"SYM{i}" for i in range(30)]
+    tweets = [dict(_random_tweet(rng), company=rng.choice(names), _id=index) for index in range(5000)]
+    accumulator = SymbolSentimentAccumulator(names)
+    # En lotes, como la reconstrucción, para ejercitar la suma de conteos
+    for start in range(0, len(tweets), 700):
+        accumulator.add_batch(tweets[start:start + 700])
+
+    docs = accumulator.build_docs({})
+
+    for name in names:
+        own = [tweet for tweet in tweets if tweet["company"] == name]
+        sentiment_counts: Dict[str, int] = {}
+        for tweet in own:
+            sentiment = _scalar(tweet)
+            sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + 1
+        unlabeled = sum(
+            1 for tweet in own
+            if not SentimentService._has_sentiment(tweet.get("sentiment"), tweet.get("sentiment_prob"))
+        )
+        expected = SentimentService._build_symbol_sentiment_doc(
+            name, None, sentiment_counts, len(own), max(tweet["_id"] for tweet in own), unlabeled
+        )
+        assert {field: docs[name][field] for field in SYMBOL_FIELDS} == {field: expected[field] for field in SYMBOL_FIELDS}
+        assert docs[name]["last_tweet_id"] == expected["last_tweet_id"]
+
+def test_decision_rules_match_scalar():
+    rng = random.Random(0)
+    # Conteos chicos: cubren los casos límite de 40% y 60%
+    counts = np.array([[rng.randint(0, 10) for _ in SENTIMENTS] for _ in range(5000)])
+
+    for row, overall, confidence in zip(counts, overall_sentiment_codes(counts), confidence_scores(counts)):
+        sentiment_counts = {SENTIMENTS[code]: int(count) for code, count in enumerate(row) if count}
+        assert OVERALL_SENTIMENTS[overall] == SentimentService._calculate_overall_sentiment(sentiment_counts)
+        assert confidence == SentimentService._calculate_confidence_score(sentiment_counts, int(row.sum()))
@@ -0,0 +1,79 @@
+import pytest
+
+from services import SectorRollupService
+
+pytestmark = pytest.mark.anyio
+
+def _doc(symbol, sector, counts):
+    total = sum(counts.values())
+    return {"symbol": symbol, "sector": sector, "total_tweets": total,
+            # Sin tweets el documento lleva el marcador {"neutral": 1}
+            "sentiment_counts": counts or {"neutral": 1}}
+
+DOCS = [
+    _doc("GGAL", "Bancos", {"positivo": 8, "negativo": 2}),
+    _doc("BMA", "Bancos", {"positivo": 1, "neutral": 1}),
+    _doc("YPFD", "Energía", {"negativo": 5}),
+    _doc("PAMP", "Energía", {}),
+]
+
+@pytest.fixture
+async def sentiments(db):
+    await db["symbols_sentiment"].insert_many([dict(doc) for doc in DOCS])
+    return db
+
+async def _rollups(db):
+    return {
+        (doc["scope"], doc["sector"]): (doc["sentiment_counts"], doc["total_tweets"], doc["symbols"],
+                                         doc["overall_sentiment"], doc["confidence_score"])
+        async for doc in db[SectorRollupService.COLLECTION].find({})
+    }
+
+async def test_rebuild_sums_symbols_by_sector_and_market(sentiments):
+    await sentiments[SectorRollupService.COLLECTION].insert_one({"scope": "sector", "sector": "Viejo"})
+
+    result = await SectorRollupService.rebuild()
+
+    assert result == {"sectors": 2, "symbols": 4, "total_tweets": 17}
+    sectors = (await SectorRollupService.get_sectors_sentiment())["sectors"]
+    assert [sector["sector"] for sector in sectors] == ["Bancos", "Energía"]
+    bancos, energia = sectors
+    assert bancos["sentiment_counts"] == {"positivo": 9, "negativo": 2, "neutral": 1}
+    assert bancos["overall_sentiment"] == "positivo"
+    # PAMP no aporta conteos (marcador de sin tweets) pero cuenta como símbolo
+    assert energia["sentiment_counts"] == {"negativo": 5}
+    assert energia["symbols"] == 2
+    market = await SectorRollupService.get_market_sentiment()
+    assert market["total_tweets"] == 17 and market["symbols"] == 4
+    assert not {"_id", "scope", "revision", "sector"} & set(market)
+
+async def test_deltas_match_a_rebuild(sentiments):
+    await SectorRollupService.rebuild()
+    # GGAL recibe tweets negativos y PAMP pasa de Energía a Bancos con sus primeros tweets
+    changes = [
+        (DOCS[0], _doc("GGAL", "Bancos", {"positivo": 8, "negativo": 6})),
+        (DOCS[3], _doc("PAMP", "Bancos", {"neutral": 3})),
+    ]
+    deltas = {}
+    for old, new in changes:
+        SectorRollupService.add_symbol_delta(deltas, old, new)
+        await sentiments["symbols_sentiment"].replace_one({"symbol": new["symbol"]}, new)
+
+    await SectorRollupService.apply_deltas(deltas)
+    applied = await _rollups(sentiments)
+    await SectorRollupService.rebuild()
+
+    assert applied == await _rollups(sentiments)
+    assert applied[("sector", "Bancos")][2] == 3
+
+async def test_endpoints(client, sentiments):
+    assert (await client.get("/market-sentiment")).status_code == 404
+    await SectorRollupService.rebuild()
+
+    sectors = (await client.get("/sectors-sentiment")).json()
+    market = await client.get("/market-sentiment")
+
+    assert sectors["count"] == 2
+    assert market.status_code == 200
+    # 9 positivos y 7 negativos de 17: ambos superan el 40%
+    assert market.json()["overall_sentiment"] == "mixto"
@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from progress import JobProgress
+from services import SentimentService, symbols_sentiment_snapshot
+from snapshot import ResponseSnapshot, ResponseSnapshotCache, render_json
+
+pytestmark = pytest.mark.anyio
+
+def test_snapshot_holds_body_gzip_and_etag():
+    payload = {"symbols": [{"symbol": "GGAL", "overall_sentiment": "positivo"}], "count": 1}
+
+    snapshot = ResponseSnapshot(payload)
+
+    assert snapshot.body == render_json(payload)
+    assert gzip.decompress(snapshot.gzip_body) == snapshot.body
+    assert snapshot.etag == ResponseSnapshot(payload).etag
+    assert snapshot.etag != ResponseSnapshot({"symbols": [], "count": 0}).etag
+
+async def test_cache_loads_once_until_invalidated():
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return {"count": len(loads)}
+
+    cache = ResponseSnapshotCache(loader, max_age=60)
+    first, second = await asyncio.gather(cache.get(), cache.get())
+    assert first is second
+    assert len(loads) == 1
+
+    cache.invalidate()
+    assert json.loads((await cache.get()).body) == {"count": 2}
+
+async def test_cache_rebuilds_expired_snapshot():
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return {"count": len(loads)}
+
+    cache = ResponseSnapshotCache(loader, max_age=0)
+    await cache.get()
+    await cache.get()
+    assert len(loads) == 2
+
+async def test_invalidation_during_load_is_not_published():
+    cache = None
+
+    async def loader():
+        cache.invalidate()
+        return {"stale": True}
+
+    cache = ResponseSnapshotCache(loader, max_age=60)
+    await cache.get()
+    assert cache._snapshot is None
+
+async def test_endpoint_serves_snapshot_with_etag_and_gzip(client, db):
+    await db["symbols"].insert_one({"symbol": "GGAL", "sector": "Bancos"})
+    await db["tweets"].insert_one({"company": "GGAL", "text": "sube", "sentiment": "positivo"})
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+
+    response = await client.get("/symbols-sentiment")
+    assert response.status_code == 200
+    assert [doc["symbol"] for doc in response.json()["symbols"]] == ["GGAL"]
+    etag = response.headers["etag"]
+
+    assert (await client.get("/symbols-sentiment", headers={"If-None-Match": etag})).status_code == 304
+    compressed = await client.get("/symbols-sentiment", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == response.json()
+
+async def test_applied_changes_invalidate_the_snapshot(client, db):
+    await db["symbols"].insert_one({"symbol": "GGAL", "sector": "Bancos"})
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    before = await client.get("/symbols-sentiment")
+
+    await SentimentService.apply_sentiment_changes(
+        {"GGAL": [(ObjectId(), None, "negativo", datetime(2025, 1, 1), 0, None, None)]}
+    )
+    after = await client.get("/symbols-sentiment", headers={"If-None-Match": before.headers["etag"]})
+
+    assert after.status_code == 200
+    assert after.json()["symbols"][0]["overall_sentiment"] == "negativo"
+
+async def test_recompute_publishes_a_new_snapshot(mongod_db):
+    # La recompute pública reconstruye buckets ($merge) y agregados ($trim): requiere mongod
+    await mongod_db["symbols"].insert_one({"symbol": "GGAL", "sector": "Bancos"})
+    await SentimentService.create_symbols_sentiment_collection(mode="python")
+    before = await symbols_sentiment_snapshot.get()
+
+    await mongod_db["tweets"].insert_one({"company": "GGAL", "text": "baja", "sentiment": "negativo"})
+    await SentimentService.create_symbols_sentiment_collection(mode="python")
+    after = await symbols_sentiment_snapshot.get()
+
+    assert after.etag != before.etag
+    assert json.loads(after.body)["symbols"][0]["overall_sentiment"] == "negativo"
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from streaming import NDJSON_MEDIA_TYPE
+
+pytestmark = pytest.mark.anyio
+
+SYMBOLS = ["ALUA", "BMA", "GGAL", "PAMP", "YPFD"]
+
+@pytest.fixture
+async def data(db):
+    await db["symbols"].insert_many([
+        {"symbol": symbol, "sector": "Bancos" if symbol in ("BMA", "GGAL") else "Otros"} for symbol in SYMBOLS
+    ])
+    # PAMP sin documento de sentimiento: el resumen lo informa en cero
+    await db["symbols_sentiment"].insert_many([
+        {
+            "symbol": symbol,
+            "sector": "Bancos" if symbol in ("BMA", "GGAL") else "Otros",
+            "overall_sentiment": "positivo",
+            "sentiment_counts": {"positivo": 3, "neutral": 2},
+            "total_tweets": 5,
+            "tweets_without_sentiment": 1,
+            "confidence_score": 0.6,
+            "fingerprint": "x",
+            "revision": 1
+        }
+        for symbol in SYMBOLS if symbol != "PAMP"
+    ])
+    await db["tweets"].insert_many([{"company": "GGAL"}, {"company": "GGAL"}, {"company": "BMA"}])
+    return db
+
+def _lines(response):
+    assert response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    return [json.loads(line) for line in response.text.splitlines()]
+
+async def test_symbols_sentiment_stream_matches_the_page(client, data):
+    page = (await client.get("/symbols-sentiment", params={"limit": 500})).json()
+
+    by_param = await client.get("/symbols-sentiment", params={"stream": "true", "batch_size": 2})
+    by_header = await client.get("/symbols-sentiment", headers={"Accept": NDJSON_MEDIA_TYPE})
+
+    assert _lines(by_param) == page["symbols"]
+    assert _lines(by_header) == page["symbols"]
+
+async def test_symbols_sentiment_stream_applies_filters_and_fields(client, data):
+    response = await client.get("/symbols-sentiment", params={
+        "stream": "true", "sector": "Bancos", "fields": "total_tweets"
+    })
+
+    assert _lines(response) == [{"symbol": "BMA", "total_tweets": 5}, {"symbol": "GGAL", "total_tweets": 5}]
+
+async def test_invalid_fields_fail_before_streaming(client, data):
+    response = await client.get("/symbols-sentiment", params={"stream": "true", "fields": "fingerprint"})
+
+    assert response.status_code == 400
+
+async def test_symbols_summary_stream_matches_the_response(client, data):
+    summary = (await client.get("/symbols-summary")).json()
+
+    response = await client.get("/symbols-summary", params={"stream": "true", "batch_size": 2})
+
+    lines = _lines(response)
+    assert [line["symbol"] for line in lines] == SYMBOLS
+    assert sorted(lines, key=lambda line: line["symbol"]) == sorted(summary["symbols"], key=lambda line: line["symbol"])
+    ggal = next(line for line in lines if line["symbol"] == "GGAL")
+    assert ggal["tweets_without_sentiment"] == 1
+    assert ggal["sentiments"] == {"positivo": 3, "neutral": 1}
+
+async def test_tweets_count_stream(client, data):
+    response = await client.get("/debug/tweets-count", params={"stream": "true"})
+
+    assert _lines(response) == [{"company": "BMA", "count": 1}, {"company": "GGAL", "count": 2}]
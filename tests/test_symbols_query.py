@@ -0,0 +1,65 @@
+import pytest
+
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+DOCS = [
+    {"symbol": "ALUA", "sector": "Materiales", "overall_sentiment": "negativo", "confidence_score": 0.4, "total_tweets": 10},
+    {"symbol": "BMA", "sector": "Bancos", "overall_sentiment": "positivo", "confidence_score": 0.9, "total_tweets": 30},
+    {"symbol": "GGAL", "sector": "Bancos", "overall_sentiment": "positivo", "confidence_score": 0.7, "total_tweets": 30},
+    {"symbol": "PAMP", "sector": "Energía", "overall_sentiment": "neutral", "confidence_score": 0.2, "total_tweets": 5},
+    {"symbol": "YPFD", "sector": "Energía", "overall_sentiment": "mixto", "confidence_score": 0.6, "total_tweets": 30},
+]
+
+@pytest.fixture
+async def sentiments(db):
+    await db["symbols_sentiment"].insert_many([
+        dict(doc, sentiment_counts={}, sentiment_percentages={}, fingerprint="x", revision=1) for doc in DOCS
+    ])
+    return db
+
+async def _all_pages(**params):
+    symbols, cursor = [], None
+    while True:
+        page = await SentimentService.query_symbols_sentiment(limit=2, cursor=cursor, **params)
+        symbols += [doc["symbol"] for doc in page["symbols"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return symbols
+
+async def test_filters(sentiments):
+    page = await SentimentService.query_symbols_sentiment(sector="Bancos", min_confidence=0.8)
+    assert [doc["symbol"] for doc in page["symbols"]] == ["BMA"]
+
+    page = await SentimentService.query_symbols_sentiment(overall_sentiment="positivo", min_total_tweets=30)
+    assert [doc["symbol"] for doc in page["symbols"]] == ["BMA", "GGAL"]
+
+async def test_keyset_pages_cover_every_symbol_once_with_ties(sentiments):
+    assert await _all_pages() == ["ALUA", "BMA", "GGAL", "PAMP", "YPFD"]
+    # total_tweets empata en 30: el desempate por símbolo mantiene el orden entre páginas
+    assert await _all_pages(sort="total_tweets", order="desc") == ["YPFD", "GGAL", "BMA", "ALUA", "PAMP"]
+    assert await _all_pages(sort="confidence_score", sector="Energía") == ["PAMP", "YPFD"]
+
+async def test_projection_returns_only_requested_fields(sentiments):
+    page = await SentimentService.query_symbols_sentiment(fields=["overall_sentiment"], sort="total_tweets", limit=1)
+
+    assert page["symbols"] == [{"symbol": "PAMP", "overall_sentiment": "neutral"}]
+
+async def test_reads_never_return_internal_fields(sentiments):
+    page = await SentimentService.query_symbols_sentiment()
+    single = await SentimentService.get_symbol_sentiment("GGAL")
+    batch = await SentimentService.get_symbols_sentiment_batch(["GGAL", "NOPE"])
+
+    for doc in page["symbols"] + [single] + batch["symbols"]:
+        assert not set(doc) & set(SentimentService.INTERNAL_FIELDS)
+    assert batch["missing"] == ["NOPE"]
+
+async def test_endpoint_validates_parameters(client, sentiments):
+    assert (await client.get("/symbols-sentiment", params={"fields": "secret"})).status_code == 400
+    assert (await client.get("/symbols-sentiment", params={"sort": "sector"})).status_code == 422
+    assert (await client.get("/symbols-sentiment/NOPE")).status_code == 404
+
+    response = await client.get("/symbols-sentiment", params={"sector": "Energía", "fields": "total_tweets"})
+    assert response.status_code == 200
+    assert response.json()["symbols"] == [{"symbol": "PAMP", "total_tweets": 5}, {"symbol": "YPFD", "total_tweets": 30}]
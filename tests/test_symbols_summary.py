@@ -0,0 +1,82 @@
+import base64
+import json
+
+import pytest
+
+from progress import JobProgress
+from services import SentimentService
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def summarized(db):
+    await db["symbols"].insert_many([
+        {"symbol": "GGAL", "sector": "Bancos"}, {"symbol": "BMA", "sector": "Bancos"},
+        {"symbol": "YPFD", "sector": "Energía"}, {"symbol": "PAMP", "sector": "Energía"}
+    ])
+    await db["tweets"].insert_many([
+        {"company": "GGAL", "text": "sube", "sentiment": "pos"},
+        {"company": "GGAL", "text": "baja", "sentiment": "negativo"},
+        {"company": "GGAL", "text": "sin etiqueta", "sentiment": None},
+        {"company": "GGAL", "text": "vacío", "sentiment": ""},
+        {"company": "BMA", "text": "estable", "sentiment": "neu"},
+        {"company": "YPFD", "text": "sin campo"},
+    ])
+    await SentimentService._create_symbols_sentiment_python(JobProgress())
+    return db
+
+def _cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+async def test_summary_is_served_from_the_counters(summarized, client):
+    # Sin recorrer 'tweets': vaciarla no cambia el resumen
+    await summarized["tweets"].delete_many({})
+
+    summary = (await client.get("/symbols-summary")).json()
+
+    by_symbol = {item["symbol"]: item for item in summary["symbols"]}
+    assert summary["total_symbols"] == 4
+    assert {key: by_symbol["GGAL"][key] for key in ("total_tweets", "tweets_with_sentiment", "tweets_without_sentiment", "sentiments")} == {
+        "total_tweets": 4, "tweets_with_sentiment": 2, "tweets_without_sentiment": 2,
+        "sentiments": {"positivo": 1, "negativo": 1}
+    }
+    assert by_symbol["BMA"]["sentiments"] == {"neutral": 1}
+    assert (by_symbol["YPFD"]["tweets_without_sentiment"], by_symbol["YPFD"]["sentiments"]) == (1, {})
+    # Sin tweets: el marcador {"neutral": 1} del documento no se informa como sentimiento
+    assert (by_symbol["PAMP"]["total_tweets"], by_symbol["PAMP"]["sentiments"]) == (0, {})
+    assert by_symbol["GGAL"]["last_updated"] is not None
+
+async def test_pages_and_stream_match_the_full_summary(summarized, client):
+    full = (await client.get("/symbols-summary")).json()["symbols"]
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/symbols-summary", params=params)).json()
+        pages += page["symbols"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    streamed = (await client.get("/symbols-summary", params={"stream": "true"})).text.splitlines()
+
+    assert [item["symbol"] for item in pages] == ["BMA", "GGAL", "PAMP", "YPFD"]
+    assert sorted(pages, key=lambda item: item["symbol"]) == sorted(full, key=lambda item: item["symbol"])
+    assert [json.loads(line)["symbol"] for line in streamed] == ["BMA", "GGAL", "PAMP", "YPFD"]
+
+async def test_sector_filter(summarized, client):
+    summary = (await client.get("/symbols-summary", params={"sector": "Energía"})).json()
+    assert sorted(item["symbol"] for item in summary["symbols"]) == ["PAMP", "YPFD"]
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!", _cursor([]), _cursor(["GGAL", "BMA"]), _cursor([{"$ne": None}]),
+    _cursor([True]), _cursor({"symbol": "GGAL"})
+])
+async def test_invalid_cursor_is_rejected(summarized, client, cursor):
+    response = await client.get("/symbols-summary", params={"limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("cursor", [_cursor([{"$gt": 0}, "GGAL"]), _cursor([False, "GGAL"]), _cursor([10])])
+async def test_invalid_query_cursor_is_rejected(summarized, client, cursor):
+    params = {"limit": 2, "sort": "total_tweets", "cursor": cursor}
+    response = await client.get("/symbols-sentiment", params=params)
+    assert response.status_code == 400
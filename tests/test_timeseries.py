@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import SentimentTimeseriesService
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2025, 6, 1, 12, 30)
+OLD_DAY = datetime(2025, 4, 1)
+
+def _bucket(symbol, start, positivo, negativo=0, granularity=SentimentTimeseriesService.HOURLY):
+    counts = {sent: count for sent, count in (("positivo", positivo), ("negativo", negativo)) if count}
+    return {"symbol": symbol, "granularity": granularity, "bucket_start": start,
+            "sentiment_counts": counts, "total_tweets": positivo + negativo}
+
+@pytest.fixture
+async def buckets(db):
+    collection = db[SentimentTimeseriesService.COLLECTION]
+    await collection.insert_many([
+        # Diario escrito antes directamente (tweets ya vencidos al procesarse)
+        _bucket("GGAL", OLD_DAY, 5, granularity=SentimentTimeseriesService.DAILY),
+        _bucket("GGAL", OLD_DAY + timedelta(hours=3), 1),
+        _bucket("GGAL", OLD_DAY + timedelta(hours=9), 2, 1),
+        _bucket("GGAL", OLD_DAY + timedelta(days=1, hours=1), 0, 4),
+        _bucket("YPFD", OLD_DAY + timedelta(hours=3), 3),
+        # Dentro de la retención: queda horario
+        _bucket("GGAL", NOW.replace(minute=0) - timedelta(hours=2), 7),
+    ])
+    return collection
+
+async def _daily(collection, symbol, day):
+    return await collection.find_one(
+        {"symbol": symbol, "granularity": SentimentTimeseriesService.DAILY, "bucket_start": day}
+    )
+
+async def _hourly_before_cutoff(collection):
+    return await collection.count_documents({
+        "granularity": SentimentTimeseriesService.HOURLY,
+        "bucket_start": {"$lt": SentimentTimeseriesService._hourly_cutoff(NOW)}
+    })
+
+async def test_rollup_sums_expired_hours_into_days(buckets):
+    result = await SentimentTimeseriesService.rollup_buckets(NOW)
+
+    assert result["hourly_buckets_rolled_up"] == 4
+    assert await _hourly_before_cutoff(buckets) == 0
+    ggal = await _daily(buckets, "GGAL", OLD_DAY)
+    assert ggal["sentiment_counts"] == {"positivo": 8, "negativo": 1}
+    assert ggal["total_tweets"] == 9
+    assert ggal["rolled_up_through"] == OLD_DAY + timedelta(hours=9)
+    assert (await _daily(buckets, "GGAL", OLD_DAY + timedelta(days=1)))["sentiment_counts"] == {"negativo": 4}
+    assert (await _daily(buckets, "YPFD", OLD_DAY))["total_tweets"] == 3
+    assert await buckets.count_documents({"granularity": SentimentTimeseriesService.HOURLY}) == 1
+
+async def test_rollup_rerun_after_a_crash_does_not_double_count(buckets):
+    hours = await buckets.find({
+        "granularity": SentimentTimeseriesService.HOURLY,
+        "bucket_start": {"$lt": SentimentTimeseriesService._hourly_cutoff(NOW)}
+    }).to_list(length=None)
+    await SentimentTimeseriesService.rollup_buckets(NOW)
+    expected = await _daily(buckets, "GGAL", OLD_DAY)
+
+    # Corte entre la suma y el borrado: los horarios siguen ahí al retomar
+    await buckets.insert_many(hours)
+    await SentimentTimeseriesService.rollup_buckets(NOW)
+
+    assert await _daily(buckets, "GGAL", OLD_DAY) == expected
+    assert await _hourly_before_cutoff(buckets) == 0
+
+async def test_concurrent_rollups_count_each_hour_once(buckets, monkeypatch):
+    monkeypatch.setattr("services.settings.CURSOR_BATCH_SIZE", 2)
+
+    await asyncio.gather(*(SentimentTimeseriesService.rollup_buckets(NOW) for _ in range(3)))
+
+    assert (await _daily(buckets, "GGAL", OLD_DAY))["sentiment_counts"] == {"positivo": 8, "negativo": 1}
+    assert (await _daily(buckets, "YPFD", OLD_DAY))["total_tweets"] == 3
+
+async def test_rollup_replaces_the_legacy_id_list(buckets):
+    await buckets.update_one(
+        {"symbol": "GGAL", "granularity": SentimentTimeseriesService.DAILY},
+        {"$set": {"rolled_up_from": ["a", "b"]}}
+    )
+
+    await SentimentTimeseriesService.rollup_buckets(NOW)
+
+    assert "rolled_up_from" not in await _daily(buckets, "GGAL", OLD_DAY)
+
+async def test_timeseries_endpoint_reads_the_window(client, buckets, db):
+    await db["symbols_sentiment"].insert_one({"symbol": "GGAL"})
+    current = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    await buckets.insert_many([
+        _bucket("GGAL", current, 1, 1),
+        _bucket("GGAL", current - timedelta(hours=1), 3),
+        _bucket("GGAL", current - timedelta(hours=5), 9),
+    ])
+
+    response = await client.get("/symbols-sentiment/GGAL/timeseries", params={"window": "4h", "step": "2h"})
+
+    body = response.json()
+    assert body["summary"]["sentiment_counts"] == {"positivo": 4, "negativo": 1}
+    assert body["summary"]["total_tweets"] == 5
+    assert [point["total_tweets"] for point in body["points"]] == [0, 5]
+    assert (await client.get("/symbols-sentiment/GGAL/timeseries", params={"window": "3h", "step": "2h"})).status_code == 400
+    assert (await client.get("/symbols-sentiment/NOPE/timeseries")).status_code == 404